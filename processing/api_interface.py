@@ -1,57 +1,24 @@
-import requests
-import logging
+import rate_limiter
+from api_session import APISession, APIException, connection_options
 
 
-logging.getLogger('requests').setLevel(logging.WARNING)
-
-
-class APIException(Exception):
-    """
-    Handle exceptions thrown by the APIServer class
-    """
-    pass
-
-
-class APIServer(object):
+class APIServer(APISession):
     """
     Provide a more straightforward way of handling API calls
     without changing the cron jobs significantly
     """
-    def __init__(self, base_url):
-        self.base = base_url
+    def __init__(self, base_url, api_limiter=None, **kwargs):
+        super(APIServer, self).__init__(base_url, **kwargs)
+        self.api_limiter = api_limiter
 
-    def request(self, method, resource=None, status=None, **kwargs):
+    def acquire(self, url):
         """
-        Make a call into the API
+        Wait for the API rate limiter, if any, before each attempt
 
         Args:
-            method: HTTP method to use
-            resource: API resource to touch
-
-        Returns: response and status code
-
+            url: URL about to be called
         """
-        valid_methods = ('get', 'put', 'delete', 'head', 'options', 'post')
-
-        if method not in valid_methods:
-            raise APIException('Invalid method {}'.format(method))
-
-        if resource and resource[0] == '/':
-            url = '{}{}'.format(self.base, resource)
-        elif resource:
-            url = '{}/{}'.format(self.base, resource)
-        else:
-            url = self.base
-
-        try:
-            resp = requests.request(method, url, **kwargs)
-        except requests.RequestException as e:
-            raise APIException(e)
-
-        if status and resp.status_code != status:
-            self._unexpected_status(resp.status_code, url)
-
-        return resp.json(), resp.status_code
+        rate_limiter.acquire(self.api_limiter, url)
 
     def get_configuration(self, key):
         """
@@ -114,7 +81,9 @@ class APIServer(object):
                      'processing_loc': proc_loc,
                      'status': val}
 
-        resp, status = self.request('post', url, json=data_dict, status=200)
+        # Sets the same status again when repeated
+        resp, status = self.request('post', url, json=data_dict, status=200,
+                                    idempotent=True)
 
         return resp
 
@@ -141,7 +110,9 @@ class APIServer(object):
                      'cksum_file_location': dest_cksumfile,
                      'log_file_contents': val}
 
-        resp, status = self.request('post', url, json=data_dict, status=200)
+        # Sets the same status again when repeated
+        resp, status = self.request('post', url, json=data_dict, status=200,
+                                    idempotent=True)
 
         return resp
 
@@ -163,7 +134,9 @@ class APIServer(object):
                      'processing_loc': proc_loc,
                      'error': log}
 
-        resp, status = self.request('post', url, json=data_dict, status=200)
+        # Sets the same status again when repeated
+        resp, status = self.request('post', url, json=data_dict, status=200,
+                                    idempotent=True)
 
         return resp
 
@@ -190,18 +163,6 @@ class APIServer(object):
 
         return status == 200
 
-    @staticmethod
-    def _unexpected_status(code, url):
-        """
-        Throw exception for an unhandled http status
-
-        Args:
-            code: http status that was received
-            url: URL that was used
-        """
-        raise Exception('Received unexpected status code: {}\n'
-                        'for URL: {}'.format(code, url))
-
     def test_connection(self):
         """
         Tests the base URL for the class
@@ -215,17 +176,19 @@ class APIServer(object):
         return False
 
 
-def api_connect(url):
+def api_connect(url, api_limiter=None, **kwargs):
     """
     Simple lead in method for using the API connection class
 
     Args:
         url: base URL to connect to
+        api_limiter: rate limiter to wait for before each call, if any
+        kwargs: APIServer connection options
 
     Returns: initialized APIServer object if successful connection
              else None
     """
-    api = APIServer(url)
+    api = APIServer(url, api_limiter=api_limiter, **kwargs)
 
     if not api.test_connection():
         return None
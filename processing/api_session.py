@@ -0,0 +1,167 @@
+import random
+import requests
+import logging
+from time import sleep
+
+
+logging.getLogger('requests').setLevel(logging.WARNING)
+
+
+# Defaults for the connections to the API
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 300.0
+MAX_RETRIES = 5
+RETRY_BACKOFF_SECONDS = 2.0
+RETRY_MAX_SLEEP_SECONDS = 60.0
+POOL_SIZE = 4
+
+# Methods which may be retried without changing the result on the server
+IDEMPOTENT_METHODS = ('get', 'put', 'delete', 'head', 'options')
+
+# Statuses for failures of the server, which are worth trying again
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class APIException(Exception):
+    """
+    Handle exceptions thrown by the APIServer class
+    """
+    pass
+
+
+class APISession(object):
+    """
+    Make the calls into the API for the processing and scheduling APIServer
+    classes
+
+    The calls share a pooled session, so the connections to the API are
+    kept alive and reused.
+    """
+    def __init__(self, base_url, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES):
+        self.base = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                pool_maxsize=POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def acquire(self, url):
+        """
+        Wait until a call may be made, before each attempt
+
+        Args:
+            url: URL about to be called
+        """
+        pass
+
+    def retry_sleep_seconds(self, attempt):
+        """
+        Determine how long to wait before trying a call again
+
+        The exponential backoff is jittered, so that clients which failed
+        together do not all try again together.
+
+        Args:
+            attempt: number of the failed attempt, starting at zero
+
+        Returns: seconds to sleep
+        """
+        return random.uniform(0, min(RETRY_MAX_SLEEP_SECONDS,
+                                     RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+    def request(self, method, resource=None, status=None, idempotent=None,
+                **kwargs):
+        """
+        Make a call into the API
+
+        Connection failures, timeouts, and server failures are tried again
+        for idempotent calls.
+
+        Args:
+            method: HTTP method to use
+            resource: API resource to touch
+            status: expected HTTP status
+            idempotent: whether the call can be tried again, defaults to
+                        True for the IDEMPOTENT_METHODS
+
+        Returns: response and status code
+
+        """
+        valid_methods = ('get', 'put', 'delete', 'head', 'options', 'post')
+
+        if method not in valid_methods:
+            raise APIException('Invalid method {}'.format(method))
+
+        if resource and resource[0] == '/':
+            url = '{}{}'.format(self.base, resource)
+        elif resource:
+            url = '{}/{}'.format(self.base, resource)
+        else:
+            url = self.base
+
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+
+        kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+        while True:
+            self.acquire(url)
+
+            can_retry = idempotent and attempt < self.max_retries
+
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not can_retry:
+                    raise APIException(e)
+            except requests.RequestException as e:
+                raise APIException(e)
+            else:
+                if not can_retry or resp.status_code not in RETRY_STATUSES:
+                    break
+
+            sleep(self.retry_sleep_seconds(attempt))
+            attempt += 1
+
+        if status and resp.status_code != status:
+            self._unexpected_status(resp.status_code, url)
+
+        return resp.json(), resp.status_code
+
+    @staticmethod
+    def _unexpected_status(code, url):
+        """
+        Throw exception for an unhandled http status
+
+        Args:
+            code: http status that was received
+            url: URL that was used
+        """
+        raise Exception('Received unexpected status code: {}\n'
+                        'for URL: {}'.format(code, url))
+
+
+def connection_options(cfg):
+    """
+    Retrieve the API connection options from the processing configuration
+
+    Args:
+        cfg: processing configuration
+
+    Returns: dict of the configured APIServer keyword arguments
+    """
+    options = dict()
+
+    for (option, name, value_type) in [
+            ('espa_api_connect_timeout', 'connect_timeout', float),
+            ('espa_api_read_timeout', 'read_timeout', float),
+            ('espa_api_max_retries', 'max_retries', int)]:
+        if cfg.has_option('processing', option):
+            options[name] = value_type(cfg.get('processing', option))
+
+    return options
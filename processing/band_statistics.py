@@ -0,0 +1,369 @@
+'''
+Description: Provides an in-process engine for generating the statistics of
+             the science product bands.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import os
+import re
+import glob
+import math
+import multiprocessing
+
+import numpy as np
+
+import settings
+
+
+# Numpy types for the ENVI data type codes
+ENVI_DATA_TYPES = {
+    1: np.uint8,
+    2: np.int16,
+    3: np.int32,
+    4: np.float32,
+    5: np.float64,
+    12: np.uint16,
+    13: np.uint32,
+    14: np.int64,
+    15: np.uint64
+}
+
+# Scale factors applied to the data before applying the band type ranges
+BAND_TYPE_SCALES = {
+    'LST': settings.MODIS_LST_SCALE,
+    'LANDSAT_ST': settings.LANDSAT_ST_SCALE
+}
+
+STATS_DIRECTORY = 'stats'
+
+
+def read_envi_header(hdr_filename):
+    '''
+    Description:
+        Read the fields of an ENVI header file.
+
+    Returns:
+        dict - The field values keyed by the lower case field name.  Values
+               in braces are returned without the braces.
+    '''
+
+    with open(hdr_filename, 'r') as hdr_fd:
+        text = hdr_fd.read()
+
+    if not text.startswith('ENVI'):
+        raise Exception('[{0}] is not an ENVI header'.format(hdr_filename))
+
+    fields = dict()
+    for match in re.finditer(r'^\s*([^=\n]+?)\s*=\s*(\{[^}]*\}|[^\n]*)',
+                             text, re.MULTILINE):
+        value = match.group(2).strip()
+        if value.startswith('{'):
+            value = value[1:-1].strip()
+        fields[match.group(1).lower()] = value
+
+    return fields
+
+
+def open_band(img_filename):
+    '''
+    Description:
+        Memory map the single band ENVI image using its header.
+
+    Returns:
+        data - A read-only array of lines by samples.
+        fill_value - The data ignore value from the header, or None.
+    '''
+
+    fields = read_envi_header(''.join([os.path.splitext(img_filename)[0],
+                                       '.hdr']))
+
+    if int(fields.get('bands', 1)) != 1:
+        raise Exception('[{0}] must contain a single band'
+                        .format(img_filename))
+
+    dtype = np.dtype(ENVI_DATA_TYPES[int(fields['data type'])])
+    if int(fields.get('byte order', 0)) == 1:
+        dtype = dtype.newbyteorder('>')
+    else:
+        dtype = dtype.newbyteorder('<')
+
+    data = np.memmap(img_filename, dtype=dtype, mode='r',
+                     offset=int(fields.get('header offset', 0)),
+                     shape=(int(fields['lines']), int(fields['samples'])))
+
+    fill_value = fields.get('data ignore value')
+    if fill_value is not None:
+        fill_value = float(fill_value)
+
+    return (data, fill_value)
+
+
+class StatsAccumulator(object):
+    '''
+    Description:
+        Accumulates the count, minimum, maximum, mean, and sum of squared
+        differences from the mean of the values given to it.
+
+    Notes:
+        Accumulators of separate parts of the data can be merged, giving the
+        same result as accumulating all of the data at once.
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.minimum = None
+        self.maximum = None
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def merge(self, other):
+        '''
+        Description:
+            Add the values accumulated by another accumulator.
+        '''
+
+        if other.count == 0:
+            return
+
+        if self.count == 0:
+            self.count = other.count
+            self.minimum = other.minimum
+            self.maximum = other.maximum
+            self.mean = other.mean
+            self.m2 = other.m2
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def update(self, values):
+        '''
+        Description:
+            Add an array of values.
+        '''
+
+        if values.size == 0:
+            return
+
+        values = values.astype(np.float64)
+
+        block = StatsAccumulator()
+        block.count = int(values.size)
+        block.minimum = float(values.min())
+        block.maximum = float(values.max())
+        block.mean = float(values.mean())
+        block.m2 = float(np.square(values - block.mean).sum())
+
+        self.merge(block)
+
+    @property
+    def stddev(self):
+        '''
+        Description:
+            The population standard deviation of the values.
+        '''
+
+        if self.count == 0:
+            return 0.0
+
+        return math.sqrt(self.m2 / self.count)
+
+
+def valid_values(block, band_type, fill_value=None):
+    '''
+    Description:
+        Returns the values of the block which fall within the range of the
+        band type, after scaling, excluding the fill value.
+    '''
+
+    values = block.astype(np.float64)
+
+    if fill_value is not None:
+        values = values[values != fill_value]
+
+    scale = BAND_TYPE_SCALES.get(band_type)
+    if scale is not None:
+        values = values * scale
+
+    ranges = settings.BAND_TYPE_STAT_RANGES[band_type]
+
+    return values[(values >= ranges['LOWER_BOUND']) &
+                  (values <= ranges['UPPER_BOUND'])]
+
+
+def band_accumulator(img_filename, band_type):
+    '''
+    Description:
+        Accumulate the statistics of a band, a block of lines at a time.
+    '''
+
+    (data, fill_value) = open_band(img_filename)
+
+    accumulator = StatsAccumulator()
+    block_lines = settings.STATISTICS_BLOCK_LINES
+    for line in range(0, data.shape[0], block_lines):
+        accumulator.update(valid_values(data[line:line + block_lines],
+                                        band_type, fill_value))
+
+    del data
+
+    return accumulator
+
+
+def stats_filename(work_dir, img_filename):
+    '''
+    Description:
+        Returns the full path to the statistics file for the band.
+    '''
+
+    base_name = os.path.splitext(os.path.basename(img_filename))[0]
+
+    return os.path.join(work_dir, STATS_DIRECTORY,
+                        ''.join([base_name, '.stats']))
+
+
+def write_stats_file(filename, img_filename, accumulator):
+    '''
+    Description:
+        Write the statistics in the format used by the plotting.
+
+    Notes:
+        Bands without any values within range are marked as not valid.
+    '''
+
+    if accumulator.count > 0:
+        values = (accumulator.minimum, accumulator.maximum,
+                  accumulator.mean, accumulator.stddev, 'yes')
+    else:
+        values = (0.0, 0.0, 0.0, 0.0, 'no')
+
+    with open(filename, 'w') as stats_fd:
+        stats_fd.write('FILENAME={0}\n'
+                       .format(os.path.basename(img_filename)))
+        stats_fd.write('MINIMUM={0:.6f}\n'.format(values[0]))
+        stats_fd.write('MAXIMUM={0:.6f}\n'.format(values[1]))
+        stats_fd.write('MEAN={0:.6f}\n'.format(values[2]))
+        stats_fd.write('STDDEV={0:.6f}\n'.format(values[3]))
+        stats_fd.write('VALID={0}\n'.format(values[4]))
+
+
+def generate_band_statistics((work_dir, img_filename, band_type)):
+    '''
+    Description:
+        Generate the statistics file for a band.
+
+    Notes:
+        Module level so that it can be sent to the worker processes.
+
+    Returns:
+        str - The statistics file name.
+    '''
+
+    filename = stats_filename(work_dir, img_filename)
+
+    write_stats_file(filename, img_filename,
+                     band_accumulator(img_filename, band_type))
+
+    return filename
+
+
+def find_bands(work_dir, files_to_search_for):
+    '''
+    Description:
+        Find the bands to generate statistics for.
+
+    Returns:
+        list - (img_filename, band_type) for each band found.
+    '''
+
+    bands = list()
+    for band_type in sorted(files_to_search_for):
+        for search in files_to_search_for[band_type]:
+            for img_filename in sorted(glob.glob(os.path.join(work_dir,
+                                                              search))):
+                bands.append((img_filename, band_type))
+
+    return bands
+
+
+def statistics_workers(band_count):
+    '''
+    Description:
+        Determine the number of processes to generate statistics with.
+
+    Notes:
+        Processes running in a pool are not allowed to start a pool of their
+        own, so those always use a single process.
+    '''
+
+    if multiprocessing.current_process().daemon:
+        return 1
+
+    workers = settings.STATISTICS_WORKERS
+    if workers < 1:
+        workers = multiprocessing.cpu_count()
+
+    return max(1, min(workers, band_count))
+
+
+def generate_statistics(work_dir, files_to_search_for, logger=None):
+    '''
+    Description:
+        Generate the statistics files for the bands found in the work
+        directory, in parallel.
+
+    Parameters:
+        work_dir - The directory containing the bands.  The statistics are
+                   placed in a stats directory under it.
+        files_to_search_for - The file name patterns keyed by band type.
+        logger - Used to report the progress of each band.
+
+    Returns:
+        list - The statistics file names.
+    '''
+
+    stats_dir = os.path.join(work_dir, STATS_DIRECTORY)
+    if not os.path.isdir(stats_dir):
+        os.makedirs(stats_dir)
+
+    work_list = [(work_dir, img_filename, band_type)
+                 for (img_filename, band_type)
+                 in find_bands(work_dir, files_to_search_for)]
+
+    workers = statistics_workers(len(work_list))
+
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(processes=workers)
+        results = pool.imap_unordered(generate_band_statistics, work_list)
+    else:
+        results = (generate_band_statistics(x) for x in work_list)
+
+    filenames = list()
+    try:
+        for filename in results:
+            filenames.append(filename)
+            if logger is not None:
+                logger.info('Generated statistics [{0}] {1} of {2}'
+                            .format(os.path.basename(filename),
+                                    len(filenames), len(work_list)))
+
+        if pool is not None:
+            pool.close()
+    except Exception:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+
+    return sorted(filenames)
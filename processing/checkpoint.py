@@ -0,0 +1,294 @@
+'''
+Description: Provides checkpoints of the processing steps completed for a
+             product, so that a failed product can be resumed from the first
+             step which did not complete.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import settings
+import utilities
+
+
+def directory_manifest(directory):
+    '''
+    Description:
+        Returns the size and modification time of every file under the
+        directory, keyed by the path relative to the directory.
+    '''
+
+    manifest = dict()
+
+    for (dirpath, dirnames, filenames) in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            stat = os.lstat(path)
+            manifest[os.path.relpath(path, directory)] = [stat.st_size,
+                                                          stat.st_mtime]
+
+    return manifest
+
+
+def rollback_directory(directory, manifest):
+    '''
+    Description:
+        Removes the files under the directory which are not in the manifest,
+        along with the directories left empty which did not hold any of its
+        files.
+
+    Returns:
+        bool - True if the directory now matches the manifest, False if a
+               file in the manifest was changed or removed, which can not be
+               rolled back.
+    '''
+
+    kept_dirs = set()
+    for path in manifest:
+        path = os.path.dirname(path)
+        while path:
+            kept_dirs.add(path)
+            path = os.path.dirname(path)
+
+    for (dirpath, dirnames, filenames) in os.walk(directory, topdown=False):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.relpath(path, directory) not in manifest:
+                os.unlink(path)
+
+        for dirname in dirnames:
+            path = os.path.join(dirpath, dirname)
+            # Links to directories are not part of the manifest
+            if (not os.path.islink(path) and not os.listdir(path) and
+                    os.path.relpath(path, directory) not in kept_dirs):
+                os.rmdir(path)
+
+    return directory_manifest(directory) == manifest
+
+
+class CheckpointStore(object):
+    '''
+    Description:
+        Holds a checkpoint for each (order, product) being processed on the
+        node, as a JSON file named by the key.
+
+    Notes:
+        A checkpoint records the steps which completed, in order, along with
+        the manifest of the work directory after the last of them and the
+        processor state needed to continue.  The product directory of a
+        failed product is kept with its checkpoint, a checkpoint which has
+        not been updated within the TTL is considered abandoned and purged
+        along with its product directory.
+    '''
+
+    LOCK_FILENAME = '.lock'
+    CHECKPOINT_SUFFIX = '.json'
+
+    def __init__(self, checkpoint_dir, ttl_seconds):
+        '''
+        Description:
+            Initialization for the object.
+
+        Parameters:
+            checkpoint_dir - The directory to hold the checkpoints.
+            ttl_seconds - The age at which a checkpoint is purged.
+        '''
+
+        self.checkpoint_dir = os.path.abspath(checkpoint_dir)
+        self.ttl_seconds = ttl_seconds
+
+        utilities.create_directory(self.checkpoint_dir)
+
+    @contextmanager
+    def lock(self):
+        '''
+        Description:
+            Holds the lock for the whole store.
+        '''
+
+        with open(os.path.join(self.checkpoint_dir,
+                               self.LOCK_FILENAME), 'a') as lock_fd:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+    def checkpoint_path(self, key):
+        '''
+        Description:
+            Returns the full path to the checkpoint for the key.
+        '''
+
+        return os.path.join(self.checkpoint_dir,
+                            ''.join([key, self.CHECKPOINT_SUFFIX]))
+
+    def load(self, key):
+        '''
+        Description:
+            Returns the checkpoint for the key, or None if there is not a
+            usable one.
+        '''
+
+        try:
+            with open(self.checkpoint_path(key), 'r') as checkpoint_fd:
+                return json.load(checkpoint_fd)
+        except (IOError, ValueError):
+            return None
+
+    def save(self, key, checkpoint):
+        '''
+        Description:
+            Replaces the checkpoint for the key.
+
+        Notes:
+            Written under a temporary name and renamed into place, so a
+            partially written checkpoint is never loaded.
+        '''
+
+        (temp_fd, temp_path) = tempfile.mkstemp(prefix='.tmp-',
+                                                dir=self.checkpoint_dir)
+        try:
+            with os.fdopen(temp_fd, 'w') as checkpoint_fd:
+                json.dump(checkpoint, checkpoint_fd, sort_keys=True)
+
+            with self.lock():
+                os.rename(temp_path, self.checkpoint_path(key))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def complete_step(self, key, product_dir, work_dir, step_name,
+                      processor_state):
+        '''
+        Description:
+            Records that a step completed for the product.
+
+        Parameters:
+            key - Identifies the (order, product).
+            product_dir - The product directory kept for the checkpoint.
+            work_dir - The work directory the manifest is taken of.
+            step_name - The name of the step which completed.
+            processor_state - JSON serializable state of the processor which
+                              is needed by the remaining steps.
+        '''
+
+        checkpoint = self.load(key)
+        if checkpoint is None or checkpoint['product_dir'] != product_dir:
+            checkpoint = dict(product_dir=product_dir, steps=list())
+
+        if step_name not in checkpoint['steps']:
+            checkpoint['steps'].append(step_name)
+
+        checkpoint['manifest'] = directory_manifest(work_dir)
+        checkpoint['processor_state'] = processor_state
+
+        self.save(key, checkpoint)
+
+    def resume(self, key, product_dir, work_dir):
+        '''
+        Description:
+            Returns the checkpoint to resume the product from.
+
+        Notes:
+            The files a failed step left in the work directory are removed,
+            rolling it back to the manifest of the last completed step.
+
+        Returns:
+            dict - The checkpoint, when the work directory has been rolled
+                   back to the manifest of the last completed step.
+            None - The product must be processed from the start, any
+                   checkpoint for it has been removed.
+        '''
+
+        checkpoint = self.load(key)
+
+        if (checkpoint is not None and
+                checkpoint['product_dir'] == product_dir and
+                os.path.isdir(work_dir) and
+                rollback_directory(work_dir, checkpoint['manifest'])):
+            return checkpoint
+
+        self.remove(key)
+
+        return None
+
+    def remove(self, key):
+        '''
+        Description:
+            Removes the checkpoint for the key, if there is one.
+        '''
+
+        with self.lock():
+            try:
+                os.unlink(self.checkpoint_path(key))
+            except OSError:
+                pass
+
+    def purge(self):
+        '''
+        Description:
+            Removes the abandoned checkpoints and their product directories.
+
+        Returns:
+            list - The keys of the checkpoints which were purged.
+        '''
+
+        oldest = time.time() - self.ttl_seconds
+
+        purged = list()
+        with self.lock():
+            for filename in os.listdir(self.checkpoint_dir):
+                if (filename.startswith('.') or
+                        not filename.endswith(self.CHECKPOINT_SUFFIX)):
+                    continue
+
+                path = os.path.join(self.checkpoint_dir, filename)
+                try:
+                    if os.path.getmtime(path) >= oldest:
+                        continue
+                except OSError:
+                    continue
+
+                key = filename[:-len(self.CHECKPOINT_SUFFIX)]
+                checkpoint = self.load(key)
+                if checkpoint is not None:
+                    shutil.rmtree(checkpoint['product_dir'],
+                                  ignore_errors=True)
+
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+                purged.append(key)
+
+        return purged
+
+
+def get_checkpoint_store(cfg):
+    '''
+    Description:
+        Returns the checkpoint store, or None if checkpointing has not been
+        configured.
+    '''
+
+    if (not cfg.has_option('processing', 'espa_checkpoint_dir') or
+            not cfg.get('processing', 'espa_checkpoint_dir')):
+        return None
+
+    ttl_hours = settings.CHECKPOINT_TTL_HOURS
+    if cfg.has_option('processing', 'espa_checkpoint_ttl_hours'):
+        ttl_hours = cfg.getfloat('processing', 'espa_checkpoint_ttl_hours')
+
+    return CheckpointStore(cfg.get('processing', 'espa_checkpoint_dir'),
+                           int(ttl_hours * 60 * 60))
@@ -18,11 +18,13 @@ from logging_tools import EspaLogging
 from environment import Environment, DISTRIBUTION_METHOD_LOCAL
 from espa_exception import ESPAException
 import sensor
+import packaging
+import remote_session
 import transfer
 
 
 def package_product(immutability, source_directory, destination_directory,
-                    product_name):
+                    product_name, gzip_workers=1):
     '''
     Description:
       Package the contents of the source directory into a gzipped tarball
@@ -31,6 +33,8 @@ def package_product(immutability, source_directory, destination_directory,
 
       The filename will be prefixed with the specified product name.
 
+      More than one gzip worker compresses the tarball in parallel.
+
     Returns:
       product_full_path - The full path to the product including filename
       cksum_full_path - The full path to the check sum including filename
@@ -55,7 +59,8 @@ def package_product(immutability, source_directory, destination_directory,
 
     # Change the attributes on the files so that we can remove them
     if immutability:
-        cmd = ' '.join(['sudo', 'chattr', '-if', filename, cksum_filename])
+        cmd = ['sudo', 'chattr', '-if'] + glob.glob(filename)
+        cmd.append(cksum_filename)
         output = ''
         try:
             output = utilities.execute_cmd(cmd)
@@ -66,7 +71,7 @@ def package_product(immutability, source_directory, destination_directory,
                 logger.info(output)
 
     # Remove the file first just in-case this is a second run
-    cmd = ' '.join(['rm', '-f', filename])
+    cmd = ['rm', '-f'] + glob.glob(filename)
     output = ''
     try:
         output = utilities.execute_cmd(cmd)
@@ -86,33 +91,18 @@ def package_product(immutability, source_directory, destination_directory,
         # Grab the files to tar and gzip
         product_files = glob.glob("*")
 
-        # Execute tar with zipping, the full/path/*.tar.gz name is returned
-        product_full_path = utilities.tar_files(product_full_path,
-                                                product_files, gzip=True)
+        # Tar, gzip, checksum, and verify the files in a single pass
+        product_full_path = '%s.tar.gz' % product_full_path
+        (cksum, members) = packaging.tar_gzip_files(product_full_path,
+                                                    product_files,
+                                                    workers=gzip_workers)
+        logger.info('\n'.join(members))
 
         # Change file permissions
         logger.info("Changing file permissions on %s to 0644"
                     % product_full_path)
         os.chmod(product_full_path, 0644)
 
-        # Verify that the archive is good
-        output = ''
-        cmd = ' '.join(['tar', '-tf', product_full_path])
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                logger.info(output)
-
-        # If it was good create a checksum file
-        cksum_output = ''
-        cmd = ' '.join([settings.ESPA_CHECKSUM_TOOL, product_full_path])
-        try:
-            cksum_output = utilities.execute_cmd(cmd)
-        finally:
-            if len(cksum_output) > 0:
-                logger.info(cksum_output)
-
         # Get the base filename of the file that was checksum'd
         cksum_prod_filename = os.path.basename(product_full_path)
 
@@ -120,9 +110,7 @@ def package_product(immutability, source_directory, destination_directory,
         logger.debug("Checksum'd file = %s" % cksum_prod_filename)
 
         # Make sure they are strings
-        cksum_values = cksum_output.split()
-        cksum_value = "%s %s" % (str(cksum_values[0]),
-                                 str(cksum_prod_filename))
+        cksum_value = "%s %s" % (str(cksum), str(cksum_prod_filename))
         logger.info("Generating cksum: %s" % cksum_value)
 
         cksum_full_path = os.path.join(destination_directory, cksum_filename)
@@ -141,13 +129,13 @@ def package_product(immutability, source_directory, destination_directory,
     return (product_full_path, cksum_full_path, cksum_value)
 
 
-def transfer_product(immutability, destination_host, destination_directory,
+def transfer_product(immutability, session, destination_directory,
                      destination_username, destination_pw,
                      product_filename, cksum_filename):
     '''
     Description:
       Transfers the product and associated checksum to the specified directory
-      on the destination host
+      on the destination host of the session
 
     Returns:
       cksum_value - The check sum value from the destination
@@ -156,20 +144,22 @@ def transfer_product(immutability, destination_host, destination_directory,
     Note:
       - It is assumed ssh has been setup for access between the localhost
         and destination system
+      - All of the commands and transfers share the session's connection
     '''
 
     logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
+    destination_host = session.host
+
     # Create the destination directory on the destination host
     logger.info("Creating destination directory %s on %s"
                 % (destination_directory, destination_host))
-    cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                    destination_host, 'mkdir', '-p', destination_directory])
+    cmd = ['mkdir', '-p', destination_directory]
 
     output = ''
     try:
-        logger.debug(' '.join(["mkdir cmd:", cmd]))
-        output = utilities.execute_cmd(cmd)
+        logger.debug(' '.join(["mkdir cmd:"] + cmd))
+        output = session.run(cmd)
     finally:
         if len(output) > 0:
             logger.info(output)
@@ -188,13 +178,11 @@ def transfer_product(immutability, destination_host, destination_directory,
 
     # Change the attributes on the files so that we can remove them
     if immutability:
-        cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                        destination_host, 'sudo', 'chattr', '-if',
-                        remote_filename])
+        cmd = ['sudo', 'chattr', '-if', remote_filename]
         output = ''
         try:
-            logger.debug(' '.join(["chattr remote file cmd:", cmd]))
-            output = utilities.execute_cmd(cmd)
+            logger.debug(' '.join(["chattr remote file cmd:"] + cmd))
+            output = session.run(cmd)
         except Exception:
             pass
         finally:
@@ -202,49 +190,44 @@ def transfer_product(immutability, destination_host, destination_directory,
                 logger.info(output)
 
     # Remove the files on the remote system
-    cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                    destination_host, 'rm', '-f', remote_filename])
+    cmd = ['rm', '-f', remote_filename]
     output = ''
     try:
-        logger.debug(' '.join(["rm remote file cmd:", cmd]))
-        output = utilities.execute_cmd(cmd)
+        logger.debug(' '.join(["rm remote file cmd:"] + cmd))
+        output = session.run(cmd)
     finally:
         if len(output) > 0:
             logger.info(output)
 
     # Transfer the checksum file
-    transfer.transfer_file('localhost', cksum_filename, destination_host,
-                           destination_cksum_file,
-                           destination_username=destination_username,
-                           destination_pw=destination_pw)
+    transfer.transfer_file_session(session, cksum_filename,
+                                   destination_cksum_file,
+                                   destination_username=destination_username,
+                                   destination_pw=destination_pw)
 
     # Transfer the product file
-    transfer.transfer_file('localhost', product_filename, destination_host,
-                           destination_product_file,
-                           destination_username=destination_username,
-                           destination_pw=destination_pw)
+    transfer.transfer_file_session(session, product_filename,
+                                   destination_product_file,
+                                   destination_username=destination_username,
+                                   destination_pw=destination_pw)
 
     # Change the attributes on the files so that we can't remove them
     if immutability:
-        cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                        destination_host, 'sudo', 'chattr', '+i',
-                        remote_filename])
+        cmd = ['sudo', 'chattr', '+i', remote_filename]
         output = ''
         try:
-            logger.debug(' '.join(["chattr remote file cmd:", cmd]))
-            output = utilities.execute_cmd(cmd)
+            logger.debug(' '.join(["chattr remote file cmd:"] + cmd))
+            output = session.run(cmd)
         finally:
             if len(output) > 0:
                 logger.info(output)
 
     # Get the remote checksum value
     cksum_value = ''
-    cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                    destination_host, settings.ESPA_CHECKSUM_TOOL,
-                    destination_product_file])
+    cmd = [settings.ESPA_CHECKSUM_TOOL, destination_product_file]
     try:
-        logger.debug(' '.join(["ssh cmd:", cmd]))
-        cksum_value = utilities.execute_cmd(cmd)
+        logger.debug(' '.join(["checksum cmd:"] + cmd))
+        cksum_value = session.run(cmd)
     except Exception:
         if len(cksum_value) > 0:
             logger.error(cksum_value)
@@ -253,19 +236,54 @@ def transfer_product(immutability, destination_host, destination_directory,
     return (cksum_value, destination_product_file, destination_cksum_file)
 
 
+def remote_checksum_manifest(session, remote_files):
+    '''
+    Description:
+      Generates the checksums of the files on the destination host of the
+      session with a single command.
+
+    Returns:
+      dict - The checksum value keyed by the full path on the destination.
+             Files which could not be checksummed are not included.
+    '''
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    if not remote_files:
+        return dict()
+
+    # Report missing files as mismatches instead of failing the command.
+    # The fallback is part of the remote command, so a failure to reach the
+    # destination host still raises instead of returning an empty manifest.
+    cmd = [settings.ESPA_CHECKSUM_TOOL]
+    cmd.extend(remote_files)
+    cmd.extend(['2>', '/dev/null', '||', 'true'])
+
+    logger.debug(' '.join(["checksum cmd:"] + cmd))
+    output = session.run(cmd)
+
+    manifest = dict()
+    for line in output.splitlines():
+        parts = line.split(None, 1)
+        if len(parts) == 2:
+            manifest[parts[1].strip()] = parts[0]
+
+    return manifest
+
+
 def distribute_statistics_remote(immutability, product_id, source_path,
-                                 destination_host, destination_path,
+                                 session, destination_path,
                                  destination_username, destination_pw):
     '''
     Description:
       Transfers the statistics to the specified directory on the destination
-      host
+      host of the session
 
     Parameters:
         product_id - The unique product ID associated with the files.
         source_path - The full path to where the statistics files to
                       distribute reside.
-        destination_host - The hostname/url for where to distribute the files.
+        session - The remote session for the destination host.
         destination_path - The full path on the local system to copy the
                            statistics files into.
         destination_username - The user name to use for FTP
@@ -279,11 +297,16 @@ def distribute_statistics_remote(immutability, product_id, source_path,
 
     logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
+    destination_host = session.host
+
     d_name = 'stats'
 
     # Save the current directory location
     current_directory = os.getcwd()
 
+    # The statistics files to send again, after a failed verification
+    resend_files = None
+
     # Attempt X times sleeping between each attempt
     attempt = 0
     sleep_seconds = settings.DEFAULT_SLEEP_SECONDS
@@ -296,99 +319,87 @@ def distribute_statistics_remote(immutability, product_id, source_path,
             stats_files = os.path.join(d_name, stats_wildcard)
             remote_stats_wildcard = os.path.join(stats_path, stats_wildcard)
 
-            # Create the statistics directory on the destination host
-            logger.info("Creating directory {0} on {1}".
-                        format(stats_path, destination_host))
-            cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                            destination_host, 'mkdir', '-p', stats_path])
+            if resend_files is None:
+                # Create the statistics directory on the destination host
+                logger.info("Creating directory {0} on {1}".
+                            format(stats_path, destination_host))
+                cmd = ['mkdir', '-p', stats_path]
 
-            output = ''
-            try:
-                logger.debug(' '.join(["mkdir cmd:", cmd]))
-                output = utilities.execute_cmd(cmd)
-            finally:
-                if len(output) > 0:
-                    logger.info(output)
+                output = ''
+                try:
+                    logger.debug(' '.join(["mkdir cmd:"] + cmd))
+                    output = session.run(cmd)
+                finally:
+                    if len(output) > 0:
+                        logger.info(output)
 
-            # Change the attributes on the files so that we can remove them
-            if immutability:
-                cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                                destination_host, 'sudo', 'chattr', '-if',
-                                remote_stats_wildcard])
+                # Change the attributes on the files so that we can remove
+                # them
+                if immutability:
+                    cmd = ['sudo', 'chattr', '-if', remote_stats_wildcard]
+                    output = ''
+                    try:
+                        logger.debug(' '.join(["chattr remote stats cmd:"] +
+                                              cmd))
+                        output = session.run(cmd)
+                    except Exception:
+                        pass
+                    finally:
+                        if len(output) > 0:
+                            logger.info(output)
+
+                # Remove any pre-existing statistics
+                cmd = ['rm', '-f', remote_stats_wildcard]
                 output = ''
                 try:
-                    logger.debug(' '.join(["chattr remote stats cmd:", cmd]))
-                    output = utilities.execute_cmd(cmd)
-                except Exception:
-                    pass
+                    logger.debug(' '.join(["rm remote stats cmd:"] + cmd))
+                    output = session.run(cmd)
                 finally:
                     if len(output) > 0:
                         logger.info(output)
 
-            # Remove any pre-existing statistics
-            cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                            destination_host, 'rm', '-f',
-                            remote_stats_wildcard])
-            output = ''
-            try:
-                logger.debug(' '.join(["rm remote stats cmd:", cmd]))
-                output = utilities.execute_cmd(cmd)
-            finally:
-                if len(output) > 0:
-                    logger.info(output)
+                # Transfer the stats statistics
+                transfer.transfer_file_session(
+                    session, stats_files, stats_path,
+                    destination_username=destination_username,
+                    destination_pw=destination_pw)
 
-            # Transfer the stats statistics
-            transfer.transfer_file('localhost', stats_files, destination_host,
-                                   stats_path,
-                                   destination_username=destination_username,
-                                   destination_pw=destination_pw)
+                # Generate the local checksum values
+                local_cksums = dict((file_name,
+                                     utilities.checksum_file(file_name))
+                                    for file_name in glob.glob(stats_files))
+            else:
+                # Only transfer the statistics which failed verification
+                for file_name in resend_files:
+                    transfer.transfer_file_session(
+                        session, file_name, stats_path,
+                        destination_username=destination_username,
+                        destination_pw=destination_pw)
 
             logger.info("Verifying statistics transfers")
-            # NOTE - Re-purposing the stats_files variable
-            stats_files = glob.glob(stats_files)
-            for file_name in stats_files:
-                local_cksum_value = 'a b'
-                remote_cksum_value = 'b c'
-
-                # Generate a local checksum value
-                cmd = ' '.join([settings.ESPA_CHECKSUM_TOOL, file_name])
-                try:
-                    logger.debug(' '.join(["checksum cmd:", cmd]))
-                    local_cksum_value = utilities.execute_cmd(cmd)
-                except Exception:
-                    if len(local_cksum_value) > 0:
-                        logger.error(local_cksum_value)
-                    raise
-
-                # Generate a remote checksum value
-                remote_file = os.path.join(destination_path, file_name)
-                cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                                destination_host, settings.ESPA_CHECKSUM_TOOL,
-                                remote_file])
-                try:
-                    remote_cksum_value = utilities.execute_cmd(cmd)
-                except Exception:
-                    if len(remote_cksum_value) > 0:
-                        logger.error(remote_cksum_value)
-                    raise
-
-                # Checksum validation
-                if (local_cksum_value.split()[0] !=
-                        remote_cksum_value.split()[0]):
-                    raise ESPAException("Failed checksum validation between"
-                                        " %s and %s:%s" % (file_name,
-                                                           destination_host,
-                                                           remote_file))
+            remote_files = dict((os.path.join(destination_path, file_name),
+                                 file_name)
+                                for file_name in local_cksums)
+            remote_cksums = remote_checksum_manifest(session,
+                                                     sorted(remote_files))
+
+            # Checksum validation
+            resend_files = sorted(
+                file_name for (remote_file, file_name) in remote_files.items()
+                if remote_cksums.get(remote_file) != local_cksums[file_name])
+            if resend_files:
+                raise ESPAException("Failed checksum validation between"
+                                    " %s and %s:%s"
+                                    % (', '.join(resend_files),
+                                       destination_host, stats_path))
 
             # Change the attributes on the files so that we can't remove them
             if immutability:
-                cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                                destination_host, 'sudo', 'chattr', '+i',
-                                remote_stats_wildcard])
+                cmd = ['sudo', 'chattr', '+i', remote_stats_wildcard]
                 output = ''
                 try:
-                    logger.debug(' '.join(["chattr remote stats cmd:", cmd]))
-                    output = utilities.execute_cmd(cmd)
+                    logger.debug(' '.join(["chattr remote stats cmd:"] + cmd))
+                    output = session.run(cmd)
                 finally:
                     if len(output) > 0:
                         logger.info(output)
@@ -448,7 +459,7 @@ def distribute_statistics_local(immutability, product_id, source_path,
 
         # Change the attributes on the files so that we can remove them
         if immutability:
-            cmd = ' '.join(['sudo', 'chattr', '-if', dest_stats_wildcard])
+            cmd = ['sudo', 'chattr', '-if'] + glob.glob(dest_stats_wildcard)
             output = ''
             try:
                 output = utilities.execute_cmd(cmd)
@@ -459,7 +470,7 @@ def distribute_statistics_local(immutability, product_id, source_path,
                     logger.info(output)
 
         # Remove any pre-existing statistics for this product ID
-        cmd = ' '.join(['rm', '-f', dest_stats_wildcard])
+        cmd = ['rm', '-f'] + glob.glob(dest_stats_wildcard)
         output = ''
         try:
             output = utilities.execute_cmd(cmd)
@@ -477,7 +488,7 @@ def distribute_statistics_local(immutability, product_id, source_path,
 
         # Change the attributes on the files so that we can't remove them
         if immutability:
-            cmd = ' '.join(['sudo', 'chattr', '+i', dest_stats_wildcard])
+            cmd = ['sudo', 'chattr', '+i'] + glob.glob(dest_stats_wildcard)
             output = ''
             try:
                 output = utilities.execute_cmd(cmd)
@@ -496,7 +507,8 @@ def distribute_statistics_local(immutability, product_id, source_path,
 
 
 def distribute_product_remote(immutability, product_name, source_path,
-                              packaging_path, cache_path, parms):
+                              packaging_path, cache_path, parms,
+                              parallel_gzip=False):
 
     logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
@@ -514,6 +526,8 @@ def distribute_product_remote(immutability, product_name, source_path,
     max_package_attempts = settings.MAX_PACKAGING_ATTEMPTS
     max_delivery_attempts = settings.MAX_DELIVERY_ATTEMPTS
 
+    gzip_workers = packaging.gzip_workers(parallel_gzip)
+
     attempt = 0
     product_file = 'ERROR'
     cksum_file = 'ERROR'
@@ -528,7 +542,8 @@ def distribute_product_remote(immutability, product_name, source_path,
                      local_cksum_value) = package_product(immutability,
                                                           source_path,
                                                           packaging_path,
-                                                          product_name)
+                                                          product_name,
+                                                          gzip_workers)
                 except Exception:
                     logger.exception("An exception occurred processing %s"
                                      % product_name)
@@ -540,27 +555,30 @@ def distribute_product_remote(immutability, product_name, source_path,
                         raise
                 break
 
-            # Distribute the product
+            # Distribute the product, sharing one connection to the
+            # destination host between all of the sub_attempts
             # Attempt X times sleeping between each sub_attempt
-            sub_attempt = 0
-            while True:
-                try:
-                    (remote_cksum_value, product_file, cksum_file) = \
-                        transfer_product(immutability, destination_host,
-                                         cache_path,
-                                         opts['destination_username'],
-                                         opts['destination_pw'],
-                                         product_full_path, cksum_full_path)
-                except Exception:
-                    logger.exception("An exception occurred processing %s"
-                                     % product_name)
-                    if sub_attempt < max_delivery_attempts:
-                        sleep(sleep_seconds)  # sleep before trying again
-                        sub_attempt += 1
-                        continue
-                    else:
-                        raise
-                break
+            with remote_session.open_session(destination_host) as session:
+                sub_attempt = 0
+                while True:
+                    try:
+                        (remote_cksum_value, product_file, cksum_file) = \
+                            transfer_product(immutability, session,
+                                             cache_path,
+                                             opts['destination_username'],
+                                             opts['destination_pw'],
+                                             product_full_path,
+                                             cksum_full_path)
+                    except Exception:
+                        logger.exception("An exception occurred processing"
+                                         " %s" % product_name)
+                        if sub_attempt < max_delivery_attempts:
+                            sleep(sleep_seconds)  # sleep before trying again
+                            sub_attempt += 1
+                            continue
+                        else:
+                            raise
+                    break
 
             # Checksum validation
             if local_cksum_value.split()[0] != remote_cksum_value.split()[0]:
@@ -589,7 +607,7 @@ def distribute_product_remote(immutability, product_name, source_path,
 
 
 def distribute_product_local(immutability, product_name, source_path,
-                             packaging_path):
+                             packaging_path, parallel_gzip=False):
 
     logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
@@ -599,6 +617,8 @@ def distribute_product_local(immutability, product_name, source_path,
     max_number_of_attempts = settings.MAX_DISTRIBUTION_ATTEMPTS
     max_package_attempts = settings.MAX_PACKAGING_ATTEMPTS
 
+    gzip_workers = packaging.gzip_workers(parallel_gzip)
+
     attempt = 0
     product_file = 'ERROR'
     cksum_file = 'ERROR'
@@ -614,13 +634,14 @@ def distribute_product_local(immutability, product_name, source_path,
                      local_cksum_value) = package_product(immutability,
                                                           source_path,
                                                           packaging_path,
-                                                          product_name)
+                                                          product_name,
+                                                          gzip_workers)
 
                     # Change the attributes on the files so that we can't
                     # remove them
                     if immutability:
-                        cmd = ' '.join(['sudo', 'chattr', '+i', product_file,
-                                        cksum_file])
+                        cmd = ['sudo', 'chattr', '+i', product_file,
+                               cksum_file]
                         output = utilities.execute_cmd(cmd)
                         if len(output) > 0:
                             logger.info(output)
@@ -713,15 +734,16 @@ def distribute_statistics(immutability, source_path, packaging_path, parms):
         dest_user = options['destination_username']
         dest_pw = options['destination_pw']
 
-        distribute_statistics_remote(immutability, product_id, source_path,
-                                     destination_host, cache_path,
-                                     dest_user, dest_pw)
+        with remote_session.open_session(destination_host) as session:
+            distribute_statistics_remote(immutability, product_id,
+                                         source_path, session, cache_path,
+                                         dest_user, dest_pw)
 
     return (product_file, cksum_file)
 
 
 def distribute_product(immutability, product_name, source_path,
-                       packaging_path, parms):
+                       packaging_path, parms, parallel_gzip=False):
     '''
     Description:
         Determines if the distribution method is set to local or remote and
@@ -741,6 +763,8 @@ def distribute_product(immutability, product_name, source_path,
         package_dir - The full path on the local system for where the packaged
                       product should be placed under.
         parms - All the user and system defined parameters.
+        parallel_gzip - Wether or not to compress the product with multiple
+                        processes.
     '''
 
     env = Environment()
@@ -771,7 +795,8 @@ def distribute_product(immutability, product_name, source_path,
             distribute_product_local(immutability,
                                      product_name,
                                      source_path,
-                                     package_path)
+                                     package_path,
+                                     parallel_gzip=parallel_gzip)
 
     else:  # remote
         # Use the remote cache path
@@ -784,6 +809,7 @@ def distribute_product(immutability, product_name, source_path,
                                       source_path,
                                       packaging_path,
                                       cache_path,
-                                      parms)
+                                      parms,
+                                      parallel_gzip=parallel_gzip)
 
     return (product_file, cksum_file)
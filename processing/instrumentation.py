@@ -0,0 +1,174 @@
+'''
+Description: Provides timing and resource usage records for the steps of the
+             product processing.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import os
+import json
+import time
+import fcntl
+import resource
+
+import utilities
+
+
+def process_io():
+    '''
+    Description:
+        Returns the bytes read from and written to storage by this process,
+        from /proc/self/io.  They include the child processes which have been
+        waited on.
+
+    Returns:
+        dict - With read_bytes and write_bytes, which are zero when the
+               counters are not available.
+    '''
+
+    counters = dict(read_bytes=0, write_bytes=0)
+
+    try:
+        with open('/proc/self/io', 'r') as io_fd:
+            for line in io_fd:
+                (name, value) = line.split(':', 1)
+                if name in counters:
+                    counters[name] = int(value)
+    except (IOError, ValueError):
+        pass
+
+    return counters
+
+
+def usage_snapshot(work_dir):
+    '''
+    Description:
+        Captures the current resource counters.
+
+    Notes:
+        The child counters only include the child processes which have been
+        waited on.  The work directory is only measured when one is given,
+        since it is walked in full.
+    '''
+
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    process = resource.getrusage(resource.RUSAGE_SELF)
+    io_counters = process_io()
+
+    work_dir_size = None
+    if work_dir is not None and os.path.isdir(work_dir):
+        work_dir_size = utilities.current_disk_usage(work_dir)
+
+    return {
+        'wall': time.time(),
+        'cpu': process.ru_utime + process.ru_stime,
+        'child_cpu': children.ru_utime + children.ru_stime,
+        'child_maxrss': children.ru_maxrss,
+        'read_bytes': io_counters['read_bytes'],
+        'write_bytes': io_counters['write_bytes'],
+        'work_dir_size': work_dir_size
+    }
+
+
+def step_record(step_name, entity, before, after, status, aggregate=False):
+    '''
+    Description:
+        Builds the record for a step from the counters captured before and
+        after it.
+
+    Notes:
+        The child peak RSS is the largest of all of the children waited on
+        so far, it is only reported when it grew during the step.  An
+        aggregate step contains other steps which have their own records,
+        so it must not be added to them.
+    '''
+
+    child_peak_rss_kb = None
+    if after['child_maxrss'] > before['child_maxrss']:
+        child_peak_rss_kb = after['child_maxrss']
+
+    work_dir_delta_bytes = None
+    if (before['work_dir_size'] is not None and
+            after['work_dir_size'] is not None):
+        work_dir_delta_bytes = (after['work_dir_size'] -
+                                before['work_dir_size'])
+
+    record = dict(entity)
+    record.update({
+        'step': step_name,
+        'status': status,
+        'aggregate': aggregate,
+        'wall_seconds': round(after['wall'] - before['wall'], 3),
+        'cpu_seconds': round(after['cpu'] - before['cpu'], 3),
+        'child_cpu_seconds': round(after['child_cpu'] - before['child_cpu'],
+                                   3),
+        'child_peak_rss_kb': child_peak_rss_kb,
+        'read_bytes': after['read_bytes'] - before['read_bytes'],
+        'write_bytes': after['write_bytes'] - before['write_bytes'],
+        'work_dir_delta_bytes': work_dir_delta_bytes
+    })
+
+    return record
+
+
+def write_record(record_filename, record):
+    '''
+    Description:
+        Append a record to the JSON lines file, which may be shared by all
+        of the mappers on the node.
+    '''
+
+    line = ''.join([json.dumps(record, sort_keys=True), '\n'])
+
+    with open(record_filename, 'a') as record_fd:
+        fcntl.flock(record_fd, fcntl.LOCK_EX)
+        try:
+            record_fd.write(line)
+        finally:
+            fcntl.flock(record_fd, fcntl.LOCK_UN)
+
+
+def record_step(step_name, method, entity, work_dir, logger,
+                record_filename=None, records=None, aggregate=False):
+    '''
+    Description:
+        Execute a processing step, recording its timing and resource usage.
+
+    Parameters:
+        step_name - The name of the step for the record.
+        method - The step to execute.
+        entity - Identifies the scene, included in the record.
+        work_dir - The work directory to measure the size change of, or
+                   None to not measure it.
+        logger - The record is always logged.
+        record_filename - Also append the record to this JSON lines file.
+        records - Also append the record to this list.
+        aggregate - The step contains other recorded steps.
+
+    Returns:
+        The value returned by the step.
+    '''
+
+    before = usage_snapshot(work_dir)
+
+    status = 'error'
+    try:
+        result = method()
+        status = 'success'
+        return result
+    finally:
+        record = step_record(step_name, entity, before,
+                             usage_snapshot(work_dir), status, aggregate)
+
+        logger.info('*** STEP RESOURCES {} ***'
+                    .format(json.dumps(record, sort_keys=True)))
+
+        if records is not None:
+            records.append(record)
+
+        if record_filename:
+            try:
+                write_record(record_filename, record)
+            except Exception:
+                logger.exception('Unable to write the step resources')
@@ -0,0 +1,350 @@
+'''
+Description: Provides a size limited cache of files and directories which is
+             local to the node and shared by the processes running on it.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import os
+import fcntl
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import utilities
+
+
+class LocalCache(object):
+    '''
+    Description:
+        Each entry is a file or directory directly under the cache directory
+        named by its key.
+
+    Notes:
+        Entries are built under a temporary name and renamed into place, so
+        an entry is never seen partially populated.  Access is serialized
+        between processes with lock files in the cache directory, which are
+        only held briefly.  An entry in use is pinned with a shared lock on
+        its pin file, so it is not evicted while the cache lock is released.
+        The modification time of an entry is updated whenever it is used,
+        and the least recently used entries which are not pinned are evicted
+        to stay under the size limit.  The size of each entry is recorded
+        when it is added, so eviction does not need to walk the entries.
+        A process adding an entry holds a lock on its temporary directory,
+        so the temporary directories left by killed processes are found and
+        removed.
+    '''
+
+    LOCK_FILENAME = '.lock'
+    KEY_LOCK_PREFIX = '.lock-'
+    PIN_PREFIX = '.pin-'
+    SIZE_PREFIX = '.size-'
+    TEMP_PREFIX = '.tmp-'
+
+    def __init__(self, cache_dir, max_bytes):
+        '''
+        Description:
+            Initialization for the object.
+
+        Parameters:
+            cache_dir - The directory to hold the cache.
+            max_bytes - The maximum size the cache is allowed to grow to.
+        '''
+
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+
+        utilities.create_directory(self.cache_dir)
+
+    @contextmanager
+    def _lock_file(self, filename):
+        '''
+        Description:
+            Holds an exclusive lock on the specified lock file.
+        '''
+
+        with open(os.path.join(self.cache_dir, filename), 'a') as lock_fd:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+    def lock(self):
+        '''
+        Description:
+            Holds the lock for the whole cache.
+        '''
+
+        return self._lock_file(self.LOCK_FILENAME)
+
+    def key_lock(self, key):
+        '''
+        Description:
+            Holds the lock for a single key, without blocking access to the
+            other entries.  Used to keep more than one process from building
+            the same entry.
+        '''
+
+        return self._lock_file(''.join([self.KEY_LOCK_PREFIX, key]))
+
+    def entry_path(self, key):
+        '''
+        Description:
+            Returns the full path to the entry for the key.
+        '''
+
+        return os.path.join(self.cache_dir, key)
+
+    def retrieve(self, key, handler):
+        '''
+        Description:
+            Provides the entry to the handler if it is in the cache.
+
+        Returns:
+            True - The entry was found and given to the handler
+            False - The entry is not in the cache
+
+        Parameters:
+            key - The key for the entry.
+            handler - Called with the full path to the entry while it is
+                      pinned, so that it is not evicted during use.  The
+                      cache lock is not held, so other processes may use
+                      the cache meanwhile.
+        '''
+
+        path = self.entry_path(key)
+
+        with self.lock():
+            if not os.path.exists(path):
+                return False
+
+            # Mark it as recently used
+            os.utime(path, None)
+
+            pin_fd = open(self._pin_path(key), 'a')
+            fcntl.flock(pin_fd, fcntl.LOCK_SH)
+
+        try:
+            handler(path)
+        finally:
+            fcntl.flock(pin_fd, fcntl.LOCK_UN)
+            pin_fd.close()
+
+        return True
+
+    def populate(self, key, builder):
+        '''
+        Description:
+            Adds an entry to the cache.
+
+        Parameters:
+            key - The key for the entry.
+            builder - Called with a temporary path in the cache directory,
+                      where it must create the file or directory for the
+                      entry.
+        '''
+
+        with self.lock():
+            orphans = self._orphaned_temp_dirs()
+
+            temp_dir = tempfile.mkdtemp(prefix=self.TEMP_PREFIX,
+                                        dir=self.cache_dir)
+            temp_fd = os.open(temp_dir, os.O_RDONLY)
+            fcntl.flock(temp_fd, fcntl.LOCK_EX)
+
+        for orphan in orphans:
+            shutil.rmtree(orphan, ignore_errors=True)
+
+        evicted = list()
+        try:
+            temp_path = os.path.join(temp_dir, key)
+
+            builder(temp_path)
+
+            size = self._entry_size(temp_path)
+
+            with self.lock():
+                path = self.entry_path(key)
+                if os.path.exists(path):
+                    # Someone else already provided it
+                    os.utime(path, None)
+                else:
+                    with open(self._size_path(key), 'w') as size_fd:
+                        size_fd.write(str(size))
+                    os.rename(temp_path, path)
+
+                evicted = self._evict(keep=key)
+
+        finally:
+            # Removed without the cache lock held
+            for evicted_path in evicted + [temp_dir]:
+                shutil.rmtree(evicted_path, ignore_errors=True)
+            os.close(temp_fd)
+
+    def remove(self, key):
+        '''
+        Description:
+            Removes an entry from the cache, unless another process is using
+            it.
+
+        Returns:
+            True - The entry is no longer in the cache
+            False - The entry is in use, so it was not removed
+        '''
+
+        with self.lock():
+            if not os.path.exists(self.entry_path(key)):
+                return True
+
+            discarded = self._discard(key)
+
+        if discarded is None:
+            return False
+
+        shutil.rmtree(discarded, ignore_errors=True)
+
+        return True
+
+    def _orphaned_temp_dirs(self):
+        '''
+        Description:
+            Returns the temporary directories which are not locked by the
+            process using them, because it was killed.  Must be called with
+            the cache lock held.
+        '''
+
+        orphans = list()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if (not name.startswith(self.TEMP_PREFIX) or
+                    not os.path.isdir(path)):
+                continue
+
+            temp_fd = os.open(path, os.O_RDONLY)
+            try:
+                fcntl.flock(temp_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                orphans.append(path)
+            except IOError:
+                # In use
+                pass
+            finally:
+                os.close(temp_fd)
+
+        return orphans
+
+    def _discard(self, key):
+        '''
+        Description:
+            Moves an entry which is not pinned aside, so it can be removed
+            once the cache lock is released.  Must be called with the cache
+            lock held.
+
+        Returns:
+            str - The temporary directory the entry was moved to.
+            None - The entry is pinned by another process.
+        '''
+
+        with open(self._pin_path(key), 'a') as pin_fd:
+            try:
+                fcntl.flock(pin_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                # In use by another process
+                return None
+
+            trash_dir = tempfile.mkdtemp(prefix=self.TEMP_PREFIX,
+                                         dir=self.cache_dir)
+            os.rename(self.entry_path(key), os.path.join(trash_dir, key))
+
+            for path in [self._pin_path(key), self._size_path(key)]:
+                if os.path.exists(path):
+                    os.unlink(path)
+
+        return trash_dir
+
+    def _pin_path(self, key):
+        '''
+        Description:
+            Returns the full path to the pin file for the key.
+        '''
+
+        return os.path.join(self.cache_dir, ''.join([self.PIN_PREFIX, key]))
+
+    def _size_path(self, key):
+        '''
+        Description:
+            Returns the full path to the recorded size for the key.
+        '''
+
+        return os.path.join(self.cache_dir, ''.join([self.SIZE_PREFIX, key]))
+
+    def _entry_size(self, path):
+        '''
+        Description:
+            Returns the size of a file or directory entry.
+        '''
+
+        if os.path.isdir(path):
+            return utilities.current_disk_usage(path)
+
+        return os.path.getsize(path)
+
+    def _recorded_size(self, key):
+        '''
+        Description:
+            Returns the size recorded for an entry when it was added.
+        '''
+
+        try:
+            with open(self._size_path(key), 'r') as size_fd:
+                return int(size_fd.read())
+        except (IOError, ValueError):
+            size = self._entry_size(self.entry_path(key))
+            with open(self._size_path(key), 'w') as size_fd:
+                size_fd.write(str(size))
+            return size
+
+    def _evict(self, keep=None):
+        '''
+        Description:
+            Removes the least recently used entries which are not pinned,
+            until the cache is under the size limit.  Must be called with
+            the cache lock held.
+
+        Parameters:
+            keep - The key of an entry which must not be removed.
+
+        Returns:
+            list - The temporary directories the evicted entries were moved
+                   to, which the caller must remove once the cache lock is
+                   released.
+        '''
+
+        entries = list()
+        total_bytes = 0
+        for name in os.listdir(self.cache_dir):
+            if name.startswith('.'):
+                continue
+
+            size = self._recorded_size(name)
+            entries.append((os.path.getmtime(self.entry_path(name)), name,
+                            size))
+            total_bytes += size
+
+        evicted = list()
+        for (mtime, name, size) in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+
+            if name == keep:
+                continue
+
+            trash_dir = self._discard(name)
+            if trash_dir is None:
+                continue
+
+            evicted.append(trash_dir)
+            total_bytes -= size
+
+        return evicted
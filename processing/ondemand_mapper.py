@@ -11,8 +11,8 @@ import sys
 import shutil
 import socket
 import json
-import datetime
-from time import sleep
+import multiprocessing
+from functools import partial
 from argparse import ArgumentParser
 
 # local objects and methods
@@ -25,6 +25,9 @@ from logging_tools import EspaLogging
 from environment import Environment
 import parameters
 import processor
+import instrumentation
+import runtime_db
+import rate_limiter
 
 import api_interface
 
@@ -38,77 +41,133 @@ MAPPER_LOG_FILENAME = '.'.join([MAPPER_LOG_PREFIX, 'log'])
 def set_product_error(server, order_id, product_id, processing_location):
     """Call the API server routine to set a product request to error
 
-    Provides a sleep retry implementation to hopefully by-pass any errors
-    encountered, so that we do not get requests that have failed, but
-    show a status of processing.
+    The API server tries the call again when it fails, so that we do not get
+    requests that have failed, but show a status of processing.
     """
 
     if server is not None:
         logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
-        attempt = 0
-        sleep_seconds = settings.DEFAULT_SLEEP_SECONDS
-        while True:
-            try:
-                logger.info('Product ID is [{}]'.format(product_id))
-                logger.info('Order ID is [{}]'.format(order_id))
-                logger.info('Processing Location is [{}]'
-                            .format(processing_location))
-
-                logged_contents = \
-                    EspaLogging.read_logger_file(settings.PROCESSING_LOGGER)
-
-                status = server.set_scene_error(product_id, order_id,
-                                                processing_location,
-                                                logged_contents)
+        try:
+            logger.info('Product ID is [{}]'.format(product_id))
+            logger.info('Order ID is [{}]'.format(order_id))
+            logger.info('Processing Location is [{}]'
+                        .format(processing_location))
 
-                if not status:
-                    logger.critical('Failed processing API call to'
-                                    ' set_scene_error')
-                    return False
+            logged_contents = \
+                EspaLogging.read_logger_file(settings.PROCESSING_LOGGER)
 
-                break
+            status = server.set_scene_error(product_id, order_id,
+                                            processing_location,
+                                            logged_contents)
 
-            except Exception:
+            if not status:
                 logger.critical('Failed processing API call to'
                                 ' set_scene_error')
-                logger.exception('Exception encountered and follows')
+                return False
 
-                if attempt < settings.MAX_SET_SCENE_ERROR_ATTEMPTS:
-                    sleep(sleep_seconds)  # sleep before trying again
-                    attempt += 1
-                    sleep_seconds = int(sleep_seconds * 1.5)
-                    continue
-                else:
-                    return False
+        except Exception:
+            logger.critical('Failed processing API call to'
+                            ' set_scene_error')
+            logger.exception('Exception encountered and follows')
+            return False
 
     return True
 
 
-def get_sleep_duration(proc_cfg, start_time, dont_sleep):
-    """Logs details and returns number of seconds to sleep
+# The API servers connected to by this process, so their connections are
+# reused by all of the API calls it makes.  With a single worker that spans
+# every scene on the mapper's input.  A pool worker is replaced after each
+# scene (maxtasksperchild=1), so there the reuse is only within one scene.
+API_SERVERS = dict()
+
+
+def get_api_server(proc_cfg, url):
+    """Returns the API server for the URL, connecting to it if needed
+
+    Args:
+        proc_cfg (ConfigParser): Configuration for ESPA processing.
+        url (str): The base URL of the API.
+
+    Returns:
+        APIServer: The server, or None if it did not respond.
     """
 
-    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+    if url not in API_SERVERS:
+        server = api_interface.api_connect(
+            url, api_limiter=rate_limiter.get_rate_limiter(proc_cfg, 'api'),
+            **api_interface.connection_options(proc_cfg))
+        if server is None:
+            return None
+
+        API_SERVERS[url] = server
 
-    # Determine if we need to sleep
-    end_time = datetime.datetime.now()
-    seconds_elapsed = (end_time - start_time).seconds
-    logger.info('Processing Time Elapsed {0} Seconds'.format(seconds_elapsed))
+    return API_SERVERS[url]
 
-    min_seconds = int(proc_cfg.get('processing',
-                                   'espa_min_request_duration_in_seconds'))
 
-    seconds_to_sleep = 1
-    if dont_sleep:
-        # We don't need to sleep
-        seconds_to_sleep = 1
-    elif seconds_elapsed < min_seconds:
-        seconds_to_sleep = (min_seconds - seconds_elapsed)
+def record_runtime(proc_cfg, parms, pp, processing_location, before,
+                   status):
+    """Records the runtime of the scene in the runtime database
 
-    logger.info('Sleeping An Additional {0} Seconds'.format(seconds_to_sleep))
+    Nothing is recorded if the runtime database has not been configured, and
+    failures are only logged, so they never fail the scene.
 
-    return seconds_to_sleep
+    Args:
+        proc_cfg (ConfigParser): Configuration for ESPA processing.
+        parms (dict): The request parameters, or None if they were not
+                      parsed.
+        pp (ProductProcessor): The processor, or None if it was not created.
+        processing_location (str): The node the scene was processed on.
+        before (dict): The resource usage snapshot from before the scene.
+        status (str): 'success' or 'error'.
+    """
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    try:
+        runtimes = runtime_db.get_runtime_db(proc_cfg)
+        if runtimes is None or parms is None:
+            return
+
+        options = parms.get('options') or dict()
+        product_id = parms.get('product_id') or parms.get('scene')
+
+        total = instrumentation.step_record('scene', dict(), before,
+                                            instrumentation.usage_snapshot(
+                                                None),
+                                            status)
+
+        sensor_name = product_id
+        if product_id != 'plot':
+            try:
+                sensor_name = sensor.info(product_id).sensor_name
+            except sensor.ProductNotImplemented:
+                sensor_name = None
+
+        steps = dict()
+        if pp is not None:
+            # The steps within an aggregate step have their own records
+            for record in pp.step_records():
+                if not record.get('aggregate'):
+                    steps[record['step']] = record['wall_seconds']
+
+        runtimes.record({
+            'node': processing_location,
+            'order_id': parms.get('orderid'),
+            'product_id': product_id,
+            'product_type': parms.get('product_type'),
+            'sensor': sensor_name,
+            'options_hash': parameters.science_options_hash(options),
+            'reproject': int(bool(options.get('reproject'))),
+            'output_format': options.get('output_format'),
+            'status': status,
+            'elapsed_seconds': total['wall_seconds'],
+            'bytes_in': total['read_bytes'],
+            'bytes_out': total['write_bytes'],
+            'steps': steps
+        })
+    except Exception:
+        logger.exception('Unable to record the runtime')
 
 
 def archive_log_files(order_id, product_id):
@@ -148,10 +207,40 @@ def archive_log_files(order_id, product_id):
         logger.exception('Exception encountered and follows')
 
 
-def process(proc_cfg, developer_sleep_mode=False):
-    """Read all lines from STDIN and process them
+def get_worker_count(proc_cfg):
+    """Returns the number of scenes to process concurrently
+
+    Defaults to a single scene at a time, if not specified in the processing
+    configuration.
+    """
+
+    workers = 1
+    if proc_cfg.has_option('processing', 'espa_mapper_workers'):
+        workers = proc_cfg.getint('processing', 'espa_mapper_workers')
+
+    return max(1, workers)
+
+
+def request_lines(lines):
+    """Generates the request lines which contain a JSON dictionary
+
+    This is how the nlineinputformat is supplying values:
+        341104        {"orderid":
+    so the entry is taken from the first opening brace to the end.
+    """
 
-    Each line is converted to a JSON dictionary of the parameters for
+    for line in lines:
+        if not line or len(line) < 1 or not line.strip().find('{') > -1:
+            # logger.info('BAD LINE:{}##'.format(line))
+            continue
+
+        yield line[line.find('{'):].strip()
+
+
+def process_line(proc_cfg, line, processing_location):
+    """Process a single request line
+
+    The line is converted to a JSON dictionary of the parameters for
     processing.  Validation is performed on the JSON dictionary to test if
     valid for this mapper.  After validation the generation of the products
     is performed.
@@ -160,159 +249,198 @@ def process(proc_cfg, developer_sleep_mode=False):
     # Initially set to the base logger
     logger = EspaLogging.get_logger('base')
 
-    processing_location = socket.gethostname()
+    # Reset these for each line
+    (server, order_id, product_id) = (None, None, None)
+    (parms, pp) = (None, None)
 
-    # Process each line from stdin
-    for line in sys.stdin:
-        if not line or len(line) < 1 or not line.strip().find('{') > -1:
-            # this is how the nlineinputformat is supplying values:
-            # 341104        {"orderid":
-            # logger.info('BAD LINE:{}##'.format(line))
-            continue
-        else:
-            # take the entry starting at the first opening parenth to the end
-            line = line[line.find('{'):]
-            line = line.strip()
+    before = instrumentation.usage_snapshot(None)
 
-        # Reset these for each line
-        (server, order_id, product_id) = (None, None, None)
+    try:
+        line = line.replace('#', '')
+        parms = json.loads(line)
+
+        if not parameters.test_for_parameter(parms, 'options'):
+            raise ValueError('Error missing JSON [options] record')
+
+        # TODO scene will be replaced with product_id someday
+        (order_id, product_id, product_type, options) = \
+            (parms['orderid'], parms['scene'], parms['product_type'],
+             parms['options'])
+
+        # Fix the orderid in-case it contains any single quotes
+        # The processors can not handle single quotes in the email
+        # portion due to usage in command lines.
+        parms['orderid'] = order_id.replace("'", '')
+
+        # If it is missing due to above TODO, then add it
+        if not parameters.test_for_parameter(parms, 'product_id'):
+            parms['product_id'] = product_id
+
+        # Figure out if debug level logging was requested
+        debug = False
+        if parameters.test_for_parameter(options, 'debug'):
+            debug = options['debug']
+
+        # Configure and get the logger for this order request
+        EspaLogging.configure(settings.PROCESSING_LOGGER, order=order_id,
+                              product=product_id, debug=debug)
+        logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
-        start_time = datetime.datetime.now()
+        logger.info('Processing {}:{}'.format(order_id, product_id))
+
+        # Update the status in the database
+        if parameters.test_for_parameter(parms, 'espa_api'):
+            if parms['espa_api'] != 'skip_api':
+                server = get_api_server(proc_cfg, parms['espa_api'])
+                if server is not None:
+                    status = server.update_status(product_id, order_id,
+                                                  processing_location,
+                                                  'processing')
+                    if not status:
+                        msg = ('Failed processing API call'
+                               ' to update_status to processing')
+                        raise api_interface.APIException(msg)
+
+        if product_id != 'plot':
+            # Make sure we can process the sensor
+            tmp_info = sensor.info(product_id)
+            del tmp_info
+
+            # Make sure we have a valid output format
+            if not parameters.test_for_parameter(options, 'output_format'):
+                logger.warning('[output_format] parameter missing'
+                               ' defaulting to envi')
+                options['output_format'] = 'envi'
+
+            if (options['output_format']
+                    not in parameters.VALID_OUTPUT_FORMATS):
+
+                raise ValueError('Invalid Output format {}'
+                                 .format(options['output_format']))
+
+        # ----------------------------------------------------------------
+        # NOTE: The first thing the product processor does during
+        #       initialization is validate the input parameters.
+        # ----------------------------------------------------------------
+
+        destination_product_file = 'ERROR'
+        destination_cksum_file = 'ERROR'
+        pp = None
+        try:
+            # All processors are implemented in the processor module
+            pp = processor.get_instance(proc_cfg, parms)
+            (destination_product_file, destination_cksum_file) = \
+                pp.process()
 
-        # Initialize so that we don't sleep
-        dont_sleep = True
+        finally:
+            # Free disk space to be nice to the whole system, unless it was
+            # kept to resume from the checkpoint
+            if pp is not None and not pp.product_directory_kept():
+                pp.remove_product_directory()
 
-        try:
-            line = line.replace('#', '')
-            parms = json.loads(line)
-
-            if not parameters.test_for_parameter(parms, 'options'):
-                raise ValueError('Error missing JSON [options] record')
-
-            # TODO scene will be replaced with product_id someday
-            (order_id, product_id, product_type, options) = \
-                (parms['orderid'], parms['scene'], parms['product_type'],
-                 parms['options'])
-
-            if product_id != 'plot':
-                # Developer mode is always false unless you are a developer
-                # so sleeping will always occur for none plotting requests
-                # Override with the developer mode
-                dont_sleep = developer_sleep_mode
-
-            # Fix the orderid in-case it contains any single quotes
-            # The processors can not handle single quotes in the email
-            # portion due to usage in command lines.
-            parms['orderid'] = order_id.replace("'", '')
-
-            # If it is missing due to above TODO, then add it
-            if not parameters.test_for_parameter(parms, 'product_id'):
-                parms['product_id'] = product_id
-
-            # Figure out if debug level logging was requested
-            debug = False
-            if parameters.test_for_parameter(options, 'debug'):
-                debug = options['debug']
-
-            # Configure and get the logger for this order request
-            EspaLogging.configure(settings.PROCESSING_LOGGER, order=order_id,
-                                  product=product_id, debug=debug)
-            logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
-
-            logger.info('Processing {}:{}'.format(order_id, product_id))
-
-            # Update the status in the database
-            if parameters.test_for_parameter(parms, 'espa_api'):
-                if parms['espa_api'] != 'skip_api':
-                    server = api_interface.api_connect(parms['espa_api'])
-                    if server is not None:
-                        status = server.update_status(product_id, order_id,
-                                                      processing_location,
-                                                      'processing')
-                        if not status:
-                            msg = ('Failed processing API call'
-                                   ' to update_status to processing')
-                            raise api_interface.APIException(msg)
-
-            if product_id != 'plot':
-                # Make sure we can process the sensor
-                tmp_info = sensor.info(product_id)
-                del tmp_info
-
-                # Make sure we have a valid output format
-                if not parameters.test_for_parameter(options, 'output_format'):
-                    logger.warning('[output_format] parameter missing'
-                                   ' defaulting to envi')
-                    options['output_format'] = 'envi'
-
-                if (options['output_format']
-                        not in parameters.VALID_OUTPUT_FORMATS):
-
-                    raise ValueError('Invalid Output format {}'
-                                     .format(options['output_format']))
-
-            # ----------------------------------------------------------------
-            # NOTE: The first thing the product processor does during
-            #       initialization is validate the input parameters.
-            # ----------------------------------------------------------------
-
-            destination_product_file = 'ERROR'
-            destination_cksum_file = 'ERROR'
-            pp = None
+        record_runtime(proc_cfg, parms, pp, processing_location, before,
+                       'success')
+
+        archive_log_files(order_id, product_id)
+
+        # Everything was successfull so mark the scene complete
+        if server is not None:
+            status = server.mark_scene_complete(product_id, order_id,
+                                                processing_location,
+                                                destination_product_file,
+                                                destination_cksum_file,
+                                                '')
+            if not status:
+                msg = ('Failed processing API call to'
+                       ' mark_scene_complete')
+                raise api_interface.APIException(msg)
+
+    except api_interface.APIException as excep:
+        # This is expected when scenes have been cancelled after queueing
+        logger.warning('Halt. API raised error: {}'.format(excep.message))
+
+    except Exception as excep:
+
+        # First log the exception
+        logger.exception('Exception encountered stacktrace follows')
+
+        record_runtime(proc_cfg, parms, pp, processing_location, before,
+                       'error')
+
+        archive_log_files(order_id, product_id)
+
+        if server is not None:
             try:
-                # All processors are implemented in the processor module
-                pp = processor.get_instance(proc_cfg, parms)
-                (destination_product_file, destination_cksum_file) = \
-                    pp.process()
-
-            finally:
-                # Free disk space to be nice to the whole system.
-                if pp is not None:
-                    pp.remove_product_directory()
-
-            # Sleep the number of seconds for minimum request duration
-            sleep(get_sleep_duration(proc_cfg, start_time, dont_sleep))
-
-            archive_log_files(order_id, product_id)
-
-            # Everything was successfull so mark the scene complete
-            if server is not None:
-                status = server.mark_scene_complete(product_id, order_id,
-                                                    processing_location,
-                                                    destination_product_file,
-                                                    destination_cksum_file,
-                                                    '')
-                if not status:
-                    msg = ('Failed processing API call to'
-                           ' mark_scene_complete')
-                    raise api_interface.APIException(msg)
-
-        except api_interface.APIException as excep:
-            # This is expected when scenes have been cancelled after queueing
-            logger.warning('Halt. API raised error: {}'.format(excep.message))
-
-        except Exception as excep:
-
-            # First log the exception
-            logger.exception('Exception encountered stacktrace follows')
-
-            # Sleep the number of seconds for minimum request duration
-            sleep(get_sleep_duration(proc_cfg, start_time, dont_sleep))
-
-            archive_log_files(order_id, product_id)
-
-            if server is not None:
-                try:
-                    status = set_product_error(server,
-                                               order_id,
-                                               product_id,
-                                               processing_location)
-                except Exception:
-                    logger.exception('Exception encountered stacktrace'
-                                     ' follows')
-        finally:
-            # Reset back to the base logger
-            logger = EspaLogging.get_logger('base')
+                status = set_product_error(server,
+                                           order_id,
+                                           product_id,
+                                           processing_location)
+            except Exception:
+                logger.exception('Exception encountered stacktrace'
+                                 ' follows')
+    finally:
+        # Reset back to the base logger
+        logger = EspaLogging.get_logger('base')
+
+
+def process_line_worker(proc_cfg, processing_location, line):
+    """Process a single request line within a worker process
+
+    Nothing is allowed to escape the worker, so that the remaining scenes
+    assigned to the pool are still processed.
+    """
+
+    try:
+        process_line(proc_cfg, line, processing_location)
+    except Exception:
+        logger = EspaLogging.get_logger('base')
+        logger.exception('Worker failed processing stacktrace follows')
+
+
+def process(proc_cfg, developer_mode=False, workers=None):
+    """Read all lines from STDIN and process them
+
+    Each line is processed by process_line().  If the processing
+    configuration specifies more than one espa_mapper_workers, the lines are
+    processed concurrently by a pool of worker processes.  Each worker
+    process handles a single scene and is then replaced, so that every scene
+    is given its own logger configuration and working directory.
+
+    Args:
+        proc_cfg (ConfigParser): Configuration for ESPA processing.
+        developer_mode (bool): Do not rate limit the upstream requests.
+        workers (int): Overrides the espa_mapper_workers configuration.
+    """
+
+    logger = EspaLogging.get_logger('base')
+
+    processing_location = socket.gethostname()
+
+    if developer_mode and proc_cfg.has_option('processing',
+                                              'espa_rate_limit_dir'):
+        # Developers are not rate limited
+        proc_cfg.set('processing', 'espa_rate_limit_dir', '')
+
+    if workers is None:
+        workers = get_worker_count(proc_cfg)
+    workers = max(1, workers)
+
+    if workers == 1:
+        for line in request_lines(sys.stdin):
+            process_line(proc_cfg, line, processing_location)
+        return
+
+    logger.info('Processing requests with {} workers'.format(workers))
+
+    worker = partial(process_line_worker, proc_cfg, processing_location)
+
+    pool = multiprocessing.Pool(processes=workers, maxtasksperchild=1)
+    try:
+        for _ in pool.imap_unordered(worker, request_lines(sys.stdin)):
+            pass
+    finally:
+        pool.close()
+        pool.join()
 
 
 def export_environment_variables(cfg):
@@ -342,7 +470,14 @@ def main():
     # Add our only options to determine if we are a developer or not
     parser.add_argument('--developer',
                         action='store_true', dest='developer', default=False,
-                        help='use a developer mode for sleeping')
+                        help='use a developer mode without rate limiting')
+
+    # Allows the local executor of the cron to size the worker pool
+    parser.add_argument('--workers',
+                        action='store', dest='workers', type=int,
+                        default=None,
+                        help='number of scenes to process concurrently,'
+                             ' overrides espa_mapper_workers')
 
     # Parse the command line arguments
     args = parser.parse_args()
@@ -355,10 +490,10 @@ def main():
     logger = EspaLogging.get_logger('base')
 
     try:
-        # Joe-Developer doesn't want to wait so if set skip sleeping
-        developer_sleep_mode = args.developer
+        # Joe-Developer doesn't want to wait so if set skip rate limiting
+        developer_mode = args.developer
 
-        process(proc_cfg, developer_sleep_mode)
+        process(proc_cfg, developer_mode, workers=args.workers)
     except Exception:
         logger.exception('Processing failed stacktrace follows')
 
@@ -0,0 +1,291 @@
+'''
+Description: Provides an in-process engine for packaging products into
+             gzipped tar files.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import os
+import gzip
+import zlib
+import struct
+import hashlib
+import tarfile
+import multiprocessing
+from collections import deque
+
+import settings
+from logging_tools import EspaLogging
+
+
+class ChecksumWriter(object):
+    '''
+    Description:
+        Provides a file-like object which computes the MD5 checksum and
+        counts the bytes written through it to the wrapped file object.
+    '''
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self.md5 = hashlib.md5()
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.md5.update(data)
+        self.bytes_written += len(data)
+        self._fileobj.write(data)
+
+    def flush(self):
+        self._fileobj.flush()
+
+
+# Header for a gzip member without a filename or modification time
+GZIP_MEMBER_HEADER = '\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def compress_block(block, compresslevel):
+    '''
+    Description:
+        Compress a block of data into a complete gzip member.
+
+    Notes:
+        Module level so that it can be sent to the worker processes.
+    '''
+
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED,
+                                  -zlib.MAX_WBITS)
+
+    return ''.join([GZIP_MEMBER_HEADER,
+                    compressor.compress(block),
+                    compressor.flush(),
+                    struct.pack('<LL',
+                                zlib.crc32(block) & 0xffffffff,
+                                len(block) & 0xffffffff)])
+
+
+class ParallelGzipWriter(object):
+    '''
+    Description:
+        Provides a file-like object which compresses the data written through
+        it on a pool of processes.
+
+    Notes:
+        The data is split into independent blocks, and each block is
+        compressed into its own gzip member.  The members are written to the
+        wrapped file object in order, producing a standard multi-member gzip
+        stream that gunzip and the gzip module can read.  The number of
+        blocks in flight is bounded to limit the memory used.
+    '''
+
+    def __init__(self, fileobj, workers, block_size=None,
+                 compresslevel=settings.PACKAGING_COMPRESS_LEVEL):
+        '''
+        Description:
+            Initialization for the object.
+
+        Parameters:
+            fileobj - The file object to write the compressed data to.
+            workers - The number of processes to compress with.
+            block_size - The number of bytes compressed into each member,
+                         defaults to the setting.
+            compresslevel - The gzip compression level.
+        '''
+
+        self._fileobj = fileobj
+        self._block_size = block_size
+        if self._block_size is None:
+            self._block_size = settings.PACKAGING_GZIP_BLOCK_SIZE
+        self._compresslevel = compresslevel
+        self._max_pending = workers * 2
+        self._buffer = list()
+        self._buffer_size = 0
+        self._pending = deque()
+        self._blocks_written = 0
+        self._pool = multiprocessing.Pool(processes=workers)
+
+    def _submit(self, block):
+        '''
+        Description:
+            Queue a block for compression, writing out completed blocks to
+            stay under the number of blocks allowed in flight.
+        '''
+
+        self._pending.append(
+            self._pool.apply_async(compress_block,
+                                   (block, self._compresslevel)))
+
+        while len(self._pending) >= self._max_pending:
+            self._write_next()
+
+    def _write_next(self):
+        '''
+        Description:
+            Wait for the oldest block and write it out.
+        '''
+
+        self._fileobj.write(self._pending.popleft().get())
+        self._blocks_written += 1
+
+    def write(self, data):
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+
+        if self._buffer_size < self._block_size:
+            return
+
+        data = ''.join(self._buffer)
+        offset = 0
+        while len(data) - offset >= self._block_size:
+            self._submit(data[offset:offset + self._block_size])
+            offset += self._block_size
+
+        self._buffer = [data[offset:]]
+        self._buffer_size = len(data) - offset
+
+    def flush(self):
+        self._fileobj.flush()
+
+    def close(self):
+        '''
+        Description:
+            Compress the remaining data, write out all of the blocks, and
+            stop the pool.
+        '''
+
+        if self._pool is None:
+            return
+
+        try:
+            # Always write at least one member, so empty input is valid
+            if (self._buffer_size > 0 or
+                    (self._blocks_written == 0 and not self._pending)):
+                self._submit(''.join(self._buffer))
+
+            self._buffer = list()
+            self._buffer_size = 0
+
+            while self._pending:
+                self._write_next()
+
+            self._fileobj.flush()
+
+            self._pool.close()
+        except Exception:
+            self._pool.terminate()
+            raise
+        finally:
+            self._pool.join()
+            self._pool = None
+
+
+def gzip_workers(parallel_gzip):
+    '''
+    Description:
+        Determine the number of processes to compress products with.
+
+    Notes:
+        Processes running in a pool are not allowed to start a pool of their
+        own, so those always compress in a single process.
+    '''
+
+    if not parallel_gzip:
+        return 1
+
+    if multiprocessing.current_process().daemon:
+        logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+        logger.info('Parallel gzip is not available in a pool worker,'
+                    ' compressing in a single process')
+        return 1
+
+    return max(1, settings.PACKAGING_GZIP_WORKERS)
+
+
+def expected_members(file_list):
+    '''
+    Description:
+        Determine the members and sizes a tar of the files should contain.
+
+    Returns:
+        dict - The size of each member keyed by the member name.  Only
+               regular files have a non-zero size.
+    '''
+
+    members = dict()
+
+    def add_member(name):
+        stat_info = os.lstat(name)
+        size = 0
+        if os.path.isfile(name) and not os.path.islink(name):
+            size = stat_info.st_size
+        members[os.path.normpath(name)] = size
+
+    for name in file_list:
+        add_member(name)
+
+        if os.path.isdir(name) and not os.path.islink(name):
+            for (root, dirs, files) in os.walk(name):
+                for item in dirs + files:
+                    add_member(os.path.join(root, item))
+
+    return members
+
+
+def tar_gzip_files(target, file_list,
+                   compresslevel=settings.PACKAGING_COMPRESS_LEVEL,
+                   workers=1):
+    '''
+    Description:
+        Create a gzipped tar of the specified file(s) in a single pass.
+
+    Notes:
+        The files are read once, streamed through tar and gzip, and the MD5
+        checksum is computed on the compressed data as it is written.  The
+        archive is verified against the members that were written, instead
+        of reading it back.
+
+        More than one worker compresses the data in parallel, producing a
+        multi-member gzip.
+
+    Returns:
+        cksum_value - The MD5 checksum of the gzipped tar.
+        members - The names of the members written to the tar.
+
+    Raises:
+        Exception(message)
+    '''
+
+    expected = expected_members(file_list)
+
+    with open(target, 'wb') as target_fd:
+        writer = ChecksumWriter(target_fd)
+
+        if workers > 1:
+            gzip_fd = ParallelGzipWriter(writer, workers,
+                                         compresslevel=compresslevel)
+        else:
+            gzip_fd = gzip.GzipFile(filename='', mode='wb',
+                                    compresslevel=compresslevel,
+                                    fileobj=writer)
+        try:
+            tar = tarfile.open(fileobj=gzip_fd, mode='w|')
+            try:
+                for name in file_list:
+                    tar.add(name)
+            finally:
+                tar.close()
+
+            written = dict((os.path.normpath(member.name), member.size)
+                           for member in tar.members)
+        finally:
+            gzip_fd.close()
+
+    if written != expected:
+        missing = sorted(set(expected) - set(written))
+        mismatched = sorted(name for name in written
+                            if expected.get(name) != written[name])
+        raise Exception('Archive verification failed for [{}]:'
+                        ' missing members {} mismatched members {}'
+                        .format(target, missing, mismatched))
+
+    return (writer.md5.hexdigest(), sorted(written))
@@ -7,6 +7,8 @@ License: NASA Open Source Agreement 1.3
 '''
 
 import os
+import json
+import hashlib
 
 import settings
 from logging_tools import EspaLogging
@@ -22,6 +24,10 @@ VALID_IMAGE_EXTENTS_UNITS = ['meters', 'dd']
 VALID_PROJECTIONS = ['sinu', 'aea', 'utm', 'ps', 'lonlat']
 VALID_NS = ['north', 'south']
 
+# The include options which do not change the science products generated
+NON_SCIENCE_INCLUDES = ['include_customized_source_data',
+                        'include_statistics']
+
 
 def test_for_parameter(parms, key):
     '''
@@ -40,6 +46,26 @@ def test_for_parameter(parms, key):
     return True
 
 
+def science_options_hash(options):
+    '''
+    Description:
+      Provides a canonical hash of the options which change the science
+      products generated.
+
+    Returns:
+      The same hex digest for any requests with the same science options,
+      regardless of their other options.
+    '''
+
+    science_options = dict((key, bool(value))
+                           for (key, value) in options.iteritems()
+                           if (key.startswith('include_') and
+                               key not in NON_SCIENCE_INCLUDES))
+
+    return hashlib.sha1(json.dumps(science_options,
+                                   sort_keys=True)).hexdigest()
+
+
 def validate_reprojection_parameters(parms, product_id):
     '''
     Description:
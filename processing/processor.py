@@ -14,9 +14,13 @@ import glob
 import json
 import datetime
 import copy
+import hashlib
 import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 from cStringIO import StringIO
 from collections import defaultdict, namedtuple
+from functools import partial
 
 
 from espa import Metadata
@@ -31,9 +35,14 @@ import initialization
 import parameters
 import landsat_metadata
 import staging
-import transfer
 import distribution
 import product_formatting
+import step_scheduler
+import stats_index
+import band_statistics
+import instrumentation
+import checkpoint
+import rate_limiter
 
 
 class ProductProcessor(object):
@@ -83,6 +92,36 @@ class ProductProcessor(object):
         # Ship resource report
         self._include_resource_report = self._cfg.get('processing', 'include_resource_report')
 
+        # JSON lines file to also append the step resource records to
+        self._instrumentation_file = None
+        if self._cfg.has_option('processing', 'espa_instrumentation_file'):
+            self._instrumentation_file = (
+                self._cfg.get('processing', 'espa_instrumentation_file')
+                or None)
+
+        # Seconds before a processing command is killed, None for no limit
+        self._command_timeout = None
+        if (self._cfg.has_option('processing', 'espa_command_timeout') and
+                self._cfg.get('processing', 'espa_command_timeout')):
+            self._command_timeout = self._cfg.getfloat('processing',
+                                                       'espa_command_timeout')
+
+        # Walking the work directory before and after every step is costly
+        # for large products, so its size change is only recorded on request
+        self._instrumentation_work_dir_size = (
+            self._cfg.has_option('processing',
+                                 'espa_instrumentation_work_dir_size') and
+            self._cfg.getboolean('processing',
+                                 'espa_instrumentation_work_dir_size'))
+
+        # Timing and resource usage of the steps executed
+        self._step_records = list()
+
+        # Checkpoints of the completed steps, to resume a failed product
+        self._checkpoints = checkpoint.get_checkpoint_store(self._cfg)
+        self._completed_steps = list()
+        self._product_directory_kept = False
+
     def validate_parameters(self):
         """Validates the parameters required for the processor
         """
@@ -156,6 +195,133 @@ class ProductProcessor(object):
         self._logger.info('*** RESOURCE SNAPSHOT {} ***'
                           .format(json.dumps(resources, sort_keys=True)))
 
+    def run_step(self, method, step_name=None, aggregate=False):
+        """Executes a processing step, recording its timing and resource usage
+
+        Args:
+            method (callable): The step to execute.
+            step_name (str): The name for the record, defaults to the name of
+                             the method.
+            aggregate (bool): The step runs other steps which are recorded
+                              on their own.
+
+        Returns:
+            The value returned by the step.
+        """
+
+        if step_name is None:
+            step_name = method.__name__
+
+        entity = {k: self._parms.get(k) for k in ('scene', 'orderid')}
+
+        work_dir = None
+        if self._instrumentation_work_dir_size:
+            work_dir = self._work_dir
+
+        return instrumentation.record_step(step_name, method, entity,
+                                           work_dir, self._logger,
+                                           self._instrumentation_file,
+                                           self._step_records,
+                                           aggregate=aggregate)
+
+    def step_records(self):
+        """Provides the timing and resource usage records of the steps
+           executed so far
+
+        Returns:
+            list: The records in the order the steps completed.
+        """
+
+        return list(self._step_records)
+
+    def checkpoint_key(self):
+        """Returns the key identifying the (order, product) checkpoint
+        """
+
+        return '-'.join([str(self._parms['orderid']),
+                         str(self._parms['product_id'])])
+
+    def checkpoint_state(self):
+        """Provides the processor state needed to resume from a checkpoint
+
+        Returns:
+            dict: JSON serializable state, restored by
+                  restore_checkpoint_state().
+        """
+
+        return dict()
+
+    def restore_checkpoint_state(self, state):
+        """Restores the processor state saved with a checkpoint
+
+        Args:
+            state (dict): The state provided by checkpoint_state().
+        """
+
+        pass
+
+    def run_checkpointed_step(self, method, aggregate=False):
+        """Executes a processing step unless the checkpoint shows it
+           completed, and records it in the checkpoint when it does
+
+        Args:
+            method (callable): The step to execute.
+            aggregate (bool): The step runs other steps which are recorded
+                              on their own.
+        """
+
+        step_name = method.__name__
+
+        if step_name in self._completed_steps:
+            self._logger.info('Skipping [{}] completed before the checkpoint'
+                              .format(step_name))
+            return
+
+        self.run_step(method, aggregate=aggregate)
+
+        self._completed_steps.append(step_name)
+
+        if self._checkpoints is not None:
+            self._checkpoints.complete_step(self.checkpoint_key(),
+                                            self._product_dir,
+                                            self._work_dir,
+                                            step_name,
+                                            self.checkpoint_state())
+
+    def resume_from_checkpoint(self):
+        """Resumes the processing directory of a previous failed attempt
+
+        Returns:
+            bool: True when the product directory and the completed steps
+                  were restored from the checkpoint.
+        """
+
+        if self._checkpoints is None:
+            return False
+
+        # Abandoned checkpoints are removed along with their product
+        # directories
+        for key in self._checkpoints.purge():
+            self._logger.info('Purged abandoned checkpoint [{}]'.format(key))
+
+        work_dir = os.path.join(self._product_dir, 'work')
+        state = self._checkpoints.resume(self.checkpoint_key(),
+                                         self._product_dir, work_dir)
+        if state is None:
+            return False
+
+        self._completed_steps = state['steps']
+        self.restore_checkpoint_state(state['processor_state'])
+
+        # Start with an empty stage directory
+        shutil.rmtree(os.path.join(self._product_dir, 'stage'),
+                      ignore_errors=True)
+
+        self._logger.info('Resuming from the checkpoint after [{}]'
+                          .format(', '.join(self._completed_steps)))
+
+        return True
+
     def initialize_processing_directory(self):
         """Initializes the processing directory
 
@@ -192,7 +358,9 @@ class ProductProcessor(object):
 
         # Just incase remove it, and we don't care about errors if it
         # doesn't exist (probably only needed for developer runs)
-        shutil.rmtree(self._product_dir, ignore_errors=True)
+        # Unless it is kept to resume from a checkpoint
+        if not self.resume_from_checkpoint():
+            shutil.rmtree(self._product_dir, ignore_errors=True)
 
         # Create each of the sub-directories
         self._stage_dir = \
@@ -220,6 +388,16 @@ class ProductProcessor(object):
         if self._product_dir is not None and not options['keep_directory']:
             shutil.rmtree(self._product_dir, ignore_errors=True)
 
+    def product_directory_kept(self):
+        """Determines if process() kept the product directory of the failed
+           product, to resume from its checkpoint
+
+        Returns:
+            bool: True if the product directory must not be removed.
+        """
+
+        return self._product_directory_kept
+
     def get_product_name(self):
         """Build the product name from the product information and current
            time
@@ -246,12 +424,21 @@ class ProductProcessor(object):
             immutability = self._cfg.getboolean('processing',
                                                 'immutable_distribution')
 
+            # Enabled separately for each distribution method
+            parallel_gzip_option = ('espa_parallel_gzip_{}'.format(
+                self._cfg.get('processing', 'espa_distribution_method')))
+            parallel_gzip = (self._cfg.has_option('processing',
+                                                  parallel_gzip_option) and
+                             self._cfg.getboolean('processing',
+                                                  parallel_gzip_option))
+
             (product_file, cksum_file) = \
                 distribution.distribute_product(immutability,
                                                 product_name,
                                                 self._work_dir,
                                                 self._output_dir,
-                                                self._parms)
+                                                self._parms,
+                                                parallel_gzip=parallel_gzip)
         except Exception:
             self._logger.exception('An exception occurred delivering'
                                    ' the product')
@@ -294,14 +481,25 @@ class ProductProcessor(object):
         # Initialize the processing directory.
         self.initialize_processing_directory()
 
+        succeeded = False
         try:
             (destination_product_file, destination_cksum_file) = \
                 self.process_product()
+            succeeded = True
 
         finally:
-            # Remove the product directory
-            # Free disk space to be nice to the whole system.
-            self.remove_product_directory()
+            # Keep the product directory of a failed product to resume from,
+            # if any of its steps were checkpointed
+            if (succeeded or self._checkpoints is None or
+                    not self._completed_steps):
+                # Remove the product directory
+                # Free disk space to be nice to the whole system.
+                self.remove_product_directory()
+            else:
+                self._product_directory_kept = True
+
+            if succeeded and self._checkpoints is not None:
+                self._checkpoints.remove(self.checkpoint_key())
 
         return (destination_product_file, destination_cksum_file)
 
@@ -439,6 +637,10 @@ class CDRProcessor(CustomizationProcessor):
     def __init__(self, cfg, parms):
         super(CDRProcessor, self).__init__(cfg, parms)
 
+        # Shared between orders requesting the same science products
+        self._science_cache = staging.get_science_cache(self._cfg)
+        self._science_cached = False
+
     def validate_parameters(self):
         """Validates the parameters required for all processors
         """
@@ -466,6 +668,88 @@ class CDRProcessor(CustomizationProcessor):
                                   ' class'.format(self.build_science_products
                                                   .__name__))
 
+    def science_steps_recorded(self):
+        """Determines if build_science_products records each of the science
+           steps it executes
+
+        Returns:
+            bool: False here, so the science products are recorded as one
+                  step.
+        """
+
+        return False
+
+    def science_executables(self):
+        """Provides the names of the executables which generate the science
+           products, their versions are part of the science cache key
+
+        Not implemented here.
+        """
+
+        raise NotImplementedError('[{}] Requires implementation in the child'
+                                  ' class'.format(self.science_executables
+                                                  .__name__))
+
+    def science_cache_key(self):
+        """Returns the science cache key, which is the same for every
+           request of the product with the same science options and
+           executables
+        """
+
+        signature = hashlib.sha1(
+            ':'.join([parameters.science_options_hash(self._parms['options']),
+                      utilities.executables_signature(
+                          self.science_executables())]))
+
+        return '-'.join([self._parms['product_id'],
+                         signature.hexdigest()[:16]])
+
+    def retrieve_science_products(self):
+        """Retrieves the science products from the science cache, when they
+           were built for an identical request
+        """
+
+        # Nothing to do if the user did not specify anything to build
+        if self._science_cache is None or not self._build_products:
+            return
+
+        self._science_cached = \
+            staging.stage_science_products(self._science_cache,
+                                           self.science_cache_key(),
+                                           self._work_dir)
+
+    def cache_science_products(self):
+        """Adds the science products to the science cache
+        """
+
+        # Nothing to do if the user did not specify anything to build
+        if self._science_cache is None or not self._build_products:
+            return
+
+        try:
+            staging.cache_science_products(self._science_cache,
+                                           self.science_cache_key(),
+                                           self._work_dir)
+        except Exception:
+            # The product can still be completed without the cache
+            self._logger.exception('Unable to cache the science products')
+
+    def checkpoint_state(self):
+        """Provides the processor state needed to resume from a checkpoint
+        """
+
+        state = super(CDRProcessor, self).checkpoint_state()
+        state['science_cached'] = self._science_cached
+
+        return state
+
+    def restore_checkpoint_state(self, state):
+        """Restores the processor state saved with a checkpoint
+        """
+
+        super(CDRProcessor, self).restore_checkpoint_state(state)
+        self._science_cached = state['science_cached']
+
     def cleanup_work_dir(self):
         """Cleanup all the intermediate non-products and the science
            products not requested
@@ -622,33 +906,38 @@ class CDRProcessor(CustomizationProcessor):
            requested product
         """
 
-        # Stage the required input data
-        self.stage_input_data()
+        # Each step is checkpointed, so a failed product can be resumed
 
-        # Build science products
-        self.build_science_products()
+        # Use the science products built for an identical request
+        self.run_checkpointed_step(self.retrieve_science_products)
 
-        # [[ Science-Resource Snapshot ]]
-        self.snapshot_resources()
+        if not self._science_cached:
+            # Stage the required input data
+            self.run_checkpointed_step(self.stage_input_data)
 
-        # Remove science products and intermediate data not requested
-        self.cleanup_work_dir()
+            # Build science products
+            self.run_checkpointed_step(
+                self.build_science_products,
+                aggregate=self.science_steps_recorded())
 
-        # Customize products
-        self.customize_products()
+            self.run_checkpointed_step(self.cache_science_products)
 
-        # Generate statistics products
-        self.generate_statistics()
-
-        # Distribute statistics
-        self.distribute_statistics()
+        # [[ Science-Resource Snapshot ]]
+        self.snapshot_resources()
 
-        # Reformat product
-        self.reformat_products()
+        # Remove science products and intermediate data not requested,
+        # customize products, generate and distribute statistics products,
+        # and reformat product
+        for step in [self.cleanup_work_dir,
+                     self.customize_products,
+                     self.generate_statistics,
+                     self.distribute_statistics,
+                     self.reformat_products]:
+            self.run_checkpointed_step(step)
 
         # Package and deliver product
         (destination_product_file, destination_cksum_file) = \
-            self.distribute_product()
+            self.run_step(self.distribute_product)
 
         # [[ Formatting-Resource Snapshot ]]
         self.snapshot_resources()
@@ -747,12 +1036,31 @@ class LandsatProcessor(CDRProcessor):
         product_id = self._parms['product_id']
         download_url = self._parms['download_url']
 
+        input_cache = staging.get_input_cache(self._cfg)
+
+        streaming = (self._cfg.has_option('processing',
+                                          'espa_streaming_staging') and
+                     self._cfg.getboolean('processing',
+                                          'espa_streaming_staging'))
+
+        # Un-tar the input data to the work directory as it is downloaded,
+        # unless it is going to be cached
+        download_limiter = rate_limiter.get_rate_limiter(self._cfg,
+                                                         'download')
+
+        if streaming and input_cache is None:
+            staging.stream_untar_url(download_url, self._work_dir,
+                                     download_limiter=download_limiter)
+            return
+
         file_name = ''.join([product_id,
                              settings.LANDSAT_INPUT_FILENAME_EXTENSION])
         staged_file = os.path.join(self._stage_dir, file_name)
 
         # Download the source data
-        transfer.download_file_url(download_url, staged_file)
+        staging.stage_input_file(input_cache, product_id, download_url,
+                                 staged_file,
+                                 download_limiter=download_limiter)
 
         # Un-tar the input data to the work directory
         staging.untar_data(staged_file, self._work_dir)
@@ -776,16 +1084,10 @@ class LandsatProcessor(CDRProcessor):
         if not options['include_source_data']:
             cmd.append('--del_src_files')
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
-        self._logger.info(' '.join(['CONVERT LPGS TO ESPA COMMAND:', cmd]))
+        self._logger.info(' '.join(['CONVERT LPGS TO ESPA COMMAND:'] + cmd))
 
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        utilities.execute_cmd(cmd, logger=self._logger,
+                              timeout=self._command_timeout)
 
     def clip_band_misalignment(self):
         """Clips the bands to matching fill extents
@@ -795,17 +1097,11 @@ class LandsatProcessor(CDRProcessor):
         cmd = ['clip_band_misalignment',
                '--xml', self._xml_filename]
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
-        self._logger.info(' '.join(['CLIP BAND MISALIGNMENT ESPA COMMAND:',
-                                    cmd]))
+        self._logger.info(' '.join(['CLIP BAND MISALIGNMENT ESPA COMMAND:'] +
+                                   cmd))
 
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        utilities.execute_cmd(cmd, logger=self._logger,
+                              timeout=self._command_timeout)
 
     def elevation_command_line(self):
         """Returns the command line required to generate the elevation
@@ -826,9 +1122,6 @@ class LandsatProcessor(CDRProcessor):
             cmd = ['build_elevation_band.py',
                    '--xml', self._xml_filename]
 
-            # Turn the list into a string
-            cmd = ' '.join(cmd)
-
         return cmd
 
     def generate_elevation_product(self):
@@ -841,14 +1134,10 @@ class LandsatProcessor(CDRProcessor):
         # Only if required
         if cmd is not None:
 
-            self._logger.info(' '.join(['ELEVATION COMMAND:', cmd]))
+            self._logger.info(' '.join(['ELEVATION COMMAND:'] + cmd))
 
-            output = ''
-            try:
-                output = utilities.execute_cmd(cmd)
-            finally:
-                if len(output) > 0:
-                    self._logger.info(output)
+            utilities.execute_cmd(cmd, logger=self._logger,
+                                  timeout=self._command_timeout)
 
     def generate_pixel_qa(self):
         """Generates the initial pixel QA band from the Level-1 QA band
@@ -857,17 +1146,10 @@ class LandsatProcessor(CDRProcessor):
         cmd = ['generate_pixel_qa',
                '--xml', self._xml_filename]
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
+        self._logger.info(' '.join(['CLASS BASED QA COMMAND:'] + cmd))
 
-        self._logger.info(' '.join(['CLASS BASED QA COMMAND:', cmd]))
-
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        utilities.execute_cmd(cmd, logger=self._logger,
+                              timeout=self._command_timeout)
 
     def generate_dilated_cloud(self):
         """Adds cloud dilation to the pixel QA band based on original
@@ -879,17 +1161,10 @@ class LandsatProcessor(CDRProcessor):
                '--bit', '5',
                '--distance', '3']
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
-
-        self._logger.info(' '.join(['CLOUD DILATION COMMAND:', cmd]))
+        self._logger.info(' '.join(['CLOUD DILATION COMMAND:'] + cmd))
 
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        utilities.execute_cmd(cmd, logger=self._logger,
+                              timeout=self._command_timeout)
 
     def generate_cfmask_water_detection(self):
         """Adds CFmask based water detection to the class based QA band
@@ -898,17 +1173,10 @@ class LandsatProcessor(CDRProcessor):
         cmd = ['cfmask_water_detection',
                '--xml', self._xml_filename]
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
+        self._logger.info(' '.join(['CFMASK WATER DETECTION COMMAND:'] + cmd))
 
-        self._logger.info(' '.join(['CFMASK WATER DETECTION COMMAND:', cmd]))
-
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        utilities.execute_cmd(cmd, logger=self._logger,
+                              timeout=self._command_timeout)
 
     def sr_command_line(self):
         """Returns the command line required to generate surface reflectance
@@ -928,7 +1196,7 @@ class LandsatProcessor(CDRProcessor):
         if not self.requires_sr_input:
             cmd.extend(['--process_sr', 'False'])
 
-        return ' '.join(cmd)
+        return cmd
 
     def generate_sr_products(self):
         """Generates surface reflectance products
@@ -939,14 +1207,10 @@ class LandsatProcessor(CDRProcessor):
         # Only if required
         if cmd is not None:
 
-            self._logger.info(' '.join(['SURFACE REFLECTANCE COMMAND:', cmd]))
+            self._logger.info(' '.join(['SURFACE REFLECTANCE COMMAND:'] + cmd))
 
-            output = ''
-            try:
-                output = utilities.execute_cmd(cmd)
-            finally:
-                if len(output) > 0:
-                    self._logger.info(output)
+            utilities.execute_cmd(cmd, logger=self._logger,
+                                  timeout=self._command_timeout)
 
     def generate_spectral_indices(self):
         """Generates the requested spectral indices
@@ -981,19 +1245,13 @@ class LandsatProcessor(CDRProcessor):
             if options['include_sr_evi']:
                 cmd.append('--evi')
 
-            cmd = ' '.join(cmd)
-
         # Only if required
         if cmd is not None:
 
-            self._logger.info(' '.join(['SPECTRAL INDICES COMMAND:', cmd]))
+            self._logger.info(' '.join(['SPECTRAL INDICES COMMAND:'] + cmd))
 
-            output = ''
-            try:
-                output = utilities.execute_cmd(cmd)
-            finally:
-                if len(output) > 0:
-                    self._logger.info(output)
+            utilities.execute_cmd(cmd, logger=self._logger,
+                                  timeout=self._command_timeout)
 
     def generate_surface_water_extent(self):
         """Generates the Dynamic Surface Water Extent product
@@ -1008,16 +1266,10 @@ class LandsatProcessor(CDRProcessor):
                '--xml', self._xml_filename,
                '--verbose']
 
-        cmd = ' '.join(cmd)
+        self._logger.info(' '.join(['SURFACE WATER EXTENT COMMAND:'] + cmd))
 
-        self._logger.info(' '.join(['SURFACE WATER EXTENT COMMAND:', cmd]))
-
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        utilities.execute_cmd(cmd, logger=self._logger,
+                              timeout=self._command_timeout)
 
     def generate_surface_temperature(self):
         """Generates the Surface Temperature product
@@ -1032,22 +1284,107 @@ class LandsatProcessor(CDRProcessor):
                    '--xml', self._xml_filename,
                    '--keep-intermediate-data']
 
-            cmd = ' '.join(cmd)
-
         # Only if required
         if cmd is not None:
 
-            self._logger.info(' '.join(['ST COMMAND:', cmd]))
+            self._logger.info(' '.join(['ST COMMAND:'] + cmd))
 
-            output = ''
-            try:
-                output = utilities.execute_cmd(cmd)
-            finally:
-                if len(output) > 0:
-                    self._logger.info(output)
+            utilities.execute_cmd(cmd, logger=self._logger,
+                                  timeout=self._command_timeout)
+
+    def science_executables(self):
+        """Provides the names of the executables which generate the science
+           products
+        """
+
+        return ['convert_lpgs_to_espa',
+                'clip_band_misalignment',
+                'build_elevation_band.py',
+                'generate_pixel_qa',
+                'dilate_pixel_qa',
+                'cfmask_water_detection',
+                'surface_reflectance.py',
+                'spectral_indices.py',
+                'surface_water_extent.py',
+                'surface_temperature.py']
+
+    def science_steps(self):
+        """Defines the science processing steps and their dependencies
+
+        Note:
+            All of the science applications update the XML metadata file in
+            place, so the steps are executed one at a time.
+        """
+
+        Step = step_scheduler.Step
+
+        return [
+            Step('convert_to_raw_binary', self.convert_to_raw_binary,
+                 ['level1'], ['raw_binary']),
+            Step('clip_band_misalignment', self.clip_band_misalignment,
+                 ['raw_binary'], ['clipped']),
+            Step('elevation', self.generate_elevation_product,
+                 ['clipped'], ['elevation']),
+            Step('pixel_qa', self.generate_pixel_qa,
+                 ['clipped'], ['pixel_qa']),
+            Step('sr', self.generate_sr_products,
+                 ['clipped', 'pixel_qa'], ['toa', 'bt', 'sr']),
+            Step('dilated_cloud', self.generate_dilated_cloud,
+                 ['pixel_qa'], ['dilated_pixel_qa']),
+            Step('cfmask_water', self.generate_cfmask_water_detection,
+                 ['dilated_pixel_qa', 'toa', 'bt'], ['final_pixel_qa']),
+            Step('spectral_indices', self.generate_spectral_indices,
+                 ['sr'], ['spectral_indices']),
+            Step('dswe', self.generate_surface_water_extent,
+                 ['sr', 'elevation', 'final_pixel_qa'], ['dswe']),
+            Step('st', self.generate_surface_temperature,
+                 ['toa', 'bt', 'elevation'], ['st'])
+        ]
+
+    def science_targets(self):
+        """Determine the science products required for the requested options
+        """
+
+        options = self._parms['options']
+
+        # Always generate TOA, BT, and the final pixel QA
+        targets = ['toa', 'bt', 'final_pixel_qa']
+
+        if self.requires_sr_input:
+            targets.append('sr')
+
+        if (options['include_sr_nbr'] or
+                options['include_sr_nbr2'] or
+                options['include_sr_ndvi'] or
+                options['include_sr_ndmi'] or
+                options['include_sr_savi'] or
+                options['include_sr_msavi'] or
+                options['include_sr_evi']):
+            targets.append('spectral_indices')
+
+        if options['include_dswe']:
+            targets.append('dswe')
+
+        if options['include_st']:
+            targets.append('st')
+
+        return targets
+
+    def science_steps_recorded(self):
+        """Determines if build_science_products records each of the science
+           steps it executes
+
+        Returns:
+            bool: True, since each science step is recorded on its own.
+        """
+
+        return True
 
     def build_science_products(self):
         """Build the science products requested by the user
+
+        Only the steps required for the requested products are executed,
+        following the dependencies defined by science_steps().
         """
 
         # Nothing to do if the user did not specify anything to build
@@ -1060,26 +1397,14 @@ class LandsatProcessor(CDRProcessor):
         current_directory = os.getcwd()
         os.chdir(self._work_dir)
 
-        try:
-            self.convert_to_raw_binary()
-
-            self.clip_band_misalignment()
-
-            self.generate_elevation_product()
-
-            self.generate_pixel_qa()
-
-            self.generate_sr_products()
+        # Record each science step on its own
+        steps = [step._replace(method=partial(self.run_step, step.method,
+                                              step.name))
+                 for step in self.science_steps()]
 
-            self.generate_dilated_cloud()
-
-            self.generate_cfmask_water_detection()
-
-            self.generate_spectral_indices()
-
-            self.generate_surface_water_extent()
-
-            self.generate_surface_temperature()
+        try:
+            step_scheduler.run_steps(steps, self.science_targets(),
+                                     logger=self._logger)
 
         finally:
             # Change back to the previous directory
@@ -1127,16 +1452,12 @@ class LandsatProcessor(CDRProcessor):
                     non_products.extend(glob.glob(item))
 
             if len(non_products) > 0:
-                cmd = ' '.join(['rm', '-rf'] + non_products)
+                cmd = ['rm', '-rf'] + non_products
                 self._logger.info(' '.join(['REMOVING INTERMEDIATE DATA'
-                                            ' COMMAND:', cmd]))
+                                            ' COMMAND:'] + cmd))
 
-                output = ''
-                try:
-                    output = utilities.execute_cmd(cmd)
-                finally:
-                    if len(output) > 0:
-                        self._logger.info(output)
+                utilities.execute_cmd(cmd, logger=self._logger,
+                                      timeout=self._command_timeout)
 
             self.remove_products_from_xml()
 
@@ -1144,18 +1465,11 @@ class LandsatProcessor(CDRProcessor):
             # Change back to the previous directory
             os.chdir(current_directory)
 
-    def generate_statistics(self):
-        """Generates statistics if required for the processor
+    def statistics_files_to_search_for(self):
+        """Provides the file name patterns of the stat'able' science products
+           keyed by band type
         """
 
-        options = self._parms['options']
-
-        # Nothing to do if the user did not specify anything to build
-        if not self._build_products or not options['include_statistics']:
-            return
-
-        # Generate the stats for each stat'able' science product
-
         # Hold the wild card strings in a type based dictionary
         files_to_search_for = dict()
 
@@ -1171,21 +1485,27 @@ class LandsatProcessor(CDRProcessor):
                                         '*_msavi.img']
         files_to_search_for['LANDSAT_ST'] = ['*_st.img']
 
-        # Build a command line arguments list
-        cmd = ['espa_statistics.py',
-               '--work_directory', self._work_dir,
-               "--files_to_search_for '{}'".format(json.dumps(files_to_search_for))]
+        return files_to_search_for
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
-        self._logger.info(' '.join(['SUMMARY LANDSAT STATISTICS COMMAND:', cmd]))
+    def generate_statistics(self):
+        """Generates statistics if required for the processor
+        """
 
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        options = self._parms['options']
+
+        # Nothing to do if the user did not specify anything to build
+        if not self._build_products or not options['include_statistics']:
+            return
+
+        # Generate the stats for each stat'able' science product
+        files_to_search_for = self.statistics_files_to_search_for()
+
+        self._logger.info('SUMMARY LANDSAT STATISTICS: {}'
+                          .format(json.dumps(files_to_search_for)))
+
+        band_statistics.generate_statistics(self._work_dir,
+                                            files_to_search_for,
+                                            logger=self._logger)
 
     def get_product_name(self):
         """Build the product name from the product information and current
@@ -1272,7 +1592,7 @@ class LandsatOLITIRSProcessor(LandsatProcessor):
         if not self.requires_sr_input:
             cmd.extend(['--process_sr', 'False'])
 
-        return ' '.join(cmd)
+        return cmd
 
 
 class LandsatOLIProcessor(LandsatOLITIRSProcessor):
@@ -1368,7 +1688,11 @@ class ModisProcessor(CDRProcessor):
         staged_file = os.path.join(self._stage_dir, file_name)
 
         # Download the source data
-        transfer.download_file_url(download_url, staged_file)
+        download_limiter = rate_limiter.get_rate_limiter(self._cfg,
+                                                         'download')
+        staging.stage_input_file(staging.get_input_cache(self._cfg),
+                                 product_id, download_url, staged_file,
+                                 download_limiter=download_limiter)
 
         self._hdf_filename = os.path.basename(staged_file)
         work_file = os.path.join(self._work_dir, self._hdf_filename)
@@ -1377,6 +1701,29 @@ class ModisProcessor(CDRProcessor):
         shutil.copyfile(staged_file, work_file)
         os.unlink(staged_file)
 
+    def checkpoint_state(self):
+        """Provides the processor state needed to resume from a checkpoint
+        """
+
+        state = super(ModisProcessor, self).checkpoint_state()
+        state['hdf_filename'] = self._hdf_filename
+
+        return state
+
+    def restore_checkpoint_state(self, state):
+        """Restores the processor state saved with a checkpoint
+        """
+
+        super(ModisProcessor, self).restore_checkpoint_state(state)
+        self._hdf_filename = state['hdf_filename']
+
+    def science_executables(self):
+        """Provides the names of the executables which generate the science
+           products
+        """
+
+        return ['convert_modis_to_espa']
+
     def convert_to_raw_binary(self):
         """Converts the Landsat(LPGS) input data to our internal raw binary
            format
@@ -1390,16 +1737,10 @@ class ModisProcessor(CDRProcessor):
         if not options['include_source_data']:
             cmd.append('--del_src_files')
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
-        self._logger.info(' '.join(['CONVERT MODIS TO ESPA COMMAND:', cmd]))
+        self._logger.info(' '.join(['CONVERT MODIS TO ESPA COMMAND:'] + cmd))
 
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        utilities.execute_cmd(cmd, logger=self._logger,
+                              timeout=self._command_timeout)
 
     def build_science_products(self):
         """Build the science products requested by the user
@@ -1421,7 +1762,7 @@ class ModisProcessor(CDRProcessor):
         os.chdir(self._work_dir)
 
         try:
-            self.convert_to_raw_binary()
+            self.run_step(self.convert_to_raw_binary)
 
         finally:
             # Change back to the previous directory
@@ -1435,18 +1776,11 @@ class ModisProcessor(CDRProcessor):
         # Nothing to do for Modis products
         return
 
-    def generate_statistics(self):
-        """Generates statistics if required for the processor
+    def statistics_files_to_search_for(self):
+        """Provides the file name patterns of the stat'able' science products
+           keyed by band type
         """
 
-        options = self._parms['options']
-
-        # Nothing to do if the user did not specify anything to build
-        if not self._build_products or not options['include_statistics']:
-            return
-
-        # Generate the stats for each stat'able' science product
-
         # Hold the wild card strings in a type based dictionary
         files_to_search_for = dict()
 
@@ -1460,21 +1794,27 @@ class ModisProcessor(CDRProcessor):
                                       '*LST_Night_6km.img']
         files_to_search_for['EMIS'] = ['*Emis_*.img']
 
-        # Build a command line arguments list
-        cmd = ['espa_statistics.py',
-               '--work_directory', self._work_dir,
-               "--files_to_search_for '{}'".format(json.dumps(files_to_search_for))]
+        return files_to_search_for
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
-        self._logger.info(' '.join(['SUMMARY MODIS STATISTICS COMMAND:', cmd]))
+    def generate_statistics(self):
+        """Generates statistics if required for the processor
+        """
 
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        options = self._parms['options']
+
+        # Nothing to do if the user did not specify anything to build
+        if not self._build_products or not options['include_statistics']:
+            return
+
+        # Generate the stats for each stat'able' science product
+        files_to_search_for = self.statistics_files_to_search_for()
+
+        self._logger.info('SUMMARY MODIS STATISTICS: {}'
+                          .format(json.dumps(files_to_search_for)))
+
+        band_statistics.generate_statistics(self._work_dir,
+                                            files_to_search_for,
+                                            logger=self._logger)
 
 
     def get_product_name(self):
@@ -1881,19 +2221,13 @@ class PlotProcessor(ProductProcessor):
         """
         # Build a command line arguments list
         cmd = ['espa_plotting.py',
-               "--band_type '{}'".format(band_type),
-               "--search_list '{}'".format(json.dumps(search_list))]
+               '--band_type', band_type,
+               '--search_list', json.dumps(search_list)]
 
-        # Turn the list into a string
-        cmd = ' '.join(cmd)
-        self._logger.info(' '.join(['SUMMARY STATISTICS AND PLOTTING COMMAND:', cmd]))
+        self._logger.info(' '.join(['SUMMARY STATISTICS AND PLOTTING COMMAND:'] + cmd))
 
-        output = ''
-        try:
-            output = utilities.execute_cmd(cmd)
-        finally:
-            if len(output) > 0:
-                self._logger.info(output)
+        utilities.execute_cmd(cmd, logger=self._logger,
+                              timeout=self._command_timeout)
 
     def process_stats(self):
         """Process the stat results to plots
@@ -1905,8 +2239,27 @@ class PlotProcessor(ProductProcessor):
         current_directory = os.getcwd()
         os.chdir(self._work_dir)
 
+        workers = settings.PLOTTING_WORKERS
+        if workers < 1:
+            workers = multiprocessing.cpu_count()
+
         try:
-            map(self.process_band_type, self.work_list)
+            # Find the statistics for all of the band types in a single pass
+            work_list = stats_index.index_band_types(os.listdir('.'),
+                                                     self.work_list)
+
+            workers = min(workers, len(work_list))
+            if workers > 1:
+                # Each band type is plotted by its own espa_plotting.py
+                # process, so threads are enough to keep them all busy
+                pool = ThreadPool(processes=workers)
+                try:
+                    pool.map(self.process_band_type, work_list, chunksize=1)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                map(self.process_band_type, work_list)
 
         finally:
             # Change back to the previous directory
@@ -1936,14 +2289,14 @@ class PlotProcessor(ProductProcessor):
         """
 
         # Stage the required input data
-        self.stage_input_data()
+        self.run_step(self.stage_input_data)
 
         # Create the combinded stats and plots
-        self.process_stats()
+        self.run_step(self.process_stats)
 
         # Package and deliver product
         (destination_product_file, destination_cksum_file) = \
-            self.distribute_product()
+            self.run_step(self.distribute_product)
 
         return (destination_product_file, destination_cksum_file)
 
@@ -39,79 +39,59 @@ def reformat(metadata_filename, work_directory, input_format, output_format):
         if input_format == 'envi' and output_format == 'gtiff':
             gtiff_name = metadata_filename.rstrip('.xml')
             # Call with deletion of source files
-            cmd = ' '.join(['convert_espa_to_gtif', '--del_src_files',
-                            '--xml', metadata_filename,
-                            '--gtif', gtiff_name])
+            cmd = ['convert_espa_to_gtif', '--del_src_files',
+                   '--xml', metadata_filename,
+                   '--gtif', gtiff_name]
 
-            output = ''
-            try:
-                output = utilities.execute_cmd(cmd)
+            utilities.execute_cmd(cmd, logger=logger)
 
-                # Rename the XML file back to *.xml from *_gtif.xml
-                meta_gtiff_name = metadata_filename.split('.xml')[0]
-                meta_gtiff_name = ''.join([meta_gtiff_name, '_gtif.xml'])
+            # Rename the XML file back to *.xml from *_gtif.xml
+            meta_gtiff_name = metadata_filename.split('.xml')[0]
+            meta_gtiff_name = ''.join([meta_gtiff_name, '_gtif.xml'])
 
-                os.rename(meta_gtiff_name, metadata_filename)
-            finally:
-                if len(output) > 0:
-                    logger.info(output)
+            os.rename(meta_gtiff_name, metadata_filename)
 
             # Remove all the *.tfw files since gtiff was chosen a bunch may
             # be present
             files_to_remove = glob.glob('*.tfw')
             if len(files_to_remove) > 0:
-                cmd = ' '.join(['rm', '-f'] + files_to_remove)
-                logger.info(' '.join(['REMOVING TFW DATA COMMAND:', cmd]))
+                cmd = ['rm', '-f'] + files_to_remove
+                logger.info(' '.join(['REMOVING TFW DATA COMMAND:'] + cmd))
 
-                output = ''
-                try:
-                    output = utilities.execute_cmd(cmd)
-                finally:
-                    if len(output) > 0:
-                        logger.info(output)
+                utilities.execute_cmd(cmd, logger=logger)
 
         # Convert from our internal ESPA/ENVI format to HDF
         elif input_format == 'envi' and output_format == 'hdf-eos2':
             # convert_espa_to_hdf
             hdf_name = metadata_filename.replace('.xml', '.hdf')
             # Call with deletion of source files
-            cmd = ' '.join(['convert_espa_to_hdf', '--del_src_files',
-                            '--xml', metadata_filename,
-                            '--hdf', hdf_name])
+            cmd = ['convert_espa_to_hdf', '--del_src_files',
+                   '--xml', metadata_filename,
+                   '--hdf', hdf_name]
 
-            output = ''
-            try:
-                output = utilities.execute_cmd(cmd)
+            utilities.execute_cmd(cmd, logger=logger)
 
-                # Rename the XML file back to *.xml from *_hdf.xml
-                meta_name = metadata_filename.replace('.xml', '_hdf.xml')
+            # Rename the XML file back to *.xml from *_hdf.xml
+            meta_name = metadata_filename.replace('.xml', '_hdf.xml')
 
-                os.rename(meta_name, metadata_filename)
-            finally:
-                if len(output) > 0:
-                    logger.info(output)
+            os.rename(meta_name, metadata_filename)
 
         # Convert from our internal ESPA/ENVI format to NetCDF
         elif input_format == 'envi' and output_format == 'netcdf':
             # convert_espa_to_netcdf
             netcdf_name = metadata_filename.replace('.xml', '.nc')
             # Call with deletion of source files
-            cmd = ' '.join(['convert_espa_to_netcdf',
-                            '--del_src_files',
-                            '--xml', metadata_filename,
-                            '--netcdf', netcdf_name])
-
-            output = ''
-            try:
-                output = utilities.execute_cmd(cmd)
-
-                # Rename the XML file back to *.xml from *_nc.xml
-                meta_name = metadata_filename.replace('.xml', '_nc.xml')
-
-                os.rename(meta_name, metadata_filename)
-            finally:
-                if len(output) > 0:
-                    logger.info(output)
+            cmd = ['convert_espa_to_netcdf',
+                   '--del_src_files',
+                   '--xml', metadata_filename,
+                   '--netcdf', netcdf_name]
+
+            utilities.execute_cmd(cmd, logger=logger)
+
+            # Rename the XML file back to *.xml from *_nc.xml
+            meta_name = metadata_filename.replace('.xml', '_nc.xml')
+
+            os.rename(meta_name, metadata_filename)
 
         # Requested conversion not implemented
         else:
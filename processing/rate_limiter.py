@@ -0,0 +1,169 @@
+'''
+Description: Provides token bucket rate limiting of the requests made to the
+             upstream services, shared by all of the mappers on the node.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import os
+import json
+import time
+import fcntl
+from time import sleep
+
+import settings
+import utilities
+from logging_tools import EspaLogging
+
+
+# The requests which can be rate limited, with the configuration option
+# providing the rate for each
+RATE_OPTIONS = {
+    'download': 'espa_download_rate_per_minute',
+    'api': 'espa_api_rate_per_minute'
+}
+
+
+class TokenBucket(object):
+    '''
+    Description:
+        A token bucket kept in a state file, so that the rate is enforced for
+        the total of the requests made by every process using the same file.
+
+    Notes:
+        The bucket refills at the rate up to its capacity, and each request
+        takes a token.  The capacity allows a burst of requests after the
+        bucket has been idle.  Access to the state file is serialized with
+        an exclusive lock, which is not held while waiting for tokens.
+    '''
+
+    def __init__(self, state_file, rate, capacity):
+        '''
+        Description:
+            Initialization for the object.
+
+        Parameters:
+            state_file - The file to keep the bucket state in.
+            rate - The number of tokens added per second.
+            capacity - The maximum number of tokens the bucket holds.
+        '''
+
+        self.state_file = os.path.abspath(state_file)
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+
+        utilities.create_directory(os.path.dirname(self.state_file))
+
+    def take(self, tokens=1, now=None):
+        '''
+        Description:
+            Takes the tokens if they are available.
+
+        Returns:
+            float - Zero if the tokens were taken, otherwise the number of
+                    seconds until they will be available.
+
+        Parameters:
+            tokens - The number of tokens to take.
+            now - The current time in seconds since the epoch, defaults to
+                  now.
+        '''
+
+        if now is None:
+            now = time.time()
+
+        with open(self.state_file, 'a+') as state_fd:
+            fcntl.flock(state_fd, fcntl.LOCK_EX)
+            try:
+                state_fd.seek(0)
+                try:
+                    state = json.loads(state_fd.read())
+                except ValueError:
+                    # A new bucket starts full
+                    state = dict(tokens=self.capacity, updated=now)
+
+                elapsed = max(0.0, now - state['updated'])
+                available = min(self.capacity,
+                                state['tokens'] + elapsed * self.rate)
+
+                wait_seconds = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait_seconds = (tokens - available) / self.rate
+
+                state_fd.seek(0)
+                state_fd.truncate()
+                state_fd.write(json.dumps(dict(tokens=available,
+                                               updated=now)))
+                state_fd.flush()
+            finally:
+                fcntl.flock(state_fd, fcntl.LOCK_UN)
+
+        return wait_seconds
+
+    def acquire(self, tokens=1):
+        '''
+        Description:
+            Waits until the tokens are available and takes them.
+
+        Returns:
+            float - The number of seconds waited.
+        '''
+
+        waited = 0.0
+        while True:
+            wait_seconds = self.take(tokens)
+            if not wait_seconds:
+                return waited
+
+            sleep(wait_seconds)
+            waited += wait_seconds
+
+
+def get_rate_limiter(cfg, name):
+    '''
+    Description:
+        Returns the rate limiter for the named requests, or None if they are
+        not rate limited.
+
+    Parameters:
+        cfg - The processing configuration.
+        name - One of the RATE_OPTIONS.
+    '''
+
+    option = RATE_OPTIONS[name]
+
+    if (not cfg.has_option('processing', 'espa_rate_limit_dir') or
+            not cfg.get('processing', 'espa_rate_limit_dir') or
+            not cfg.has_option('processing', option)):
+        return None
+
+    per_minute = cfg.getfloat('processing', option)
+    if per_minute <= 0:
+        return None
+
+    rate = per_minute / 60.0
+    capacity = max(1.0, rate * settings.RATE_LIMIT_BURST_SECONDS)
+
+    return TokenBucket(os.path.join(cfg.get('processing',
+                                            'espa_rate_limit_dir'),
+                                    '.'.join([name, 'bucket'])),
+                       rate, capacity)
+
+
+def acquire(rate_limiter, description):
+    '''
+    Description:
+        Waits for the rate limiter, if there is one, before a request.
+    '''
+
+    if rate_limiter is None:
+        return
+
+    waited = rate_limiter.acquire()
+    if waited:
+        logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+        logger.info('Rate limited [{0}] for {1:.1f} seconds'
+                    .format(description, waited))
@@ -0,0 +1,181 @@
+'''
+Description: Provides sessions for running commands and transferring files
+             to a destination host over a single connection.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import os
+import glob
+import shutil
+import tempfile
+
+import settings
+import utilities
+
+
+class SshSession(object):
+    '''
+    Description:
+        Runs the commands and transfers for a destination host over one
+        multiplexed ssh connection.
+
+    Notes:
+        The first command opens a master connection which stays in the
+        background, and all of the following commands and transfers are sent
+        as channels over it instead of performing their own handshake.  If
+        the master connection is lost, the next command opens a new one.
+    '''
+
+    def __init__(self, host):
+        '''
+        Description:
+            Initialization for the object.
+
+        Parameters:
+            host - The destination host.
+        '''
+
+        self.host = host
+
+        # Keep the socket path short, it is limited to about 100 characters
+        self._control_dir = tempfile.mkdtemp(prefix='espa-ssh-')
+        self._control_path = os.path.join(self._control_dir, 'master')
+
+    def ssh_options(self):
+        '''
+        Description:
+            Returns the options for connecting through the master connection.
+        '''
+
+        return ['-q',
+                '-o', 'StrictHostKeyChecking=no',
+                '-o', 'ControlMaster=auto',
+                '-o', 'ControlPath={0}'.format(self._control_path),
+                '-o', 'ControlPersist={0}'
+                .format(settings.SSH_CONTROL_PERSIST_SECONDS)]
+
+    def ssh_command(self, args):
+        '''
+        Description:
+            Returns the ssh arguments which run the command on the
+            destination host.
+
+        Notes:
+            The command is given to ssh as a single argument, so that wild
+            cards, redirections, and shell operators are all interpreted by
+            the shell on the destination host.
+        '''
+
+        cmd = ['ssh']
+        cmd.extend(self.ssh_options())
+        cmd.append(self.host)
+        cmd.append(' '.join(args))
+
+        return cmd
+
+    def run(self, args):
+        '''
+        Description:
+            Execute a command on the destination host.
+
+        Returns:
+            output - The stdout and/or stderr from the command.
+
+        Parameters:
+            args - The command as a list, wild cards are expanded on the
+                   destination host.
+        '''
+
+        return utilities.execute_cmd(self.ssh_command(args))
+
+    def put(self, source_file, destination_file):
+        '''
+        Description:
+            Transfer local file(s) to the destination host.
+
+        Notes:
+            If wild cards are used in the source, then the destination must
+            be a directory.
+        '''
+
+        cmd = ['scp']
+        cmd.extend(self.ssh_options())
+        cmd.append('-C')
+        # Wild cards in the source are expanded here, as the shell would
+        cmd.extend(glob.glob(source_file) or [source_file])
+        cmd.append('{0}:{1}'.format(self.host, destination_file))
+
+        return utilities.execute_cmd(cmd)
+
+    def close(self):
+        '''
+        Description:
+            Stop the master connection and remove its socket.
+        '''
+
+        try:
+            if os.path.exists(self._control_path):
+                cmd = ['ssh', '-q',
+                       '-o', 'ControlPath={0}'.format(self._control_path),
+                       '-O', 'exit', self.host]
+                try:
+                    utilities.execute_cmd(cmd)
+                except Exception:
+                    # It may have already gone away
+                    pass
+        finally:
+            shutil.rmtree(self._control_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class LocalSession(object):
+    '''
+    Description:
+        Provides the same interface as SshSession for a destination which is
+        the local host, running the commands and copies locally.
+    '''
+
+    def __init__(self, host='localhost'):
+        self.host = host
+
+    def run(self, args):
+        # The local shell is the shell of the destination host
+        return utilities.execute_cmd(['/bin/sh', '-c', ' '.join(args)])
+
+    def put(self, source_file, destination_file):
+        source_files = glob.glob(source_file)
+        if not source_files:
+            raise Exception('No files match [{0}]'.format(source_file))
+
+        for filename in source_files:
+            shutil.copy(filename, destination_file)
+
+        return ''
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_session(host):
+    '''
+    Description:
+        Returns the session to use for the destination host.
+    '''
+
+    if host == 'localhost':
+        return LocalSession(host)
+
+    return SshSession(host)
@@ -0,0 +1,216 @@
+'''
+Description: Provides a local database of the runtime of each processed
+             scene, and percentile runtimes for each class of request.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import json
+import time
+import sqlite3
+from collections import defaultdict
+
+import settings
+
+
+RUNTIME_COLUMNS = ['recorded',
+                   'node',
+                   'order_id',
+                   'product_id',
+                   'product_type',
+                   'sensor',
+                   'options_hash',
+                   'reproject',
+                   'output_format',
+                   'status',
+                   'elapsed_seconds',
+                   'bytes_in',
+                   'bytes_out',
+                   'steps']
+
+# The columns which define a class of request
+CLASS_COLUMNS = ['sensor', 'options_hash', 'reproject', 'output_format']
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS runtimes (
+           id INTEGER PRIMARY KEY,
+           recorded REAL NOT NULL,
+           node TEXT,
+           order_id TEXT,
+           product_id TEXT,
+           product_type TEXT,
+           sensor TEXT,
+           options_hash TEXT,
+           reproject INTEGER,
+           output_format TEXT,
+           status TEXT,
+           elapsed_seconds REAL,
+           bytes_in INTEGER,
+           bytes_out INTEGER,
+           steps TEXT)''',
+    '''CREATE INDEX IF NOT EXISTS runtimes_class
+           ON runtimes (sensor, options_hash, reproject, output_format)'''
+]
+
+
+def percentile(sorted_values, percent):
+    '''
+    Description:
+        Returns the percentile of the sorted values, interpolating between
+        the closest ranks.
+    '''
+
+    if not sorted_values:
+        return None
+
+    position = (len(sorted_values) - 1) * (percent / 100.0)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+
+    return (sorted_values[lower] +
+            (sorted_values[upper] - sorted_values[lower]) *
+            (position - lower))
+
+
+class RuntimeDatabase(object):
+    '''
+    Description:
+        An SQLite database of scene runtimes, which may be shared by all of
+        the mappers on the node.
+    '''
+
+    def __init__(self, filename):
+        '''
+        Description:
+            Initialization for the object.
+
+        Parameters:
+            filename - The SQLite database file, created if it does not
+                       exist.
+        '''
+
+        self.filename = filename
+
+        connection = self.connect()
+        try:
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+        finally:
+            connection.close()
+
+    def connect(self):
+        '''
+        Description:
+            Returns a new connection to the database, which waits for the
+            other mappers to finish writing.
+        '''
+
+        return sqlite3.connect(self.filename,
+                               timeout=settings.RUNTIME_DB_TIMEOUT)
+
+    def record(self, runtime):
+        '''
+        Description:
+            Adds the runtime record of a scene.
+
+        Parameters:
+            runtime - A dict with the RUNTIME_COLUMNS, where steps is a dict
+                      of the duration of each step in seconds.  recorded
+                      defaults to now.
+        '''
+
+        values = dict(runtime)
+        values.setdefault('recorded', time.time())
+        values['steps'] = json.dumps(values.get('steps') or dict(),
+                                     sort_keys=True)
+
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute(
+                    'INSERT INTO runtimes ({0}) VALUES ({1})'
+                    .format(', '.join(RUNTIME_COLUMNS),
+                            ', '.join(['?'] * len(RUNTIME_COLUMNS))),
+                    [values.get(column) for column in RUNTIME_COLUMNS])
+        finally:
+            connection.close()
+
+    def percentile_runtimes(self, percents=(50, 90, 99), status='success',
+                            since=None, **class_filter):
+        '''
+        Description:
+            Returns the percentile runtimes for each class of request.
+
+        Parameters:
+            percents - The percentiles to determine.
+            status - Only include the records with this status, all of them
+                     when None.
+            since - Only include the records after this time in seconds
+                    since the epoch.
+            class_filter - Only include the classes with these values for
+                           the CLASS_COLUMNS.
+
+        Returns:
+            dict - For each class tuple of the CLASS_COLUMNS values, a dict
+                   with the count and the elapsed seconds for each
+                   percentile keyed as p50, p90, ...
+        '''
+
+        conditions = list()
+        arguments = list()
+
+        if status is not None:
+            conditions.append('status = ?')
+            arguments.append(status)
+
+        if since is not None:
+            conditions.append('recorded >= ?')
+            arguments.append(since)
+
+        for (column, value) in sorted(class_filter.items()):
+            if column not in CLASS_COLUMNS:
+                raise ValueError('Invalid request class column [{0}]'
+                                 .format(column))
+            conditions.append('{0} = ?'.format(column))
+            arguments.append(value)
+
+        query = ('SELECT {0}, elapsed_seconds FROM runtimes'
+                 .format(', '.join(CLASS_COLUMNS)))
+        if conditions:
+            query = ' WHERE '.join([query, ' AND '.join(conditions)])
+
+        elapsed = defaultdict(list)
+
+        connection = self.connect()
+        try:
+            for row in connection.execute(query, arguments):
+                elapsed[tuple(row[:-1])].append(row[-1])
+        finally:
+            connection.close()
+
+        results = dict()
+        for (request_class, values) in elapsed.items():
+            values.sort()
+
+            result = dict(count=len(values))
+            for percent in percents:
+                result['p{0}'.format(percent)] = percentile(values, percent)
+
+            results[request_class] = result
+
+        return results
+
+
+def get_runtime_db(cfg):
+    '''
+    Description:
+        Returns the runtime database, or None if it has not been configured.
+    '''
+
+    if (not cfg.has_option('processing', 'espa_runtime_db') or
+            not cfg.get('processing', 'espa_runtime_db')):
+        return None
+
+    return RuntimeDatabase(cfg.get('processing', 'espa_runtime_db'))
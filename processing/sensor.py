@@ -106,7 +106,9 @@ def landsat_sensor_info(product_id):
     path = path_row[0:3]
     row = path_row[3:]
 
-    date_acquired = datetime.datetime.strptime(date_acq, '%Y%m%d').date()
+    # Much faster than strptime, and still validates the date
+    date_acquired = datetime.date(int(date_acq[0:4]), int(date_acq[4:6]),
+                                  int(date_acq[6:8]))
 
     # Determine the product prefix
     product_prefix = ('{0}{1:>03}{2:>03}{3:>08}{4:>02}{5:>02}'
@@ -150,10 +152,13 @@ def modis_sensor_info(product_id):
     short_name = parts[0]
 
     date_YYYYDDD = parts[1][1:]
-    date_acquired = datetime.datetime.strptime(date_YYYYDDD, '%Y%j').date()
+    year = int(date_YYYYDDD[0:4])
+    doy = int(date_YYYYDDD[4:7])
 
-    year = date_acquired.year
-    doy = date_acquired.timetuple().tm_yday
+    # Much faster than strptime, with the same validation
+    date_acquired = datetime.date(year, 1, 1) + datetime.timedelta(doy - 1)
+    if doy < 1 or date_acquired.year != year:
+        raise ValueError('Invalid day of year [{0}]'.format(date_YYYYDDD))
 
     horizontal = parts[2][1:3]
     vertical = parts[2][4:6]
@@ -275,6 +280,26 @@ MODIS_REGEXP_MAPPING = {
 }
 
 
+"""All of the Product ID expressions combined into a single compiled
+   expression, with a group named by the mapping key for each of them.
+"""
+PRODUCT_ID_PARSERS = dict((key, parser)
+                          for mapping in (LANDSAT_COLLECTION_REGEXP_MAPPING,
+                                          MODIS_REGEXP_MAPPING)
+                          for (key, (expression, parser)) in mapping.items())
+
+PRODUCT_ID_REGEXP = re.compile('|'.join(
+    '(?P<{0}>{1})'.format(key, mapping[key][0])
+    for mapping in (LANDSAT_COLLECTION_REGEXP_MAPPING, MODIS_REGEXP_MAPPING)
+    for key in sorted(mapping)))
+
+
+LANDSAT8_SENSOR_CODES = (LC08_SENSOR_CODE, LO08_SENSOR_CODE, LT08_SENSOR_CODE)
+LANDSAT_SENSOR_CODES = (LANDSAT8_SENSOR_CODES +
+                        (LE07_SENSOR_CODE, LT05_SENSOR_CODE, LT04_SENSOR_CODE))
+MODIS_SENSOR_CODES = (TERRA_SENSOR_CODE, AQUA_SENSOR_CODE)
+
+
 def is_landsat4(a):
     return a.upper().startswith(LT04_SENSOR_CODE)
 
@@ -300,23 +325,23 @@ def is_lo08(a):
 
 
 def is_landsat8(a):
-    return any([is_lc08(a), is_lo08(a), is_lt08(a)])
+    return a.upper().startswith(LANDSAT8_SENSOR_CODES)
 
 
 def is_landsat(a):
-    return any([is_landsat8(a), is_landsat7(a), is_landsat5(a), is_landsat4(a)])
+    return a.upper().startswith(LANDSAT_SENSOR_CODES)
 
 
 def is_terra(a):
-    return a.upper().startswith('MOD')
+    return a.upper().startswith(TERRA_SENSOR_CODE)
 
 
 def is_aqua(a):
-    return a.upper().startswith('MYD')
+    return a.upper().startswith(AQUA_SENSOR_CODE)
 
 
 def is_modis(a):
-    return any([is_terra(a), is_aqua(a)])
+    return a.upper().startswith(MODIS_SENSOR_CODES)
 
 
 class ProductNotImplemented(NotImplementedError):
@@ -329,6 +354,44 @@ LANDSAT_COLLECTION_ID_LENGTH = 40
 MODIS_COLLECTION_ID_LENGTH = 41
 
 
+def clean_product_id(product_id):
+    """Returns the Product ID from a Product ID or a filename prefixed with it
+
+    Args:
+        product_id (str): The Product ID or filename.
+
+    Returns:
+        str: The Product ID, or None if it is not from a supported sensor.
+    """
+
+    temp_id = product_id.strip()
+
+    if is_landsat(temp_id):
+        return temp_id[:LANDSAT_COLLECTION_ID_LENGTH]
+    elif is_modis(temp_id):
+        return temp_id[:MODIS_COLLECTION_ID_LENGTH]
+
+    return None
+
+
+def classify(product_id):
+    """Determine which supported Product ID format a Product ID matches
+
+    Args:
+        product_id (str): The Product ID.
+
+    Returns:
+        str: The key of the matching expression, or None if it is not a
+             supported Product ID format.
+    """
+
+    match = PRODUCT_ID_REGEXP.match(product_id.lower())
+    if match is None:
+        return None
+
+    return match.lastgroup
+
+
 class sensor_memoize(object):
     """Implements a special memoize decorator for sensor information
 
@@ -349,17 +412,12 @@ class sensor_memoize(object):
         """
 
         # Make sure we use a clean Product ID.
-        temp_id = args[0].strip()
-        product_id = None
+        product_id = clean_product_id(args[0])
 
         # Only usethe Product ID
-        if is_landsat(temp_id):
-            product_id = temp_id[:LANDSAT_COLLECTION_ID_LENGTH]
-        elif is_modis(temp_id):
-            product_id = temp_id[:MODIS_COLLECTION_ID_LENGTH]
-        else:
+        if product_id is None:
             raise ProductNotImplemented('[{0}] is not a supported product'
-                                        .format(temp_id))
+                                        .format(args[0].strip()))
 
         # Check if we already have it before creating a new one
         try:
@@ -379,22 +437,72 @@ def info(product_id):
                           ID is prefixed on the filename.
     """
 
-    mapping = None
-
     # We only support an explicit set of Product ID formats, so that
     # processing breaks if it is changed
-    if is_landsat(product_id):
-        mapping = LANDSAT_COLLECTION_REGEXP_MAPPING
+    key = classify(product_id)
+
+    if key is None:
+        raise ProductNotImplemented('[{0}] is not a supported Product ID'
+                                    ' format'.format(product_id))
+
+    return PRODUCT_ID_PARSERS[key](product_id)
+
+
+def bulk_info(product_ids):
+    """Return the sensor information for many Product IDs in one pass
+
+    Args:
+        product_ids (iterable): The Product IDs, or filenames prefixed with
+                                them.  Can be a list or an array.
+
+    Returns:
+        list: The SensorInfo for each Product ID in the same order, or None
+              for the ones which are not supported.
+    """
+
+    # Share the information already determined for single Product IDs
+    memory = info.memory
+
+    results = list()
+    for temp_id in product_ids:
+        product_id = clean_product_id(str(temp_id))
 
-    elif is_modis(product_id):
-        mapping = MODIS_REGEXP_MAPPING
+        sensor_info = None
+        if product_id is not None:
+            sensor_info = memory.get(product_id)
 
-    test_id = product_id.lower()
+            if sensor_info is None:
+                key = classify(product_id)
+                if key is not None:
+                    sensor_info = PRODUCT_ID_PARSERS[key](product_id)
+                    memory[product_id] = sensor_info
 
-    # Search through the dictionary and return the object for the match
-    for key in mapping.iterkeys():
-        if re.match(mapping[key][0], test_id):
-            return mapping[key][1](product_id)
+        results.append(sensor_info)
+
+    return results
+
+
+def group_by_sensor(product_ids):
+    """Validate and group many Product IDs by their sensor
+
+    Args:
+        product_ids (iterable): The Product IDs.
+
+    Returns:
+        (dict, list): The Product IDs keyed by sensor name, and the Product
+                      IDs which are not supported.
+    """
+
+    product_ids = list(product_ids)
+
+    groups = dict()
+    unsupported = list()
+
+    for (product_id, sensor_info) in zip(product_ids, bulk_info(product_ids)):
+        if sensor_info is None:
+            unsupported.append(product_id)
+        else:
+            groups.setdefault(sensor_info.sensor_name, list()).append(
+                product_id)
 
-    raise ProductNotImplemented('[{0}] is not a supported Product ID format'
-                                .format(product_id))
+    return (groups, unsupported)
@@ -9,6 +9,10 @@ MODIS_INPUT_FILENAME_EXTENSION = '.hdf'
 ESPA_REMOTE_CACHE_DIRECTORY = '/data2/science_lsrd/LSRD/orders'
 ESPA_LOCAL_CACHE_DIRECTORY = ''
 
+# Name of the file in an input cache entry recording the size and
+# modification time of its file when the checksum was verified
+INPUT_CACHE_VERIFIED_FILENAME = '.verified'
+
 # Number of seconds to sleep when errors are encountered before attempting the
 # task again
 DEFAULT_SLEEP_SECONDS = 2
@@ -18,8 +22,19 @@ MAX_PACKAGING_ATTEMPTS = 3
 MAX_DELIVERY_ATTEMPTS = 3
 MAX_DISTRIBUTION_ATTEMPTS = 5
 
-# Maximum number of times to attempt setting the scene error
-MAX_SET_SCENE_ERROR_ATTEMPTS = 5
+# Maximum number of times to attempt streaming input data into the work
+# directory
+MAX_STAGING_ATTEMPTS = 3
+
+# Compression level used when packaging products, matches the gzip default
+PACKAGING_COMPRESS_LEVEL = 6
+
+# Parallel gzip compression of products, when enabled for the distribution
+# method with the espa_parallel_gzip_<method> configuration option.  The
+# data is compressed in blocks of the specified size by the specified number
+# of processes.
+PACKAGING_GZIP_WORKERS = 4
+PACKAGING_GZIP_BLOCK_SIZE = 8388608
 
 # Specify the checksum tool and filename extension
 ESPA_CHECKSUM_TOOL = 'md5sum'
@@ -31,6 +46,14 @@ PLOT_MARKER = (1, 3, 0)    # Better circle than 'o'
 PLOT_MARKER_SIZE = 4.0     # A good size for the circle or diamond
 PLOT_MARKER_EDGE_WIDTH = 0.9  # The width of the black marker border
 
+# Maximum number of band types to plot at the same time, zero uses the number
+# of processors on the node
+PLOTTING_WORKERS = 0
+
+# Largest search list argument of exact statistics file names to provide to
+# the plotting, larger ones provide the file name patterns instead
+PLOTTING_MAX_SEARCH_LIST_BYTES = 65536
+
 # We are only supporting one radius when warping to sinusoidal
 SINUSOIDAL_SPHERE_RADIUS = 6371007.181
 
@@ -48,6 +71,38 @@ VALID_DATUMS = [WGS84, NAD27, NAD83]
 
 TRANSFER_BLOCK_SIZE = 10485760
 
+# Number of seconds to wait for the other mappers to finish writing to the
+# runtime database
+RUNTIME_DB_TIMEOUT = 60
+
+# Number of seconds of requests to the upstream services allowed in a burst,
+# after the rate limit has not been reached for a while
+RATE_LIMIT_BURST_SECONDS = 10
+
+# Number of hours after which the checkpoint of a failed product, and its
+# product directory, are purged as abandoned
+CHECKPOINT_TTL_HOURS = 24
+
+# Number of the last lines of a command's output to keep for the error
+# message, when the output is being logged as it is produced
+EXECUTE_CMD_TAIL_LINES = 100
+
+# Number of concurrent byte range connections to use for http downloads,
+# when supported by the server.  Set to 1 to use a single connection.
+TRANSFER_SEGMENT_COUNT = 1
+
+# Maximum number of times to attempt each byte range of a download
+MAX_SEGMENT_ATTEMPTS = 3
+
+# Number of seconds to wait before the first retry of a download, doubled for
+# each later retry up to the maximum
+HTTP_RETRY_BACKOFF_SECONDS = 2
+HTTP_RETRY_MAX_SLEEP_SECONDS = 60
+
+# Number of seconds an idle ssh master connection to a destination host is
+# kept open for reuse
+SSH_CONTROL_PERSIST_SECONDS = 300
+
 # We do not allow any user selectable choices for this projection
 GEOGRAPHIC_PROJ4_STRING = "+proj=longlat +ellps=WGS84 +datum=WGS84 +no_defs"
 
@@ -102,6 +157,13 @@ BAND_TYPE_STAT_RANGES = {
 MODIS_LST_SCALE = 0.02
 LANDSAT_ST_SCALE = 0.1
 
+# Maximum number of bands to generate statistics for at the same time, zero
+# uses the number of processors on the node
+STATISTICS_WORKERS = 0
+
+# Number of lines of a band read at a time when generating statistics
+STATISTICS_BLOCK_LINES = 512
+
 
 '''
 LOGGING DEFINITIONS
@@ -9,11 +9,19 @@ License: NASA Open Source Agreement 1.3
 import os
 import sys
 import glob
+import json
+import zlib
+import hashlib
+import tarfile
+import shutil
+from time import sleep
 
 import settings
 import utilities
 from logging_tools import EspaLogging
 from environment import Environment, DISTRIBUTION_METHOD_LOCAL
+from local_cache import LocalCache
+import rate_limiter
 import transfer
 
 
@@ -29,22 +37,450 @@ def untar_data(source_file, destination_directory):
     logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
     # If both source and destination are localhost we can just copy the data
-    cmd = ' '.join(['tar', '--directory', destination_directory,
-                    '-xvf', source_file])
+    cmd = ['tar', '--directory', destination_directory,
+           '-xvf', source_file]
 
     logger.info("Unpacking [%s] to [%s]"
                 % (source_file, destination_directory))
 
     # Unpack the data and raise any errors
-    output = ''
     try:
-        output = utilities.execute_cmd(cmd)
+        utilities.execute_cmd(cmd, logger=logger)
     except Exception:
         logger.exception("Failed to unpack data")
         raise
-    finally:
-        if len(output) > 0:
-            logger.info(output)
+
+
+class GzipStreamReader(object):
+    '''
+    Description:
+        Provides a file-like object which decompresses a gzip stream as it
+        is read, so that it can be given to the tarfile module.
+
+    Notes:
+        The number of compressed bytes and their MD5 checksum are tracked as
+        they pass through.  The gzip CRC32 and size are verified by zlib when
+        the end of each member is decompressed.  An archive made of several
+        gzip members, as written by pigz or bgzip or by concatenating them,
+        is decompressed as a single stream, the same as gzip does.
+    '''
+
+    def __init__(self, source):
+        '''
+        Description:
+            Initialization for the object.
+
+        Parameters:
+            source - An iterable providing the compressed data in blocks.
+        '''
+
+        self._source = iter(source)
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._buffer = ''
+        self._offset = 0
+        self._eof = False
+        self._padding = False
+
+        self.compressed_bytes = 0
+        self.md5 = hashlib.md5()
+
+    def _decompress(self, data_chunk):
+        '''
+        Description:
+            Decompresses a block, starting a new member for any data which
+            follows the end of the current one.
+        '''
+
+        if self._padding:
+            if data_chunk.strip('\0'):
+                raise Exception("Unexpected data after the gzip padding")
+            return ''
+
+        data = [self._decompressor.decompress(data_chunk)]
+
+        while self._decompressor.unused_data:
+            remainder = self._decompressor.unused_data
+            if not remainder.strip('\0'):
+                # Zeros after the last member, which gzip also ignores
+                self._padding = True
+                break
+
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data.append(self._decompressor.decompress(remainder))
+
+        return ''.join(data)
+
+    def _member_complete(self):
+        '''
+        Description:
+            Determines if the current member has been decompressed through
+            its trailer, by checking that any more data would be left over.
+        '''
+
+        if self._padding:
+            return True
+
+        probe = self._decompressor.copy()
+        try:
+            probe.decompress('\0')
+        except zlib.error:
+            return False
+
+        return probe.unused_data == '\0'
+
+    def _fill(self):
+        '''
+        Description:
+            Decompresses the next block from the source into the buffer.
+        '''
+
+        try:
+            data_chunk = next(self._source)
+        except StopIteration:
+            if not self._member_complete():
+                raise Exception("Truncated gzip stream after %d bytes"
+                                % self.compressed_bytes)
+            data = self._decompressor.flush()
+            self._eof = True
+        else:
+            self.compressed_bytes += len(data_chunk)
+            self.md5.update(data_chunk)
+            data = self._decompress(data_chunk)
+
+        self._buffer = ''.join([self._buffer[self._offset:], data])
+        self._offset = 0
+
+    def read(self, size=-1):
+        '''
+        Description:
+            Returns up to size bytes of decompressed data.
+        '''
+
+        while (not self._eof and
+               (size < 0 or len(self._buffer) - self._offset < size)):
+            self._fill()
+
+        if size < 0:
+            size = len(self._buffer) - self._offset
+
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+
+        return data
+
+    def drain(self):
+        '''
+        Description:
+            Reads and verifies the remainder of the stream.
+        '''
+
+        while not self._eof:
+            self._fill()
+            self._buffer = ''
+            self._offset = 0
+
+
+def stream_untar_url(download_url, destination_directory,
+                     download_limiter=None):
+    '''
+    Description:
+        Extract the contents of a '*.tar.gz' URL into a destination directory
+        while it is being downloaded, without staging the archive on disk.
+
+    Notes:
+        The data received is verified against the size and the MD5 checksum
+        reported for the source, when they are available.  Any files
+        extracted by a failed attempt are removed before trying again.  Each
+        attempt waits for the download limiter, if one is provided.
+    '''
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    attempt = 0
+    sleep_seconds = settings.DEFAULT_SLEEP_SECONDS
+    while True:
+        extracted = list()
+        try:
+            rate_limiter.acquire(download_limiter, download_url)
+
+            logger.info("Streaming [%s] to [%s]"
+                        % (download_url, destination_directory))
+
+            source_info = dict()
+            reader = GzipStreamReader(
+                transfer.stream_url(download_url, source_info=source_info))
+
+            tar = tarfile.open(fileobj=reader, mode='r|')
+            try:
+                for member in tar:
+                    # Never allow writing outside of the destination
+                    name = os.path.normpath(member.name)
+                    if os.path.isabs(name) or name.startswith(os.pardir):
+                        raise Exception("Refusing to extract [%s]"
+                                        % member.name)
+
+                    logger.info(member.name)
+                    extracted.append(os.path.join(destination_directory,
+                                                  name))
+                    tar.extract(member, destination_directory)
+            finally:
+                tar.close()
+
+            # Make sure everything was received and is valid
+            reader.drain()
+
+            cksum_value = reader.md5.hexdigest()
+
+            expected_bytes = source_info.get('size')
+            if (expected_bytes is not None and
+                    reader.compressed_bytes != expected_bytes):
+                raise Exception("Retrieved %d out of %d bytes"
+                                % (reader.compressed_bytes, expected_bytes))
+
+            expected_cksum = source_info.get('md5')
+            if expected_cksum is not None and cksum_value != expected_cksum:
+                raise Exception("MD5 [%s] does not match the source [%s]"
+                                % (cksum_value, expected_cksum))
+
+            logger.info("Unpacked %d bytes with MD5 [%s]"
+                        % (reader.compressed_bytes, cksum_value))
+
+        except Exception:
+            logger.exception("Failed to stream and unpack data")
+
+            for path in reversed(extracted):
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif os.path.lexists(path):
+                    os.unlink(path)
+
+            if attempt < settings.MAX_STAGING_ATTEMPTS:
+                sleep(sleep_seconds)  # sleep before trying again
+                attempt += 1
+                sleep_seconds = int(sleep_seconds * 1.5)
+                continue
+            else:
+                raise
+
+        break
+
+
+def get_input_cache(cfg):
+    '''
+    Description:
+        Returns the node-local input data cache, or None if it has not been
+        configured.
+    '''
+
+    if (not cfg.has_option('processing', 'espa_input_cache_dir') or
+            not cfg.get('processing', 'espa_input_cache_dir')):
+        return None
+
+    cache_dir = cfg.get('processing', 'espa_input_cache_dir')
+    max_bytes = int(cfg.getfloat('processing', 'espa_input_cache_max_gb') *
+                    1024 * 1024 * 1024)
+
+    return LocalCache(cache_dir, max_bytes)
+
+
+def get_science_cache(cfg):
+    '''
+    Description:
+        Returns the node-local science product cache, or None if it has not
+        been configured.
+    '''
+
+    if (not cfg.has_option('processing', 'espa_science_cache_dir') or
+            not cfg.get('processing', 'espa_science_cache_dir')):
+        return None
+
+    cache_dir = cfg.get('processing', 'espa_science_cache_dir')
+    max_bytes = int(cfg.getfloat('processing', 'espa_science_cache_max_gb') *
+                    1024 * 1024 * 1024)
+
+    return LocalCache(cache_dir, max_bytes)
+
+
+def copy_directory_contents(source_directory, destination_directory):
+    '''
+    Description:
+        Copies the files and directories under the source directory into the
+        destination directory.
+    '''
+
+    for name in os.listdir(source_directory):
+        source_path = os.path.join(source_directory, name)
+        destination_path = os.path.join(destination_directory, name)
+
+        if os.path.isdir(source_path) and not os.path.islink(source_path):
+            shutil.copytree(source_path, destination_path, symlinks=True)
+        else:
+            shutil.copy2(source_path, destination_path)
+
+
+def stage_science_products(science_cache, cache_key, work_dir):
+    '''
+    Description:
+        Stages the science products built for an identical request into the
+        work directory, from the science product cache.
+
+    Returns:
+        True - The science products were staged
+        False - They are not in the cache
+
+    Notes:
+        The cached work tree is copied, not linked, since the customization
+        and formatting modify the products in place.
+    '''
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    def copy_cached_products(entry_path):
+        logger.info("Staging science products from the science cache [%s]"
+                    % entry_path)
+        copy_directory_contents(entry_path, work_dir)
+
+    return science_cache.retrieve(cache_key, copy_cached_products)
+
+
+def cache_science_products(science_cache, cache_key, work_dir):
+    '''
+    Description:
+        Adds the science products in the work directory to the science
+        product cache, before they are customized.
+    '''
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    logger.info("Adding [%s] to the science cache" % cache_key)
+
+    def copy_work_dir(entry_path):
+        shutil.copytree(work_dir, entry_path, symlinks=True)
+
+    science_cache.populate(cache_key, copy_work_dir)
+
+
+def cached_checksum_path(cached_file):
+    '''
+    Description:
+        Returns the file recording when the checksum of a cached file was
+        verified.
+    '''
+
+    return os.path.join(os.path.dirname(cached_file),
+                        settings.INPUT_CACHE_VERIFIED_FILENAME)
+
+
+def record_cached_checksum(cached_file):
+    '''
+    Description:
+        Records the size and modification time of a cached file, after its
+        checksum has been verified.
+    '''
+
+    stat_info = os.stat(cached_file)
+
+    record_path = cached_checksum_path(cached_file)
+    temp_path = '.'.join([record_path, str(os.getpid())])
+    with open(temp_path, 'w') as record_fd:
+        json.dump(dict(size=stat_info.st_size, mtime=stat_info.st_mtime),
+                  record_fd)
+    os.rename(temp_path, record_path)
+
+
+def cached_checksum_verified(cached_file):
+    '''
+    Description:
+        Determines if a cached file is unchanged since its checksum was
+        verified.
+    '''
+
+    try:
+        with open(cached_checksum_path(cached_file)) as record_fd:
+            record = json.load(record_fd)
+    except (IOError, ValueError):
+        return False
+
+    stat_info = os.stat(cached_file)
+
+    return (record.get('size') == stat_info.st_size and
+            record.get('mtime') == stat_info.st_mtime)
+
+
+def stage_input_file(input_cache, product_id, download_url, staged_file,
+                     download_limiter=None):
+    '''
+    Description:
+        Stages the input data file for the product, using the input cache if
+        one is provided.
+
+    Notes:
+        Cache entries are directories named by the Product ID, holding the
+        downloaded file named by its MD5 checksum.  The cached file is hard
+        linked to the staged file when possible, so the staged file must not
+        be modified in place.  Only an actual download waits for the download
+        limiter, if one is provided.
+
+        The size and modification time of the file are recorded when its
+        checksum is verified.  The checksum is only computed again when they
+        no longer match, instead of reading the whole file for every use.
+    '''
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    if input_cache is None:
+        rate_limiter.acquire(download_limiter, download_url)
+        transfer.download_file_url(download_url, staged_file)
+        return
+
+    verified = list()
+
+    def link_cached_file(entry_path):
+        del verified[:]
+        cached_file = os.path.join(entry_path,
+                                   [x for x in os.listdir(entry_path)
+                                    if not x.startswith('.')][0])
+        # The entry is named for its MD5, so a corrupt or truncated entry
+        # is detected instead of being served to every later request
+        if not cached_checksum_verified(cached_file):
+            if (utilities.checksum_file(cached_file) !=
+                    os.path.basename(cached_file)):
+                logger.warning("Checksum mismatch for cached [%s]"
+                               % cached_file)
+                return
+            record_cached_checksum(cached_file)
+        logger.info("Staging [%s] from the input cache" % cached_file)
+        utilities.link_or_copy_file(cached_file, staged_file)
+        verified.append(cached_file)
+
+    def download_file(entry_path):
+        utilities.create_directory(entry_path)
+        temp_file = os.path.join(entry_path, 'download')
+        rate_limiter.acquire(download_limiter, download_url)
+        transfer.download_file_url(download_url, temp_file)
+        cksum_value = utilities.checksum_file(temp_file)
+        cached_file = os.path.join(entry_path, cksum_value)
+        os.rename(temp_file, cached_file)
+        record_cached_checksum(cached_file)
+
+    # Only one process on the node downloads a product
+    with input_cache.key_lock(product_id):
+        if input_cache.retrieve(product_id, link_cached_file):
+            if verified:
+                return
+
+            logger.warning("Removing [%s] from the input cache" % product_id)
+            input_cache.remove(product_id)
+
+        logger.info("Adding [%s] to the input cache" % product_id)
+        input_cache.populate(product_id, download_file)
+
+        if not input_cache.retrieve(product_id, link_cached_file):
+            raise Exception("[%s] missing from the input cache" % product_id)
+
+        if not verified:
+            raise Exception("[%s] failed checksum verification in the input"
+                            " cache" % product_id)
 
 
 def stage_local_statistics_data(output_dir, work_dir, order_id):
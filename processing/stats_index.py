@@ -0,0 +1,140 @@
+'''
+Description: Provides a single pass index of the statistics files for the
+             band types which are plotted.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import re
+import json
+import fnmatch
+from collections import defaultdict
+
+import settings
+
+
+# Python 2 limits a regular expression to 100 groups
+PATTERNS_PER_EXPRESSION = 90
+
+
+def translate_pattern(pattern):
+    '''
+    Description:
+        Translate a file name pattern into a regular expression, with the
+        same meaning as for glob, without the end of string anchor or flags
+        so it can be combined with others.
+    '''
+
+    expression = fnmatch.translate(pattern)
+
+    # Python 2 appends the end anchor and flags
+    if expression.endswith('\\Z(?ms)'):
+        expression = expression[:-len('\\Z(?ms)')]
+
+    return expression
+
+
+class StatsMatcher(object):
+    '''
+    Description:
+        Classifies statistics file names into the (band type, key) buckets of
+        a plotting work list.
+
+    Notes:
+        All of the distinct patterns are combined into a few compiled
+        expressions, with one group for each pattern, so each file name is
+        matched once instead of once per pattern.  The patterns are expected
+        not to overlap, a file name is assigned to the buckets of the first
+        pattern it matches.
+    '''
+
+    def __init__(self, work_list):
+        '''
+        Description:
+            Initialization for the object.
+
+        Parameters:
+            work_list - A list of (search_list, band_type), where each
+                        search_list is a list of (key, filter_list).
+        '''
+
+        buckets = defaultdict(list)
+        for (search_list, band_type) in work_list:
+            for (key, filter_list) in search_list:
+                for pattern in filter_list:
+                    if (band_type, key) not in buckets[pattern]:
+                        buckets[pattern].append((band_type, key))
+
+        patterns = sorted(buckets)
+
+        self._expressions = list()
+        for start in range(0, len(patterns), PATTERNS_PER_EXPRESSION):
+            chunk = patterns[start:start + PATTERNS_PER_EXPRESSION]
+            expression = re.compile(
+                '|'.join('({0})$'.format(translate_pattern(pattern))
+                         for pattern in chunk))
+            self._expressions.append((expression,
+                                      [buckets[pattern]
+                                       for pattern in chunk]))
+
+    def buckets(self, filename):
+        '''
+        Description:
+            Returns the (band type, key) buckets the file name belongs to.
+        '''
+
+        for (expression, chunk_buckets) in self._expressions:
+            match = expression.match(filename)
+            if match is not None:
+                return chunk_buckets[match.lastindex - 1]
+
+        return list()
+
+
+def index_band_types(filenames, work_list):
+    '''
+    Description:
+        Classify the statistics files into the band types of the work list
+        in a single pass.
+
+    Returns:
+        list - (search_list, band_type) for each band type with files, where
+               each key of the search_list lists the files found for it.
+               Band types without any files are not included.
+
+    Notes:
+        The exact file names are provided, so that the plotting does not
+        need to search the directory again.  If the names for a band type
+        would make too large of a command line argument, the patterns which
+        matched are provided instead.
+    '''
+
+    matcher = StatsMatcher(work_list)
+
+    index = defaultdict(list)
+    for filename in filenames:
+        if not filename.endswith('.stats'):
+            continue
+
+        for bucket in matcher.buckets(filename):
+            index[bucket].append(filename)
+
+    indexed_work_list = list()
+    for (search_list, band_type) in work_list:
+        indexed_search_list = [(key, sorted(index[(band_type, key)]))
+                               for (key, filter_list) in search_list
+                               if index[(band_type, key)]]
+
+        if not indexed_search_list:
+            continue
+
+        if (len(json.dumps(indexed_search_list)) >
+                settings.PLOTTING_MAX_SEARCH_LIST_BYTES):
+            indexed_search_list = [(key, filter_list)
+                                   for (key, filter_list) in search_list
+                                   if index[(band_type, key)]]
+
+        indexed_work_list.append((indexed_search_list, band_type))
+
+    return indexed_work_list
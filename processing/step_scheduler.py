@@ -0,0 +1,137 @@
+'''
+Description: Provides a dependency graph based scheduler for the processing
+             steps used to generate a product.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+from collections import namedtuple
+
+
+"""Describes a single processing step
+
+   name: The name of the step, used for logging and error reporting.
+   method: The callable which performs the step, called without arguments.
+   inputs: The names of the products the step requires.  Products which are
+           not generated by any step are assumed to already be available.
+   outputs: The names of the products the step generates.
+"""
+Step = namedtuple('Step', ['name', 'method', 'inputs', 'outputs'])
+
+
+class StepSchedulerError(Exception):
+    """An exception just for the step scheduler
+    """
+    pass
+
+
+def producer_map(steps):
+    """Map each product to the step which generates it
+
+    Args:
+        steps (list): The Step definitions.
+
+    Returns:
+        producers (dict): The generating Step keyed by the product name.
+
+    Raises:
+        StepSchedulerError
+    """
+
+    producers = dict()
+    for step in steps:
+        for output in step.outputs:
+            if output in producers:
+                raise StepSchedulerError('Product [{}] is generated by both'
+                                         ' [{}] and [{}]'
+                                         .format(output,
+                                                 producers[output].name,
+                                                 step.name))
+            producers[output] = step
+
+    return producers
+
+
+def required_steps(steps, targets):
+    """Determine the steps required to generate the targets
+
+    Args:
+        steps (list): The Step definitions.
+        targets (list): The names of the products which are required.
+
+    Returns:
+        required (list): The required Step definitions in dependency order.
+                         Steps are kept in their defined order when they do
+                         not depend on each other.
+
+    Raises:
+        StepSchedulerError
+    """
+
+    producers = producer_map(steps)
+
+    # Walk the dependencies back from the targets
+    needed = set()
+    pending = list(targets)
+    while pending:
+        product = pending.pop()
+        if product not in producers:
+            raise StepSchedulerError('No step generates the requested'
+                                     ' product [{}]'.format(product))
+
+        step = producers[product]
+        if step.name in needed:
+            continue
+        needed.add(step.name)
+
+        pending.extend([x for x in step.inputs if x in producers])
+
+    # Order them, preferring the defined order
+    ordered = list()
+    available = set()
+    remaining = [x for x in steps if x.name in needed]
+    while remaining:
+        for step in remaining:
+            if all(x in available or x not in producers
+                   for x in step.inputs):
+                break
+        else:
+            raise StepSchedulerError('Circular dependency between steps [{}]'
+                                     .format(', '.join(x.name
+                                                       for x in remaining)))
+
+        ordered.append(step)
+        available.update(step.outputs)
+        remaining.remove(step)
+
+    return ordered
+
+
+def run_steps(steps, targets, logger=None):
+    """Execute the steps required to generate the targets
+
+    The steps are executed one at a time in dependency order.
+
+    Args:
+        steps (list): The Step definitions.
+        targets (list): The names of the products which are required.
+        logger (Logger): Where to report the steps being started.
+
+    Returns:
+        executed (list): The names of the steps executed in order.
+
+    Raises:
+        StepSchedulerError
+        Any exception raised by a step.
+    """
+
+    executed = list()
+
+    for step in required_steps(steps, targets):
+        if logger is not None:
+            logger.info('Starting step [{}]'.format(step.name))
+        executed.append(step.name)
+        step.method()
+
+    return executed
@@ -271,7 +271,7 @@ def process_test_order(args, request_file, products_file, env_vars):
         output = ''
         try:
             logger.info('Processing [{0}]'.format(cmd))
-            output = utilities.execute_cmd(cmd)
+            output = utilities.execute_cmd(['/bin/sh', '-c', cmd])
             if len(output) > 0:
                 print output
         except Exception, e:
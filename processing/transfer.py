@@ -6,11 +6,14 @@ License: NASA Open Source Agreement 1.3
 '''
 
 import os
+import glob
+import base64
+import binascii
 import shutil
 import ftplib
 import urllib2
 import requests
-import random
+import threading
 from time import sleep
 
 import settings
@@ -28,7 +31,7 @@ def copy_files_to_directory(source_files, destination_directory):
 
     if isinstance(source_files, list):
         for source_file in source_files:
-            cmd = ' '.join(['cp', source_file, destination_directory])
+            cmd = ['cp', source_file, destination_directory]
 
             # Transfer the data and raise any errors
             output = ''
@@ -79,8 +82,8 @@ def remote_copy_file_to_file(source_host, source_file, destination_file):
 
     logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
-    cmd = ' '.join(['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
-                    source_host, 'cp', source_file, destination_file])
+    cmd = ['ssh', '-q', '-o', 'StrictHostKeyChecking=no',
+           source_host, 'cp', source_file, destination_file]
 
     # Transfer the data and raise any errors
     output = ''
@@ -209,11 +212,12 @@ def scp_transfer_file(source_host, source_file,
     cmd = ['scp', '-q', '-o', 'StrictHostKeyChecking=no', '-C']
 
     # Build the source portion of the command
-    # Single quote the source to allow for wild cards
+    # Wild cards are expanded here for the localhost, and by scp on the
+    # source host
     if source_host == 'localhost':
-        cmd.append(source_file)
+        cmd.extend(glob.glob(source_file) or [source_file])
     else:
-        cmd.append("'%s:%s'" % (source_host, source_file))
+        cmd.append('%s:%s' % (source_host, source_file))
 
     # Build the destination portion of the command
     if destination_host == 'localhost':
@@ -221,8 +225,6 @@ def scp_transfer_file(source_host, source_file,
     else:
         cmd.append('%s:%s' % (destination_host, destination_file))
 
-    cmd = ' '.join(cmd)
-
     # Transfer the data and raise any errors
     output = ''
     try:
@@ -258,11 +260,10 @@ def scp_transfer_directory(source_host, source_directory,
     cmd = ['scp', '-r', '-q', '-o', 'StrictHostKeyChecking=no', '-C']
 
     # Build the source portion of the command
-    # Single quote the source to allow for wild cards
     if source_host == 'localhost':
         cmd.append(source_directory)
     else:
-        cmd.append("'%s:%s'" % (source_host, source_directory))
+        cmd.append('%s:%s' % (source_host, source_directory))
 
     # Build the destination portion of the command
     if destination_host == 'localhost':
@@ -270,8 +271,6 @@ def scp_transfer_directory(source_host, source_directory,
     else:
         cmd.append('%s:%s' % (destination_host, destination_directory))
 
-    cmd = ' '.join(cmd)
-
     # Transfer the data and raise any errors
     output = ''
     try:
@@ -290,88 +289,307 @@ def http_transfer_file(download_url, destination_file):
     Description:
       Using http transfer a file from a source location to a destination
       file on the localhost.
+
+    Notes:
+      The file is written in TRANSFER_BLOCK_SIZE chunks as it is received.
+      After a failure the transfer is resumed with a Range request from the
+      last byte written, when the server supports it.  The request has an
+      If-Range of the ETag or Last-Modified of the first response, so it is
+      restarted from the beginning if the file has changed.  Without either
+      of them the transfer is always restarted.
     '''
 
     logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
 
     logger.info(download_url)
 
-# First way
-#    file_size = 0
-#    retrieved_bytes = 0
-#    with closing(requests.get(download_url, stream=True)) as req:
-#        if not req.ok:
-#            raise Exception("Transfer Failed - HTTP - Reason(%s)"
-#                            % req.reason)
-#
-#        file_size = int(req.headers['content-length'])
-#
-#        with open(destination_file, 'wb') as local_fd:
-#            for data_chunk in req.iter_content(settings.TRANSFER_BLOCK_SIZE):
-#                local_fd.write(data_chunk)
-#                retrieved_bytes += len(data_chunk)
-#
-#    if retrieved_bytes != file_size:
-#        raise Exception("Transfer Failed - HTTP - Retrieved %d"
-#                        " out of %d bytes" % (retrieved_bytes, file_size))
-#    else:
-#        logger.info("Transfer Complete - HTTP")
-
-# Second way
-#    req = None
-#    try:
-#        req = requests.get(download_url)
-#
-#        if not req.ok:
-#            logger.error("Transfer Failed - HTTP")
-#            req.raise_for_status()
-#
-#        with open(destination_file, 'wb') as local_fd:
-#            local_fd.write(req.content)
-#    except:
-#        logger.error("Transfer Failed - HTTP")
-#        raise
-#    finally:
-#        if req is not None:
-#            req.close()
-
-# Third way
     session = requests.Session()
 
     session.mount('http://', requests.adapters.HTTPAdapter(max_retries=3))
     session.mount('https://', requests.adapters.HTTPAdapter(max_retries=3))
 
+    file_size = None
+    retrieved_bytes = 0
+    validator = None
+
     retry_attempt = 0
     done = False
-    while not done:
+    with open(destination_file, 'wb') as local_fd:
+        while not done:
+            req = None
+            try:
+                # Make sure the byte counts match what is written
+                headers = {'Accept-Encoding': 'identity'}
+                if retrieved_bytes > 0 and validator is not None:
+                    headers['Range'] = 'bytes={}-'.format(retrieved_bytes)
+                    headers['If-Range'] = validator
+
+                req = session.get(url=download_url, headers=headers,
+                                  stream=True, timeout=300.0)
+
+                if not req.ok:
+                    logger.error("Transfer Failed - HTTP")
+                    req.raise_for_status()
+
+                if req.status_code == 206:
+                    # Content-Range: bytes <start>-<end>/<total>
+                    (byte_range, total) = (req.headers['content-range']
+                                           .split()[-1].split('/'))
+                    if int(byte_range.split('-')[0]) != retrieved_bytes:
+                        raise Exception("Transfer Failed - HTTP - Unexpected"
+                                        " Content-Range [%s]"
+                                        % req.headers['content-range'])
+                    if total != '*':
+                        file_size = int(total)
+
+                    logger.info("Resuming transfer at byte %d"
+                                % retrieved_bytes)
+                else:
+                    if retrieved_bytes > 0:
+                        logger.warning("Range request not honored or the"
+                                       " file has changed, restarting"
+                                       " transfer")
+                        retrieved_bytes = 0
+
+                    file_size = None
+                    if 'content-length' in req.headers:
+                        file_size = int(req.headers['content-length'])
+
+                    # A weak ETag can not be used in If-Range
+                    validator = req.headers.get('etag')
+                    if validator is None or validator.startswith('W/'):
+                        validator = req.headers.get('last-modified')
+
+                local_fd.seek(retrieved_bytes)
+                local_fd.truncate()
+
+                for data_chunk in req.iter_content(settings
+                                                   .TRANSFER_BLOCK_SIZE):
+                    local_fd.write(data_chunk)
+                    retrieved_bytes += len(data_chunk)
+
+                if file_size is not None and retrieved_bytes != file_size:
+                    raise Exception("Transfer Failed - HTTP - Retrieved %d"
+                                    " out of %d bytes"
+                                    % (retrieved_bytes, file_size))
+
+                done = True
+
+            except Exception:
+                logger.exception("Transfer Issue - HTTP")
+                if retry_attempt > 3:
+                    raise Exception("Transfer Failed - HTTP"
+                                    " - exceeded retry limit")
+                sleep(min(settings.HTTP_RETRY_MAX_SLEEP_SECONDS,
+                          settings.HTTP_RETRY_BACKOFF_SECONDS *
+                          2 ** retry_attempt))
+                retry_attempt += 1
+
+            finally:
+                if req is not None:
+                    req.close()
+
+    logger.info("Transfer Complete - HTTP")
+
+
+def http_transfer_file_segmented(download_url, destination_file,
+                                 segment_count):
+    '''
+    Description:
+      Using http transfer a file from a source location to a destination
+      file on the localhost, over multiple concurrent connections.
+
+    Returns:
+      True - The file was transferred
+      False - The HEAD request failed or is not supported, the server does
+              not support byte ranges, or the file is too small to be split,
+              so nothing was transferred
+
+    Notes:
+      The destination file is pre-allocated and each connection retrieves
+      a byte range of the file, writing it in place using its own file
+      descriptor.  A failed range is resumed from the last byte written.
+    '''
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    try:
+        req = requests.head(url=download_url, allow_redirects=True,
+                            headers={'Accept-Encoding': 'identity'},
+                            timeout=300.0)
+        req.close()
+    except requests.RequestException:
+        logger.exception("HEAD request failed, not using byte ranges")
+        return False
+
+    if not req.ok:
+        logger.info("HEAD request returned [%d], not using byte ranges"
+                    % req.status_code)
+        return False
+
+    if (req.headers.get('accept-ranges', '').lower() != 'bytes' or
+            'content-length' not in req.headers):
+        logger.info("Byte ranges not supported by the server")
+        return False
+
+    file_size = int(req.headers['content-length'])
+
+    # Do not split it into segments smaller than a single block
+    segment_count = min(segment_count,
+                        file_size // settings.TRANSFER_BLOCK_SIZE)
+    if segment_count < 2:
+        return False
+
+    logger.info("Transferring %d bytes using %d segments"
+                % (file_size, segment_count))
+
+    # Pre-allocate the destination file
+    with open(destination_file, 'wb') as local_fd:
+        local_fd.truncate(file_size)
+
+    segment_size = (file_size + segment_count - 1) // segment_count
+    segments = [(start, min(start + segment_size, file_size) - 1)
+                for start in range(0, file_size, segment_size)]
+
+    errors = list()
+
+    def transfer_segment(start, end):
+        session = requests.Session()
+
+        offset = start
+        retry_attempt = 0
+        try:
+            with open(destination_file, 'r+b') as local_fd:
+                while offset <= end:
+                    seg_req = None
+                    try:
+                        headers = {'Accept-Encoding': 'identity',
+                                   'Range': 'bytes={}-{}'.format(offset,
+                                                                 end)}
+                        seg_req = session.get(url=download_url,
+                                              headers=headers,
+                                              stream=True, timeout=300.0)
+
+                        if seg_req.status_code != 206:
+                            raise Exception("Transfer Failed - HTTP - Range"
+                                            " request returned status %d"
+                                            % seg_req.status_code)
+
+                        local_fd.seek(offset)
+                        for data_chunk in seg_req.iter_content(
+                                settings.TRANSFER_BLOCK_SIZE):
+                            local_fd.write(data_chunk)
+                            offset += len(data_chunk)
+
+                        if offset != end + 1:
+                            raise Exception("Transfer Failed - HTTP"
+                                            " - Retrieved bytes %d-%d of"
+                                            " %d-%d"
+                                            % (start, offset - 1, start,
+                                               end))
+
+                    except Exception:
+                        logger.exception("Transfer Issue - HTTP")
+                        if retry_attempt >= settings.MAX_SEGMENT_ATTEMPTS:
+                            raise
+                        retry_attempt += 1
+                        sleep(settings.DEFAULT_SLEEP_SECONDS)
+
+                    finally:
+                        if seg_req is not None:
+                            seg_req.close()
+
+        except Exception as excep:
+            errors.append(excep)
+
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=transfer_segment, args=segment)
+               for segment in segments]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise Exception("Transfer Failed - HTTP - %d of %d segments failed"
+                        % (len(errors), len(segments)))
+
+    logger.info("Transfer Complete - HTTP")
+
+    return True
+
+
+def stream_url(download_url, block_size=settings.TRANSFER_BLOCK_SIZE,
+               source_info=None):
+    '''
+    Description:
+      Generates the contents of a http or file URL in blocks, without
+      writing them to the localhost.
+
+    Note:
+      The size and the MD5 checksum reported for the source, when they are
+      known, are stored in source_info as 'size' and 'md5' before the first
+      block is generated, so the caller can verify what it received.
+    '''
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    download_url = urllib2.unquote(download_url)
+
+    logger.info(download_url)
+
+    if source_info is None:
+        source_info = dict()
+
+    if download_url.startswith('http'):
         req = None
         try:
-            req = session.get(url=download_url, timeout=300.0)
+            # The data must arrive as stored, not decoded by requests, for
+            # its size and checksum to match the source
+            req = requests.get(url=download_url, stream=True, timeout=300.0,
+                               headers={'Accept-Encoding': 'identity'})
 
             if not req.ok:
                 logger.error("Transfer Failed - HTTP")
                 req.raise_for_status()
 
-            with open(destination_file, 'wb') as local_fd:
-                local_fd.write(req.content)
+            if 'content-length' in req.headers:
+                source_info['size'] = int(req.headers['content-length'])
 
-            done = True
+            if 'content-md5' in req.headers:
+                try:
+                    source_info['md5'] = binascii.hexlify(
+                        base64.b64decode(req.headers['content-md5']))
+                except TypeError:
+                    logger.warning("Ignoring invalid Content-MD5 [%s]"
+                                   % req.headers['content-md5'])
 
-        except Exception:
-            logger.exception("Transfer Issue - HTTP")
-            if retry_attempt > 3:
-                raise Exception("Transfer Failed - HTTP"
-                                " - exceeded retry limit")
-            retry_attempt += 1
-            # Sleep randomly from 1 to 10 minutes
-            sleep_seconds = int(random.random()*540)+60
-            sleep(sleep_seconds)
+            for data_chunk in req.iter_content(block_size):
+                yield data_chunk
 
         finally:
             if req is not None:
                 req.close()
 
-    logger.info("Transfer Complete - HTTP")
+    elif download_url.startswith('file://'):
+        source_file = download_url.replace('file://', '')
+        source_info['size'] = os.path.getsize(source_file)
+
+        with open(source_file, 'rb') as source_fd:
+            while True:
+                data_chunk = source_fd.read(block_size)
+                if not data_chunk:
+                    break
+                yield data_chunk
+
+    else:
+        raise Exception("Transfer Failed -"
+                        " Unknown URL transport protocol [%s]"
+                        % download_url)
+
+    logger.info("Transfer Complete - STREAM")
 
 
 def download_file_url(download_url, destination_file):
@@ -383,6 +601,10 @@ def download_file_url(download_url, destination_file):
     download_url = urllib2.unquote(download_url)
 
     if download_url.startswith('http'):
+        if (settings.TRANSFER_SEGMENT_COUNT > 1 and
+                http_transfer_file_segmented(download_url, destination_file,
+                                             settings.TRANSFER_SEGMENT_COUNT)):
+            return
         http_transfer_file(download_url, destination_file)
     elif download_url.startswith('file://'):
         source_file = download_url.replace('file://', '')
@@ -447,3 +669,39 @@ def transfer_file(source_host, source_file,
     # As a last resort try SCP
     scp_transfer_file(source_host, source_file,
                       destination_host, destination_file)
+
+
+def transfer_file_session(session, source_file, destination_file,
+                          destination_username=None, destination_pw=None):
+    '''
+    Description:
+      Transfer local file(s) to the destination host of a remote session.
+
+    Notes:
+      FTP is tried first if a username and password are provided, with a
+      fallback to the session's connection.
+    '''
+
+    logger = EspaLogging.get_logger(settings.PROCESSING_LOGGER)
+
+    logger.info("Transfering [localhost:%s] to [%s:%s]"
+                % (source_file, session.host, destination_file))
+
+    if destination_username is not None and destination_pw is not None:
+        try:
+            ftp_to_remote_location(destination_username, destination_pw,
+                                   source_file, session.host,
+                                   destination_file)
+            return
+        except Exception as excep:
+            logger.warning("FTP failures will attempt transfer using the"
+                           " session")
+            logger.warning("FTP Errors: %s" % str(excep))
+
+    try:
+        session.put(source_file, destination_file)
+    except Exception:
+        logger.error("Failed to transfer data")
+        raise
+
+    logger.info("Transfer complete - session")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+'''
+Description: Compares the time to determine the sensor information for many
+             Product IDs, one at a time with the expressions tried in turn,
+             against the combined expression of sensor.bulk_info.
+
+License: NASA Open Source Agreement 1.3
+'''
+
+
+import re
+import random
+import timeit
+from datetime import date, timedelta
+from argparse import ArgumentParser
+
+import sensor
+
+
+FIRST_DATE = date(1982, 8, 1)
+
+
+def generate_product_ids(count):
+    '''
+    Description:
+        Generates Landsat and MODIS Product IDs.
+    '''
+
+    random.seed(count)
+
+    product_ids = list()
+    for index in range(count):
+        if index % 4 == 3:
+            product_ids.append('{0}.A{1:04d}{2:03d}.h{3:02d}v{4:02d}.006.'
+                               '{5:013d}'
+                               .format(random.choice(['MOD09GA', 'MYD13Q1',
+                                                      'MOD11A1']),
+                                       random.randint(2000, 2017),
+                                       random.randint(1, 365),
+                                       random.randint(0, 35),
+                                       random.randint(0, 17),
+                                       index))
+        else:
+            product_ids.append('{0}_L1TP_{1:03d}{2:03d}_{3}_20170218_01_T1'
+                               .format(random.choice(['LT04', 'LT05',
+                                                      'LE07', 'LC08']),
+                                       random.randint(1, 233),
+                                       random.randint(1, 248),
+                                       (FIRST_DATE + timedelta(index % 12000))
+                                       .strftime('%Y%m%d')))
+
+    return product_ids
+
+
+def per_id_classify(product_id):
+    '''
+    Description:
+        The per Product ID classification, trying each expression in turn.
+    '''
+
+    mapping = sensor.MODIS_REGEXP_MAPPING
+    if sensor.is_landsat(product_id):
+        mapping = sensor.LANDSAT_COLLECTION_REGEXP_MAPPING
+
+    test_id = product_id.lower()
+
+    for key in mapping.iterkeys():
+        if re.match(mapping[key][0], test_id):
+            return key
+
+    return None
+
+
+def per_id_info(product_id):
+    '''
+    Description:
+        The per Product ID classification, trying each expression in turn.
+    '''
+
+    mapping = sensor.MODIS_REGEXP_MAPPING
+    if sensor.is_landsat(product_id):
+        mapping = sensor.LANDSAT_COLLECTION_REGEXP_MAPPING
+
+    test_id = product_id.lower()
+
+    for key in mapping.iterkeys():
+        if re.match(mapping[key][0], test_id):
+            return mapping[key][1](product_id)
+
+    return None
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the Product ID'
+                                        ' classification')
+    parser.add_argument('--count', action='store', dest='count', type=int,
+                        default=10000, help='number of Product IDs')
+    parser.add_argument('--repeat', action='store', dest='repeat', type=int,
+                        default=5, help='number of timings to take the best'
+                                        ' of')
+    args = parser.parse_args()
+
+    product_ids = generate_product_ids(args.count)
+
+    def per_id():
+        return [per_id_info(product_id) for product_id in product_ids]
+
+    def bulk():
+        # Without the information memorized by previous runs
+        sensor.info.memory.clear()
+        return sensor.bulk_info(product_ids)
+
+    def per_id_classification():
+        return [per_id_classify(product_id) for product_id in product_ids]
+
+    def combined_classification():
+        return [sensor.classify(product_id) for product_id in product_ids]
+
+    if per_id() != bulk():
+        raise RuntimeError('The results do not match')
+
+    if per_id_classification() != combined_classification():
+        raise RuntimeError('The classifications do not match')
+
+    print('Product IDs: {0}'.format(args.count))
+
+    for (name, per_id_method, combined_method) in [
+            ('Classification', per_id_classification,
+             combined_classification),
+            ('Sensor information', per_id, bulk)]:
+        per_id_seconds = min(timeit.repeat(per_id_method, number=1,
+                                           repeat=args.repeat))
+        combined_seconds = min(timeit.repeat(combined_method, number=1,
+                                             repeat=args.repeat))
+
+        print('{0}:'.format(name))
+        print('    Per ID:   {0:.4f} seconds'.format(per_id_seconds))
+        print('    Combined: {0:.4f} seconds'.format(combined_seconds))
+        print('    Speedup:  {0:.2f}x'.format(per_id_seconds /
+                                              combined_seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+
+import json
+import threading
+import unittest
+import ConfigParser
+from SocketServer import ThreadingMixIn
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+import api_interface
+
+
+class FailingHandler(BaseHTTPRequestHandler):
+    """Responds with the next of the server's statuses"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def respond(self):
+        length = int(self.headers.getheader('Content-Length') or 0)
+        self.rfile.read(length)
+
+        self.server.requests.append((self.command, self.path))
+        status = self.server.statuses.pop(0)
+
+        body = json.dumps({'status': status})
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = respond
+    do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestAPIInterface(unittest.TestCase):
+    """Test the api_interface.py methods"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FailingHandler)
+        self.server.requests = list()
+        self.server.statuses = list()
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.api = api_interface.APIServer(
+            'http://127.0.0.1:{0}'.format(self.server.server_port),
+            max_retries=2)
+        self.api.retry_sleep_seconds = lambda attempt: 0
+
+    def tearDown(self):
+        self.api.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retry_idempotent(self):
+        self.server.statuses = [503, 502, 200]
+
+        (resp, status) = self.api.request('get', '/products', status=200)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_retries_exhausted(self):
+        self.server.statuses = [503, 503, 503]
+
+        with self.assertRaises(Exception):
+            self.api.request('get', '/products', status=200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_no_retry_post(self):
+        self.server.statuses = [503, 200]
+
+        with self.assertRaises(Exception):
+            self.api.queue_products([], 'node', 'job')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_retry_status_update(self):
+        self.server.statuses = [500, 200]
+
+        self.api.update_status('product', 'order', 'node', 'processing')
+        self.assertEqual(self.server.requests,
+                         [('POST', '/update_status')] * 2)
+
+    def test_connection_options(self):
+        cfg = ConfigParser.ConfigParser()
+        cfg.add_section('processing')
+        cfg.set('processing', 'espa_api_read_timeout', '30')
+        cfg.set('processing', 'espa_api_max_retries', '1')
+
+        self.assertEqual(api_interface.connection_options(cfg),
+                         {'read_timeout': 30.0, 'max_retries': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
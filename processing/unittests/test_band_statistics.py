@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import settings
+import band_statistics
+
+
+class TestBandStatistics(unittest.TestCase):
+    """Test the band_statistics.py methods"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+        # Include fill and out of range values
+        self.data = np.arange(-1000, 11000, 3, dtype=np.int16)
+        self.data[:10] = -9999
+        self.data = self.data.reshape((50, 80))
+
+        self.write_band('LC08_sr_band1', self.data, fill_value=-9999)
+
+        # Allow multiple blocks
+        self.block_lines = settings.STATISTICS_BLOCK_LINES
+        settings.STATISTICS_BLOCK_LINES = 7
+
+    def tearDown(self):
+        settings.STATISTICS_BLOCK_LINES = self.block_lines
+        shutil.rmtree(self.work_dir)
+
+    def write_band(self, name, data, fill_value=None, data_type=2):
+        data.tofile(os.path.join(self.work_dir, ''.join([name, '.img'])))
+
+        with open(os.path.join(self.work_dir,
+                               ''.join([name, '.hdr'])), 'w') as hdr_fd:
+            hdr_fd.write('ENVI\n'
+                         'description = {{\n'
+                         '  test band}}\n'
+                         'samples = {0}\n'
+                         'lines = {1}\n'
+                         'bands = 1\n'
+                         'header offset = 0\n'
+                         'data type = {2}\n'
+                         'interleave = bsq\n'
+                         'byte order = 0\n'
+                         .format(data.shape[1], data.shape[0], data_type))
+            if fill_value is not None:
+                hdr_fd.write('data ignore value = {0}\n'.format(fill_value))
+
+    def read_stats(self, name):
+        stats = dict()
+        with open(os.path.join(self.work_dir, 'stats',
+                               ''.join([name, '.stats']))) as stats_fd:
+            for line in stats_fd:
+                (key, value) = line.strip().split('=')
+                stats[key] = value
+        return stats
+
+    def test_accumulator_merge(self):
+        values = np.random.random(1000) * 100
+
+        whole = band_statistics.StatsAccumulator()
+        whole.update(values)
+
+        parts = band_statistics.StatsAccumulator()
+        for start in range(0, 1000, 333):
+            part = band_statistics.StatsAccumulator()
+            part.update(values[start:start + 333])
+            parts.merge(part)
+
+        self.assertEqual(parts.count, 1000)
+        self.assertAlmostEqual(parts.mean, values.mean())
+        self.assertAlmostEqual(parts.stddev, values.std())
+        self.assertAlmostEqual(whole.stddev, values.std())
+        self.assertEqual(parts.minimum, values.min())
+        self.assertEqual(parts.maximum, values.max())
+
+    def test_generate_statistics(self):
+        filenames = band_statistics.generate_statistics(
+            self.work_dir, {'SR': ['*_sr_band[0-9].img']})
+
+        self.assertEqual([os.path.basename(x) for x in filenames],
+                         ['LC08_sr_band1.stats'])
+
+        valid = self.data[(self.data >= 0) & (self.data <= 10000)]
+        stats = self.read_stats('LC08_sr_band1')
+
+        self.assertEqual(stats['FILENAME'], 'LC08_sr_band1.img')
+        self.assertAlmostEqual(float(stats['MINIMUM']), valid.min())
+        self.assertAlmostEqual(float(stats['MAXIMUM']), valid.max())
+        self.assertAlmostEqual(float(stats['MEAN']), valid.mean(), places=5)
+        self.assertAlmostEqual(float(stats['STDDEV']), valid.std(), places=5)
+        self.assertEqual(stats['VALID'], 'yes')
+
+    def test_generate_statistics_scaled(self):
+        data = np.array([[0, 1500, 2000], [3730, 3731, 2500]],
+                        dtype=np.int16)
+        self.write_band('LC08_st', data)
+
+        band_statistics.generate_statistics(self.work_dir,
+                                            {'LANDSAT_ST': ['*_st.img']})
+
+        stats = self.read_stats('LC08_st')
+        self.assertAlmostEqual(float(stats['MINIMUM']), 150.0)
+        self.assertAlmostEqual(float(stats['MAXIMUM']), 373.0)
+        self.assertAlmostEqual(float(stats['MEAN']), 243.25)
+
+    def test_generate_statistics_not_valid(self):
+        data = np.zeros((4, 4), dtype=np.uint8)
+        self.write_band('MOD09GA_Emis_20', data, data_type=1)
+
+        band_statistics.generate_statistics(self.work_dir,
+                                            {'EMIS': ['*Emis_*.img']})
+
+        self.assertEqual(self.read_stats('MOD09GA_Emis_20')['VALID'], 'no')
+
+
+if __name__ == '__main__':
+    unittest.main()
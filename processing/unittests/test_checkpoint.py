@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import checkpoint
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Test the checkpoint.py methods"""
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+
+        self.store = checkpoint.CheckpointStore(
+            os.path.join(self.base_dir, 'checkpoints'), 60)
+
+        self.product_dir = os.path.join(self.base_dir, 'order-product')
+        self.work_dir = os.path.join(self.product_dir, 'work')
+        os.makedirs(self.work_dir)
+
+        self.write_file('LC08_sr_band1.img', 'data')
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def write_file(self, name, data):
+        with open(os.path.join(self.work_dir, name), 'w') as data_fd:
+            data_fd.write(data)
+
+    def complete_steps(self, *step_names):
+        for step_name in step_names:
+            self.store.complete_step('order-product', self.product_dir,
+                                     self.work_dir, step_name,
+                                     dict(hdf_filename='a.hdf'))
+
+    def test_resume(self):
+        self.complete_steps('stage_input_data', 'build_science_products')
+
+        state = self.store.resume('order-product', self.product_dir,
+                                  self.work_dir)
+
+        self.assertEqual(state['steps'], ['stage_input_data',
+                                          'build_science_products'])
+        self.assertEqual(state['processor_state'], dict(hdf_filename='a.hdf'))
+
+    def test_resume_rolls_back_work_dir(self):
+        self.complete_steps('stage_input_data')
+
+        # A step which failed part way through
+        self.write_file('LC08_sr_band2.img', 'partial')
+        os.makedirs(os.path.join(self.work_dir, 'partial', 'nested'))
+        self.write_file(os.path.join('partial', 'nested', 'a.img'), 'data')
+
+        state = self.store.resume('order-product', self.product_dir,
+                                  self.work_dir)
+
+        self.assertEqual(state['steps'], ['stage_input_data'])
+        self.assertEqual(os.listdir(self.work_dir), ['LC08_sr_band1.img'])
+
+    def test_resume_changed_file(self):
+        self.complete_steps('stage_input_data')
+
+        # A file from a completed step was modified in place
+        self.write_file('LC08_sr_band1.img', 'modified')
+
+        self.assertIsNone(self.store.resume('order-product',
+                                            self.product_dir,
+                                            self.work_dir))
+        self.assertIsNone(self.store.load('order-product'))
+
+    def test_purge(self):
+        self.complete_steps('stage_input_data')
+
+        path = self.store.checkpoint_path('order-product')
+        stale = time.time() - 120
+        os.utime(path, (stale, stale))
+
+        self.assertEqual(self.store.purge(), ['order-product'])
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(self.product_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+import subprocess
+
+import instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test the instrumentation.py methods"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.work_dir = os.path.join(self.temp_dir, 'work')
+        os.mkdir(self.work_dir)
+        self.record_filename = os.path.join(self.temp_dir, 'steps.json')
+        self.logger = logging.getLogger('unittest.instrumentation')
+        self.entity = {'scene': 'LC08', 'orderid': 'unittest'}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_records(self):
+        with open(self.record_filename) as record_fd:
+            return [json.loads(line) for line in record_fd]
+
+    def test_record_step(self):
+        def step():
+            with open(os.path.join(self.work_dir, 'band.img'), 'wb') as fd:
+                fd.write('x' * 10000)
+            subprocess.check_call(['true'])
+            return 'result'
+
+        result = instrumentation.record_step('step', step, self.entity,
+                                             self.work_dir, self.logger,
+                                             self.record_filename)
+
+        self.assertEqual(result, 'result')
+
+        records = self.read_records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['step'], 'step')
+        self.assertEqual(records[0]['scene'], 'LC08')
+        self.assertEqual(records[0]['status'], 'success')
+        self.assertFalse(records[0]['aggregate'])
+        self.assertEqual(records[0]['work_dir_delta_bytes'], 10000)
+        self.assertGreaterEqual(records[0]['wall_seconds'], 0)
+        for key in ['cpu_seconds', 'child_cpu_seconds', 'child_peak_rss_kb',
+                    'read_bytes', 'write_bytes']:
+            self.assertIn(key, records[0])
+
+    def test_record_step_failure(self):
+        def step():
+            raise RuntimeError('failed')
+
+        with self.assertRaises(RuntimeError):
+            instrumentation.record_step('failing', step, self.entity,
+                                        self.work_dir, self.logger,
+                                        self.record_filename)
+
+        records = self.read_records()
+        self.assertEqual(records[0]['step'], 'failing')
+        self.assertEqual(records[0]['status'], 'error')
+
+    def test_record_step_aggregate(self):
+        records = list()
+
+        def step():
+            instrumentation.record_step('inner', lambda: None, self.entity,
+                                        None, self.logger, records=records)
+
+        instrumentation.record_step('outer', step, self.entity, None,
+                                    self.logger, records=records,
+                                    aggregate=True)
+
+        self.assertEqual([(x['step'], x['aggregate']) for x in records],
+                         [('inner', False), ('outer', True)])
+
+        # The work directory is not measured without one
+        self.assertIsNone(records[0]['work_dir_delta_bytes'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from local_cache import LocalCache
+
+
+class TestLocalCache(unittest.TestCase):
+    """Test the local_cache.py methods"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+        self.cache = LocalCache(self.cache_dir, 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def populate(self, key, size):
+        def write_entry(entry_path):
+            with open(entry_path, 'w') as entry_fd:
+                entry_fd.write('x' * size)
+
+        self.cache.populate(key, write_entry)
+
+    def entries(self):
+        return sorted(x for x in os.listdir(self.cache_dir)
+                      if not x.startswith('.'))
+
+    def test_evict_least_recently_used(self):
+        self.populate('a', 60)
+        os.utime(self.cache.entry_path('a'), (1, 1))
+        self.populate('b', 60)
+
+        self.assertEqual(self.entries(), ['b'])
+        self.assertEqual([x for x in os.listdir(self.cache_dir)
+                          if x.startswith(LocalCache.TEMP_PREFIX)], [])
+
+    def test_pinned_entry_not_evicted(self):
+        self.populate('a', 60)
+        os.utime(self.cache.entry_path('a'), (1, 1))
+
+        def use_entry(entry_path):
+            # The cache lock is not held while the entry is in use
+            self.populate('b', 60)
+
+        self.assertTrue(self.cache.retrieve('a', use_entry))
+        self.assertEqual(self.entries(), ['a', 'b'])
+
+        # Evicted once it is no longer in use
+        self.populate('c', 10)
+        self.assertEqual(self.entries(), ['b', 'c'])
+
+    def test_remove(self):
+        self.populate('a', 10)
+
+        def use_entry(entry_path):
+            # Not removed while another user has it pinned
+            pid = os.fork()
+            if pid == 0:
+                os._exit(0 if not self.cache.remove('a') else 1)
+            self.assertEqual(os.waitpid(pid, 0)[1], 0)
+
+        self.assertTrue(self.cache.retrieve('a', use_entry))
+        self.assertEqual(self.entries(), ['a'])
+
+        self.assertTrue(self.cache.remove('a'))
+        self.assertEqual(self.entries(), [])
+        self.assertEqual(os.listdir(self.cache_dir), ['.lock'])
+
+    def test_orphaned_temp_dir_removed(self):
+        # Left behind by a populator which was killed
+        orphan = tempfile.mkdtemp(prefix=LocalCache.TEMP_PREFIX,
+                                  dir=self.cache_dir)
+
+        def build_entry(entry_path):
+            # The temporary directory being populated is not an orphan
+            other = LocalCache(self.cache_dir, 100)
+            other.populate('b', lambda path: open(path, 'w').close())
+            with open(entry_path, 'w') as entry_fd:
+                entry_fd.write('x')
+
+        self.cache.populate('a', build_entry)
+
+        self.assertFalse(os.path.exists(orphan))
+        self.assertEqual(self.entries(), ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
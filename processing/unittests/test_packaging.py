@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+
+import os
+import gzip
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+import settings
+import utilities
+import packaging
+
+
+class TestPackaging(unittest.TestCase):
+    """Test the packaging.py methods"""
+
+    def setUp(self):
+        self.current_directory = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+
+        os.mkdir('stats')
+        with open('LC08_sr_band1.img', 'wb') as data_fd:
+            data_fd.write(os.urandom(100000))
+        with open(os.path.join('stats', 'LC08_sr_band1.stats'), 'w') as data_fd:
+            data_fd.write('MINIMUM=0\n')
+
+        self.target = os.path.join(self.temp_dir, 'product.tar.gz')
+
+    def tearDown(self):
+        os.chdir(self.current_directory)
+        shutil.rmtree(self.temp_dir)
+
+    def test_tar_gzip_files(self):
+        (cksum, members) = packaging.tar_gzip_files(
+            self.target, ['LC08_sr_band1.img', 'stats'])
+
+        self.assertEqual(cksum, utilities.checksum_file(self.target))
+        self.assertEqual(members, ['LC08_sr_band1.img', 'stats',
+                                   'stats/LC08_sr_band1.stats'])
+
+        tar = tarfile.open(self.target, 'r:gz')
+        try:
+            self.assertEqual(sorted(tar.getnames()), members)
+            self.assertEqual(tar.getmember('LC08_sr_band1.img').size, 100000)
+        finally:
+            tar.close()
+
+    def test_tar_gzip_files_parallel(self):
+        block_size = settings.PACKAGING_GZIP_BLOCK_SIZE
+        settings.PACKAGING_GZIP_BLOCK_SIZE = 16 * 1024
+        try:
+            (cksum, members) = packaging.tar_gzip_files(
+                self.target, ['LC08_sr_band1.img', 'stats'], workers=2)
+        finally:
+            settings.PACKAGING_GZIP_BLOCK_SIZE = block_size
+
+        self.assertEqual(cksum, utilities.checksum_file(self.target))
+
+        tar = tarfile.open(self.target, 'r:gz')
+        try:
+            self.assertEqual(sorted(tar.getnames()), members)
+            data = tar.extractfile('LC08_sr_band1.img').read()
+        finally:
+            tar.close()
+
+        with open('LC08_sr_band1.img', 'rb') as data_fd:
+            self.assertEqual(data, data_fd.read())
+
+    def test_gzip_workers(self):
+        self.assertEqual(packaging.gzip_workers(False), 1)
+        self.assertEqual(packaging.gzip_workers(True),
+                         settings.PACKAGING_GZIP_WORKERS)
+
+    def test_parallel_gzip_writer(self):
+        with open(self.target, 'wb') as target_fd:
+            writer = packaging.ParallelGzipWriter(target_fd, 2,
+                                                  block_size=1000)
+            for count in range(10):
+                writer.write('x' * 777)
+            writer.close()
+
+        gzip_fd = gzip.open(self.target, 'rb')
+        try:
+            self.assertEqual(gzip_fd.read(), 'x' * 7770)
+        finally:
+            gzip_fd.close()
+
+    def test_parallel_gzip_writer_empty(self):
+        with open(self.target, 'wb') as target_fd:
+            writer = packaging.ParallelGzipWriter(target_fd, 2)
+            writer.close()
+
+        gzip_fd = gzip.open(self.target, 'rb')
+        try:
+            self.assertEqual(gzip_fd.read(), '')
+        finally:
+            gzip_fd.close()
+
+    def test_expected_members(self):
+        members = packaging.expected_members(['LC08_sr_band1.img', 'stats'])
+
+        self.assertEqual(members, {'LC08_sr_band1.img': 100000,
+                                   'stats': 0,
+                                   'stats/LC08_sr_band1.stats': 10})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+import parameters
+
+
+class TestParameters(unittest.TestCase):
+    """Test the parameters.py methods"""
+
+    def setUp(self):
+        self.options = {'include_sr': True,
+                        'include_pixel_qa': True,
+                        'include_st': False,
+                        'include_statistics': False,
+                        'include_customized_source_data': False,
+                        'output_format': 'envi',
+                        'reproject': False}
+
+    def tearDown(self):
+        pass
+
+    def test_science_options_hash_ignores_other_options(self):
+        other = dict(self.options)
+        other.update({'include_statistics': True,
+                      'output_format': 'gtiff',
+                      'reproject': True,
+                      'target_projection': 'utm'})
+
+        self.assertEqual(parameters.science_options_hash(self.options),
+                         parameters.science_options_hash(other))
+
+    def test_science_options_hash_science_options(self):
+        other = dict(self.options)
+        other['include_st'] = True
+
+        self.assertNotEqual(parameters.science_options_hash(self.options),
+                            parameters.science_options_hash(other))
+
+
+if __name__ == '__main__':
+    unittest.main()
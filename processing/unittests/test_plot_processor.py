@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+
+import fnmatch
+import unittest
+import ConfigParser
+
+import settings
+import processor
+import stats_index
+from logging_tools import EspaLogging
+
+
+class TestPlotProcessor(unittest.TestCase):
+    """Test the PlotProcessor statistics file search"""
+
+    def setUp(self):
+        EspaLogging.configure(settings.PROCESSING_LOGGER,
+                              order='unittest', product='plot_processor')
+
+        cfg = ConfigParser.ConfigParser()
+        cfg.add_section('processing')
+        cfg.set('processing', 'espa_distribution_method', 'local')
+        cfg.set('processing', 'include_resource_report', 'False')
+
+        parms = {'orderid': 'order',
+                 'scene': 'plot',
+                 'product_id': 'plot',
+                 'product_type': 'plot',
+                 'options': dict()}
+
+        self.work_list = processor.PlotProcessor(cfg, parms).work_list
+
+        self.filenames = [
+            'LC08_L1TP_028030_20170117_20170218_01_T1_toa_band6.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_toa_band9.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_sr_band2.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_bt_band10.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_st.stats',
+            'LO08_L1TP_028030_20170117_20170218_01_T1_toa_band3.stats',
+            'LC80280302017017LGN00_toa_band5.stats',
+            'LE07_L1TP_028030_20020117_20160917_01_T1_sr_ndvi.stats',
+            'LT05_L1TP_028030_20020117_20160917_01_T1_toa_band5.stats',
+            'LT05_L1TP_028030_20020117_20160917_01_T1_st.stats',
+            'MOD09GA.A2000072.h02v09.005.2008237032813.sur_refl_b03_1.stats',
+            'MOD11A1.A2000072.h02v09.005.2008237032813.LST_Day_1km.stats',
+            'MYD13Q1.A2000072.h02v09.005.2008237032813.250m_16_days_NDVI'
+            '.stats']
+
+    def tearDown(self):
+        EspaLogging.delete_logger_file(settings.PROCESSING_LOGGER)
+
+    def test_index_matches_glob(self):
+        indexed = stats_index.index_band_types(self.filenames, self.work_list)
+
+        expected = list()
+        for (search_list, band_type) in self.work_list:
+            found = [(key, sorted(x for x in self.filenames
+                                  if any(fnmatch.fnmatchcase(x, pattern)
+                                         for pattern in filter_list)))
+                     for (key, filter_list) in search_list]
+            found = [x for x in found if x[1]]
+            if found:
+                expected.append((found, band_type))
+
+        self.assertEqual(indexed, expected)
+
+    def test_landsat8_toa_and_st(self):
+        indexed = dict((band_type, search_list)
+                       for (search_list, band_type)
+                       in stats_index.index_band_types(self.filenames,
+                                                       self.work_list))
+
+        self.assertIn(('Landsat 8',
+                       ['LC08_L1TP_028030_20170117_20170218_01_T1'
+                        '_toa_band6.stats']),
+                      indexed['TOA SWIR1'])
+        self.assertIn(('Landsat 8',
+                       ['LC80280302017017LGN00_toa_band5.stats']),
+                      indexed['TOA NIR'])
+        self.assertIn(('Landsat 8',
+                       ['LO08_L1TP_028030_20170117_20170218_01_T1'
+                        '_toa_band3.stats']),
+                      indexed['TOA Green'])
+        self.assertIn(('Landsat 8',
+                       ['LC08_L1TP_028030_20170117_20170218_01_T1'
+                        '_st.stats']),
+                      indexed['LST Day'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+
+import os
+import shutil
+import tempfile
+import unittest
+import ConfigParser
+
+import rate_limiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test the rate_limiter.py methods"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+        self.state_file = os.path.join(self.work_dir, 'api.bucket')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_take(self):
+        bucket = rate_limiter.TokenBucket(self.state_file, 2.0, 3.0)
+
+        # A new bucket allows a burst up to its capacity
+        for _ in range(3):
+            self.assertEqual(bucket.take(now=100.0), 0.0)
+        self.assertAlmostEqual(bucket.take(now=100.0), 0.5)
+
+        # Refilled at the rate
+        self.assertEqual(bucket.take(now=100.5), 0.0)
+        self.assertAlmostEqual(bucket.take(now=100.5), 0.5)
+
+        # Never more than the capacity
+        for _ in range(3):
+            self.assertEqual(bucket.take(now=200.0), 0.0)
+        self.assertAlmostEqual(bucket.take(now=200.0), 0.5)
+
+    def test_shared_state(self):
+        first = rate_limiter.TokenBucket(self.state_file, 1.0, 1.0)
+        second = rate_limiter.TokenBucket(self.state_file, 1.0, 1.0)
+
+        self.assertEqual(first.take(now=100.0), 0.0)
+        self.assertAlmostEqual(second.take(now=100.0), 1.0)
+
+    def test_get_rate_limiter(self):
+        cfg = ConfigParser.ConfigParser()
+        cfg.add_section('processing')
+
+        self.assertIsNone(rate_limiter.get_rate_limiter(cfg, 'api'))
+
+        cfg.set('processing', 'espa_rate_limit_dir', self.work_dir)
+        cfg.set('processing', 'espa_api_rate_per_minute', '120')
+        cfg.set('processing', 'espa_download_rate_per_minute', '0')
+
+        bucket = rate_limiter.get_rate_limiter(cfg, 'api')
+        self.assertEqual(bucket.rate, 2.0)
+        self.assertEqual(bucket.state_file, self.state_file)
+        self.assertIsNone(rate_limiter.get_rate_limiter(cfg, 'download'))
+
+
+if __name__ == '__main__':
+    unittest.main()
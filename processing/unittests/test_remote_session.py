@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import settings
+import utilities
+from logging_tools import EspaLogging
+import distribution
+import remote_session
+
+
+class RecordingSession(remote_session.LocalSession):
+    """A stand-in for the destination host which records the requests"""
+
+    def __init__(self):
+        super(RecordingSession, self).__init__('localhost')
+        self.requests = list()
+        self.corrupt_once = None
+
+    def run(self, args):
+        self.requests.append(args[0])
+        return super(RecordingSession, self).run(args)
+
+    def put(self, source_file, destination_file):
+        self.requests.append(' '.join(['put', source_file]))
+        output = super(RecordingSession, self).put(source_file,
+                                                   destination_file)
+
+        if self.corrupt_once is not None:
+            with open(self.corrupt_once, 'a') as data_fd:
+                data_fd.write('corrupted')
+            self.corrupt_once = None
+
+        return output
+
+
+class TestRemoteSession(unittest.TestCase):
+    """Test the remote_session.py methods and their use in distribution"""
+
+    def setUp(self):
+        EspaLogging.configure(settings.PROCESSING_LOGGER,
+                              order='unittest', product='remote_session')
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.temp_dir, 'source')
+        self.destination_dir = os.path.join(self.temp_dir, 'destination')
+
+        os.makedirs(os.path.join(self.source_dir, 'stats'))
+        for name in ['LC08_sr_band1.stats', 'LC08_sr_band2.stats']:
+            with open(os.path.join(self.source_dir, 'stats', name),
+                      'w') as data_fd:
+                data_fd.write(name)
+
+        self.product_file = os.path.join(self.source_dir, 'LC08-SC01.tar.gz')
+        with open(self.product_file, 'wb') as data_fd:
+            data_fd.write(os.urandom(4096))
+
+        self.cksum_file = os.path.join(self.source_dir, 'LC08-SC01.md5')
+        with open(self.cksum_file, 'w') as data_fd:
+            data_fd.write(utilities.checksum_file(self.product_file))
+
+        # Do not wait between attempts
+        self.sleep = distribution.sleep
+        distribution.sleep = lambda seconds: None
+
+    def tearDown(self):
+        distribution.sleep = self.sleep
+        shutil.rmtree(self.temp_dir)
+        EspaLogging.delete_logger_file(settings.PROCESSING_LOGGER)
+
+    def test_ssh_session_options(self):
+        session = remote_session.open_session('cache.example.gov')
+        try:
+            options = session.ssh_options()
+            self.assertIn('ControlMaster=auto', options)
+            self.assertEqual(options, session.ssh_options())
+
+            control_path = [x for x in options
+                            if x.startswith('ControlPath=')][0]
+            self.assertTrue(os.path.isdir(
+                os.path.dirname(control_path.split('=', 1)[1])))
+        finally:
+            session.close()
+
+        self.assertFalse(os.path.exists(
+            os.path.dirname(control_path.split('=', 1)[1])))
+
+    def test_ssh_command_quoted(self):
+        session = remote_session.open_session('cache.example.gov')
+        try:
+            cmd = session.ssh_command(['md5sum', '/data/*.stats', '2>',
+                                       '/dev/null', '||', 'true'])
+        finally:
+            session.close()
+
+        # Everything after the host is a single argument to ssh
+        self.assertEqual(cmd[-2:],
+                         ['cache.example.gov',
+                          'md5sum /data/*.stats 2> /dev/null || true'])
+
+    def test_remote_checksum_manifest_missing_file(self):
+        present = os.path.join(self.source_dir, 'stats',
+                               'LC08_sr_band1.stats')
+        missing = os.path.join(self.source_dir, 'stats', 'missing.stats')
+
+        manifest = distribution.remote_checksum_manifest(
+            RecordingSession(), [present, missing])
+
+        self.assertEqual(manifest,
+                         {present: utilities.checksum_file(present)})
+
+    def test_transfer_product(self):
+        session = RecordingSession()
+
+        (cksum_value, product_file, cksum_file) = \
+            distribution.transfer_product(False, session,
+                                          self.destination_dir, None, None,
+                                          self.product_file, self.cksum_file)
+
+        self.assertEqual(cksum_value.split()[0],
+                         utilities.checksum_file(self.product_file))
+        self.assertTrue(os.path.isfile(product_file))
+        self.assertTrue(os.path.isfile(cksum_file))
+        self.assertEqual(session.requests,
+                         ['mkdir', 'rm',
+                          ' '.join(['put', self.cksum_file]),
+                          ' '.join(['put', self.product_file]),
+                          settings.ESPA_CHECKSUM_TOOL])
+
+    def test_distribute_statistics_remote(self):
+        session = RecordingSession()
+
+        distribution.distribute_statistics_remote(False, 'LC08',
+                                                  self.source_dir, session,
+                                                  self.destination_dir,
+                                                  None, None)
+
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.destination_dir, 'stats'))),
+            ['LC08_sr_band1.stats', 'LC08_sr_band2.stats'])
+        self.assertEqual(session.requests.count(settings.ESPA_CHECKSUM_TOOL),
+                         1)
+
+    def test_distribute_statistics_remote_resend(self):
+        stats_file = os.path.join(self.destination_dir, 'stats',
+                                  'LC08_sr_band2.stats')
+        session = RecordingSession()
+        session.corrupt_once = stats_file
+
+        distribution.distribute_statistics_remote(False, 'LC08',
+                                                  self.source_dir, session,
+                                                  self.destination_dir,
+                                                  None, None)
+
+        puts = [x for x in session.requests if x.startswith('put')]
+        self.assertEqual(puts, ['put stats/LC08*',
+                                'put stats/LC08_sr_band2.stats'])
+
+        with open(stats_file) as data_fd:
+            self.assertEqual(data_fd.read(), 'LC08_sr_band2.stats')
+
+
+if __name__ == '__main__':
+    unittest.main()
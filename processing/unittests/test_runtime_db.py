@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import runtime_db
+
+
+class TestRuntimeDB(unittest.TestCase):
+    """Test the runtime_db.py methods"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+        self.runtimes = runtime_db.RuntimeDatabase(
+            os.path.join(self.work_dir, 'runtimes.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def record(self, sensor, elapsed_seconds, status='success'):
+        self.runtimes.record({'node': 'node1',
+                              'order_id': 'order',
+                              'product_id': 'product',
+                              'product_type': 'landsat',
+                              'sensor': sensor,
+                              'options_hash': 'abc',
+                              'reproject': 0,
+                              'output_format': 'envi',
+                              'status': status,
+                              'elapsed_seconds': elapsed_seconds,
+                              'bytes_in': 100,
+                              'bytes_out': 200,
+                              'steps': {'stage_input_data': 1.5}})
+
+    def test_percentile(self):
+        self.assertEqual(runtime_db.percentile([1.0, 2.0, 3.0, 4.0], 50), 2.5)
+        self.assertEqual(runtime_db.percentile([7.0], 90), 7.0)
+        self.assertIsNone(runtime_db.percentile([], 50))
+
+    def test_percentile_runtimes(self):
+        for elapsed_seconds in range(1, 101):
+            self.record('L8', float(elapsed_seconds))
+        self.record('L8', 5000.0, status='error')
+        self.record('L7', 60.0)
+
+        results = self.runtimes.percentile_runtimes(percents=(50, 90))
+
+        l8_result = results[('L8', 'abc', 0, 'envi')]
+        self.assertEqual(l8_result['count'], 100)
+        self.assertAlmostEqual(l8_result['p50'], 50.5)
+        self.assertAlmostEqual(l8_result['p90'], 90.1)
+        self.assertEqual(results[('L7', 'abc', 0, 'envi')]['count'], 1)
+
+        results = self.runtimes.percentile_runtimes(sensor='L7')
+        self.assertEqual(results.keys(), [('L7', 'abc', 0, 'envi')])
+
+
+if __name__ == '__main__':
+    unittest.main()
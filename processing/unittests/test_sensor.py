@@ -549,6 +549,31 @@ class TestSensor(unittest.TestCase):
             sensor.info(self.non_product_id)
             self.assertTrue('is not a supported product' in context)
 
+    def test_bulk_info(self):
+        product_ids = [self.lc08_product_id,
+                       self.terra_product_id,
+                       self.non_product_id,
+                       self.lt08_product_id,
+                       ''.join([self.le07_product_id, '_sr_band1.img'])]
+
+        results = sensor.bulk_info(product_ids)
+
+        self.assertEqual(results[0], sensor.info(self.lc08_product_id))
+        self.assertEqual(results[1], sensor.info(self.terra_product_id))
+        self.assertIsNone(results[2])
+        self.assertIsNone(results[3])
+        self.assertEqual(results[4], sensor.info(self.le07_product_id))
+
+    def test_group_by_sensor(self):
+        (groups, unsupported) = sensor.group_by_sensor(
+            [self.lc08_product_id, self.lo08_product_id,
+             self.aqua_product_id, self.non_product_id])
+
+        self.assertEqual(groups, {'L8': [self.lc08_product_id,
+                                         self.lo08_product_id],
+                                  'Aqua': [self.aqua_product_id]})
+        self.assertEqual(unsupported, [self.non_product_id])
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+
+import os
+import gzip
+import base64
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import threading
+import unittest
+import BaseHTTPServer
+from StringIO import StringIO
+
+import settings
+from logging_tools import EspaLogging
+import staging
+import utilities
+from local_cache import LocalCache
+from test_transfer import RangeRequestHandler
+
+
+def make_tar(names):
+    """Returns an uncompressed tar of files containing their own names"""
+
+    archive = StringIO()
+    tar = tarfile.open(fileobj=archive, mode='w')
+    try:
+        for name in names:
+            info = tarfile.TarInfo(name)
+            info.size = len(name)
+            tar.addfile(info, StringIO(name))
+    finally:
+        tar.close()
+
+    return archive.getvalue()
+
+
+def gzip_members(data, *offsets):
+    """Returns the data compressed as a separate gzip member for each of the
+       parts split at the offsets"""
+
+    bounds = [0] + list(offsets) + [len(data)]
+
+    members = list()
+    for (start, end) in zip(bounds[:-1], bounds[1:]):
+        compressed = StringIO()
+        member = gzip.GzipFile(fileobj=compressed, mode='wb')
+        member.write(data[start:end])
+        member.close()
+        members.append(compressed.getvalue())
+
+    return ''.join(members)
+
+
+class TestStaging(unittest.TestCase):
+    """Test the staging.py streaming methods against a local server"""
+
+    def setUp(self):
+        EspaLogging.configure(settings.PROCESSING_LOGGER,
+                              order='unittest', product='staging')
+
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+                                                RangeRequestHandler)
+        self.server.data = gzip_members(make_tar(['LC08_B1.TIF',
+                                                  'LC08_MTL.txt']))
+        self.server.accept_ranges = False
+        self.server.truncate_once = False
+        self.server.head_status = None
+        self.server.etag = None
+        self.server.replacement = None
+        self.server.content_md5 = base64.b64encode(
+            hashlib.md5(self.server.data).digest())
+        self.server.requests = list()
+        self.server.encodings = list()
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.url = 'http://127.0.0.1:{}/LC08.tar.gz'.format(
+            self.server.server_address[1])
+
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Do not wait between attempts
+        self.sleep = staging.sleep
+        staging.sleep = lambda seconds: None
+
+    def tearDown(self):
+        staging.sleep = self.sleep
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+        EspaLogging.delete_logger_file(settings.PROCESSING_LOGGER)
+
+    def test_stream_untar_url(self):
+        staging.stream_untar_url(self.url, self.temp_dir)
+
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         ['LC08_B1.TIF', 'LC08_MTL.txt'])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stream_untar_url_checksum_mismatch(self):
+        self.server.content_md5 = base64.b64encode(
+            hashlib.md5('other').digest())
+
+        with self.assertRaises(Exception):
+            staging.stream_untar_url(self.url, self.temp_dir)
+
+        # Retried, and nothing is left from the failed attempts
+        self.assertEqual(len(self.server.requests),
+                         settings.MAX_STAGING_ATTEMPTS + 1)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_stream_untar_url_truncated(self):
+        self.server.content_md5 = None
+        self.server.truncate_once = True
+
+        staging.stream_untar_url(self.url, self.temp_dir)
+
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         ['LC08_B1.TIF', 'LC08_MTL.txt'])
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_stream_untar_url_multiple_members(self):
+        names = ['LC08_B1.TIF', 'LC08_B2.TIF', 'LC08_MTL.txt']
+        data = make_tar(names)
+
+        # Split on the tar block boundary after the first file, and in the
+        # middle of the second
+        for offset in [1024, 1024 + 700]:
+            destination = os.path.join(self.temp_dir, str(offset))
+            os.makedirs(destination)
+
+            self.server.data = gzip_members(data, offset)
+            self.server.content_md5 = None
+
+            staging.stream_untar_url(self.url, destination)
+
+            self.assertEqual(sorted(os.listdir(destination)), names)
+
+    def test_gzip_stream_reader_truncated(self):
+        data = gzip_members(make_tar(['LC08_B1.TIF']))
+
+        reader = staging.GzipStreamReader([data[:-4]])
+        with self.assertRaises(Exception):
+            reader.drain()
+
+        # Zeros after the last member are ignored
+        reader = staging.GzipStreamReader([data, '\0' * 8, '\0' * 8])
+        reader.drain()
+        self.assertEqual(reader.compressed_bytes, len(data) + 16)
+
+    def test_stage_input_file_cached_checksum(self):
+        cache = LocalCache(os.path.join(self.temp_dir, 'cache'), 1024 * 1024)
+
+        checksums = list()
+        checksum_file = utilities.checksum_file
+
+        def counting_checksum_file(filename):
+            checksums.append(filename)
+            return checksum_file(filename)
+
+        utilities.checksum_file = counting_checksum_file
+        try:
+            for name in ['first', 'second']:
+                staging.stage_input_file(cache, 'LC08', self.url,
+                                         os.path.join(self.temp_dir, name))
+
+            # Only the download is checksummed, the later use compares the
+            # recorded size and modification time
+            self.assertEqual(len(self.server.requests), 1)
+            self.assertEqual(len(checksums), 1)
+
+            cached_file = os.path.join(self.temp_dir, 'first')
+            stat_info = os.stat(cached_file)
+            os.utime(cached_file, (stat_info.st_atime,
+                                   stat_info.st_mtime - 60))
+
+            staging.stage_input_file(cache, 'LC08', self.url,
+                                     os.path.join(self.temp_dir, 'third'))
+
+            # A changed file is checksummed again, and is still valid
+            self.assertEqual(len(self.server.requests), 1)
+            self.assertEqual(len(checksums), 2)
+
+            with open(cached_file, 'r+') as cached_fd:
+                cached_fd.write('corrupt')
+
+            staging.stage_input_file(cache, 'LC08', self.url,
+                                     os.path.join(self.temp_dir, 'fourth'))
+
+            # A corrupt entry is replaced by a new download
+            self.assertEqual(len(self.server.requests), 2)
+            with open(os.path.join(self.temp_dir, 'fourth')) as staged_fd:
+                self.assertEqual(staged_fd.read(), self.server.data)
+        finally:
+            utilities.checksum_file = checksum_file
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+
+import fnmatch
+import unittest
+
+import settings
+import stats_index
+
+
+class TestStatsIndex(unittest.TestCase):
+    """Test the stats_index.py methods"""
+
+    def setUp(self):
+        self.work_list = [
+            ([('Landsat 5', ['LT5*_sr_band1.stats', 'LT05*_sr_band1.stats']),
+              ('Landsat 8', ['LC08*_sr_band2.stats']),
+              ('Terra', ['MOD*sur_refl_b03*.stats'])], 'SR Blue'),
+            ([('Landsat 5', ['LT05*_sr_band2.stats']),
+              ('Landsat 8', ['LC08*_sr_band3.stats'])], 'SR Green'),
+            ([('Landsat 8', ['LC08*_sr_band1.stats'])], 'SR COASTAL AEROSOL'),
+            ([('Landsat 8', ['LC08*_sr_ndvi.stats'])], 'NDVI')]
+
+        self.filenames = [
+            'LT05_L1TP_028030_20020117_20160917_01_T1_sr_band1.stats',
+            'LT05_L1TP_028030_20020117_20160917_01_T1_sr_band2.stats',
+            'LT50280302002017EDC00_sr_band1.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_sr_band1.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_sr_band2.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_sr_band3.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_sr_band3.img',
+            'MOD09GA.A2000072.h02v09.005.2008237032813.sur_refl_b03_1.stats',
+            'LC08_L1TP_028030_20170117_20170218_01_T1_sr_band12.stats']
+
+    def tearDown(self):
+        pass
+
+    def test_index_matches_glob(self):
+        indexed = stats_index.index_band_types(self.filenames, self.work_list)
+
+        expected = list()
+        for (search_list, band_type) in self.work_list:
+            found = [(key, sorted(x for x in self.filenames
+                                  if x.endswith('.stats') and
+                                  any(fnmatch.fnmatchcase(x, pattern)
+                                      for pattern in filter_list)))
+                     for (key, filter_list) in search_list]
+            found = [x for x in found if x[1]]
+            if found:
+                expected.append((found, band_type))
+
+        self.assertEqual(indexed, expected)
+
+    def test_index_skips_empty_band_types(self):
+        indexed = stats_index.index_band_types(self.filenames, self.work_list)
+
+        self.assertNotIn('NDVI', [x[1] for x in indexed])
+
+    def test_index_large_search_list(self):
+        max_bytes = settings.PLOTTING_MAX_SEARCH_LIST_BYTES
+        settings.PLOTTING_MAX_SEARCH_LIST_BYTES = 100
+        try:
+            indexed = stats_index.index_band_types(self.filenames,
+                                                   self.work_list)
+        finally:
+            settings.PLOTTING_MAX_SEARCH_LIST_BYTES = max_bytes
+
+        self.assertEqual(indexed[0],
+                         ([('Landsat 5', ['LT5*_sr_band1.stats',
+                                          'LT05*_sr_band1.stats']),
+                           ('Landsat 8', ['LC08*_sr_band2.stats']),
+                           ('Terra', ['MOD*sur_refl_b03*.stats'])],
+                          'SR Blue'))
+
+    def test_many_patterns(self):
+        work_list = [([('Landsat 8', ['LC08*_band{0}.stats'.format(x)])],
+                      'Band {0}'.format(x)) for x in range(250)]
+        filenames = ['LC08_band{0}.stats'.format(x) for x in range(250)]
+
+        indexed = stats_index.index_band_types(filenames, work_list)
+
+        self.assertEqual(len(indexed), 250)
+        self.assertEqual(indexed[249],
+                         ([('Landsat 8', ['LC08_band249.stats'])],
+                          'Band 249'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+import step_scheduler
+from step_scheduler import Step, StepSchedulerError
+
+
+class TestStepScheduler(unittest.TestCase):
+    """Test the step_scheduler.py methods"""
+
+    def setUp(self):
+        self.calls = list()
+
+        def record(name):
+            def method():
+                self.calls.append(name)
+            return method
+
+        self.steps = [Step('a', record('a'), ['input'], ['a_out']),
+                      Step('b', record('b'), ['a_out'], ['b_out']),
+                      Step('c', record('c'), ['a_out'], ['c_out']),
+                      Step('d', record('d'), ['b_out', 'c_out'], ['d_out'])]
+
+    def tearDown(self):
+        pass
+
+    def test_required_steps(self):
+        names = [x.name for x in
+                 step_scheduler.required_steps(self.steps, ['d_out'])]
+        self.assertEqual(names, ['a', 'b', 'c', 'd'])
+
+        names = [x.name for x in
+                 step_scheduler.required_steps(self.steps, ['c_out'])]
+        self.assertEqual(names, ['a', 'c'])
+
+        with self.assertRaises(StepSchedulerError):
+            step_scheduler.required_steps(self.steps, ['missing'])
+
+    def test_circular_dependency(self):
+        steps = [Step('a', None, ['b_out'], ['a_out']),
+                 Step('b', None, ['a_out'], ['b_out'])]
+
+        with self.assertRaises(StepSchedulerError):
+            step_scheduler.required_steps(steps, ['b_out'])
+
+    def test_run_steps(self):
+        executed = step_scheduler.run_steps(self.steps, ['d_out'])
+        self.assertEqual(executed, ['a', 'b', 'c', 'd'])
+        self.assertEqual(self.calls, ['a', 'b', 'c', 'd'])
+
+    def test_run_steps_failure(self):
+        def fail():
+            raise RuntimeError('failed')
+
+        def record_b():
+            self.calls.append('b')
+
+        steps = [Step('a', fail, [], ['a_out']),
+                 Step('b', record_b, ['a_out'], ['b_out'])]
+
+        with self.assertRaises(RuntimeError):
+            step_scheduler.run_steps(steps, ['b_out'])
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+
+
+import os
+import base64
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+import BaseHTTPServer
+
+import settings
+from logging_tools import EspaLogging
+import transfer
+
+
+class RangeRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """A stand-in for the data source which supports Range requests
+
+    The server attribute truncate_once causes the first full response to
+    be cut short, to simulate a dropped connection.  When content_md5 is
+    set, it is sent as the Content-MD5 header.  When etag is set, it is sent
+    as the ETag header, and a Range request with a different If-Range gets
+    the whole file.  A replacement (data, etag) takes the place of the file
+    after the truncated response.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, start, end, send_headers):
+        data = self.server.data[start:end + 1]
+
+        if not send_headers:
+            return
+
+        self.send_header('Content-Length', str(len(data)))
+        if self.server.etag is not None:
+            self.send_header('ETag', self.server.etag)
+        if self.server.content_md5 is not None:
+            self.send_header('Content-MD5', self.server.content_md5)
+        self.end_headers()
+
+        if self.command == 'HEAD':
+            return
+
+        if self.server.truncate_once:
+            self.server.truncate_once = False
+            data = data[:len(data) / 2]
+
+            if self.server.replacement is not None:
+                (self.server.data, self.server.etag) = self.server.replacement
+
+        self.wfile.write(data)
+
+    def do_GET(self):
+        size = len(self.server.data)
+        self.server.requests.append(self.headers.get('Range'))
+        self.server.encodings.append(self.headers.get('Accept-Encoding'))
+
+        byte_range = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if if_range is not None and if_range != self.server.etag:
+            byte_range = None
+
+        if byte_range is not None and self.server.accept_ranges:
+            (start, end) = byte_range.split('=')[1].split('-')
+            start = int(start)
+            end = int(end) if end else size - 1
+
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             'bytes {}-{}/{}'.format(start, end, size))
+            self.send_body(start, end, True)
+        else:
+            self.send_response(200)
+            if self.server.accept_ranges:
+                self.send_header('Accept-Ranges', 'bytes')
+            self.send_body(0, size - 1, True)
+
+    def do_HEAD(self):
+        if self.server.head_status is not None:
+            self.send_response(self.server.head_status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.do_GET()
+
+
+class TestTransfer(unittest.TestCase):
+    """Test the transfer.py http methods against a local server"""
+
+    def setUp(self):
+        EspaLogging.configure(settings.PROCESSING_LOGGER,
+                              order='unittest', product='transfer')
+
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+                                                RangeRequestHandler)
+        self.server.data = os.urandom(1024 * 1024 + 17)
+        self.server.accept_ranges = True
+        self.server.truncate_once = False
+        self.server.head_status = None
+        self.server.content_md5 = None
+        self.server.etag = '"v1"'
+        self.server.replacement = None
+        self.server.requests = list()
+        self.server.encodings = list()
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.url = 'http://127.0.0.1:{}/input.tar.gz'.format(
+            self.server.server_address[1])
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.destination_file = os.path.join(self.temp_dir, 'input.tar.gz')
+
+        # Do not wait between attempts
+        self.sleep = transfer.sleep
+        transfer.sleep = lambda seconds: None
+
+        # Allow small segments
+        self.block_size = settings.TRANSFER_BLOCK_SIZE
+        settings.TRANSFER_BLOCK_SIZE = 64 * 1024
+
+    def tearDown(self):
+        settings.TRANSFER_BLOCK_SIZE = self.block_size
+        transfer.sleep = self.sleep
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+        EspaLogging.delete_logger_file(settings.PROCESSING_LOGGER)
+
+    def read_destination(self):
+        with open(self.destination_file, 'rb') as data_fd:
+            return data_fd.read()
+
+    def test_http_transfer_file(self):
+        transfer.http_transfer_file(self.url, self.destination_file)
+
+        self.assertEqual(self.read_destination(), self.server.data)
+
+    def test_http_transfer_file_resume(self):
+        self.server.truncate_once = True
+
+        transfer.http_transfer_file(self.url, self.destination_file)
+
+        self.assertEqual(self.read_destination(), self.server.data)
+        self.assertIsNone(self.server.requests[0])
+        self.assertTrue(self.server.requests[-1].startswith('bytes='))
+        self.assertNotEqual(self.server.requests[-1], 'bytes=0-')
+
+    def test_http_transfer_file_changed(self):
+        self.server.truncate_once = True
+        replacement = os.urandom(len(self.server.data))
+        self.server.replacement = (replacement, '"v2"')
+
+        transfer.http_transfer_file(self.url, self.destination_file)
+
+        # The resumed request is answered with the whole new file
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertTrue(self.server.requests[-1].startswith('bytes='))
+        self.assertEqual(self.read_destination(), replacement)
+
+    def test_http_transfer_file_no_validator(self):
+        self.server.truncate_once = True
+        self.server.etag = None
+
+        transfer.http_transfer_file(self.url, self.destination_file)
+
+        # Without an ETag or Last-Modified it can not be safely resumed
+        self.assertEqual(self.server.requests, [None, None])
+        self.assertEqual(self.read_destination(), self.server.data)
+
+    def test_http_transfer_file_backoff(self):
+        sleeps = list()
+        transfer.sleep = sleeps.append
+
+        with self.assertRaises(Exception):
+            transfer.http_transfer_file('http://127.0.0.1:1/input.tar.gz',
+                                        self.destination_file)
+
+        self.assertEqual(sleeps, [2, 4, 8, 16])
+        self.assertTrue(all(x <= settings.HTTP_RETRY_MAX_SLEEP_SECONDS
+                            for x in sleeps))
+
+    def test_http_transfer_file_restart(self):
+        self.server.truncate_once = True
+        self.server.accept_ranges = False
+
+        transfer.http_transfer_file(self.url, self.destination_file)
+
+        self.assertEqual(self.read_destination(), self.server.data)
+
+    def test_http_transfer_file_segmented(self):
+        result = transfer.http_transfer_file_segmented(self.url,
+                                                       self.destination_file,
+                                                       4)
+
+        self.assertTrue(result)
+        self.assertEqual(self.read_destination(), self.server.data)
+        self.assertEqual(len([x for x in self.server.requests
+                              if x is not None]), 4)
+
+    def test_http_transfer_file_segmented_resume(self):
+        self.server.truncate_once = True
+
+        result = transfer.http_transfer_file_segmented(self.url,
+                                                       self.destination_file,
+                                                       4)
+
+        self.assertTrue(result)
+        self.assertEqual(self.read_destination(), self.server.data)
+        self.assertEqual(len([x for x in self.server.requests
+                              if x is not None]), 5)
+
+    def test_http_transfer_file_segmented_no_ranges(self):
+        self.server.accept_ranges = False
+
+        result = transfer.http_transfer_file_segmented(self.url,
+                                                       self.destination_file,
+                                                       4)
+
+        self.assertFalse(result)
+        self.assertFalse(os.path.exists(self.destination_file))
+
+    def test_http_transfer_file_segmented_head_failed(self):
+        self.server.head_status = 405
+
+        result = transfer.http_transfer_file_segmented(self.url,
+                                                       self.destination_file,
+                                                       4)
+
+        self.assertFalse(result)
+
+        # Falls back to the single stream download
+        transfer.download_file_url(self.url, self.destination_file)
+
+        self.assertEqual(self.read_destination(), self.server.data)
+
+    def test_http_transfer_file_segmented_no_server(self):
+        url = 'http://127.0.0.1:1/input.tar.gz'
+
+        self.assertFalse(transfer.http_transfer_file_segmented(
+            url, self.destination_file, 4))
+
+    def test_stream_url_source_info(self):
+        self.server.content_md5 = base64.b64encode(
+            hashlib.md5(self.server.data).digest())
+        source_info = dict()
+
+        data = ''.join(transfer.stream_url(self.url,
+                                           source_info=source_info))
+
+        self.assertEqual(data, self.server.data)
+        self.assertEqual(self.server.encodings, ['identity'])
+        self.assertEqual(source_info,
+                         dict(size=len(self.server.data),
+                              md5=hashlib.md5(self.server.data).hexdigest()))
+
+
+if __name__ == '__main__':
+    unittest.main()
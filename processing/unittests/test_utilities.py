@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+
+import os
+import time
+import unittest
+import threading
+
+import settings
+import utilities
+
+
+class RecordingLogger(object):
+    def __init__(self):
+        self.lines = list()
+
+    def info(self, line):
+        self.lines.append(line)
+
+
+class TestExecuteCmd(unittest.TestCase):
+    """Test the utilities.py command execution"""
+
+    def setUp(self):
+        self.tail_lines = settings.EXECUTE_CMD_TAIL_LINES
+
+    def tearDown(self):
+        settings.EXECUTE_CMD_TAIL_LINES = self.tail_lines
+
+    def test_command_argv(self):
+        self.assertEqual(utilities.command_argv('ls -l /tmp'),
+                         ['ls', '-l', '/tmp'])
+        # The shell is never used
+        self.assertEqual(utilities.command_argv('ls *.xml'),
+                         ['ls', '*.xml'])
+        self.assertEqual(utilities.command_argv("echo 'a b'"),
+                         ['echo', 'a b'])
+        self.assertEqual(utilities.command_argv(['echo', 'a b', 3]),
+                         ['echo', 'a b', '3'])
+
+    def test_output(self):
+        output = utilities.execute_cmd(['/bin/sh', '-c',
+                                        'echo hello; echo world >&2'])
+
+        self.assertEqual(output, 'hello\nworld')
+
+    def test_no_shell(self):
+        output = utilities.execute_cmd(['echo', '$HOME', '*', ';', 'ls'])
+
+        self.assertEqual(output, '$HOME * ; ls')
+
+    def test_streamed_output(self):
+        settings.EXECUTE_CMD_TAIL_LINES = 2
+        logger = RecordingLogger()
+
+        output = utilities.execute_cmd(['seq', '1', '5'], logger=logger)
+
+        self.assertEqual(logger.lines[:5], ['1', '2', '3', '4', '5'])
+        self.assertIn('Application resources [seq 1 5]', logger.lines[5])
+        self.assertEqual(output, '4\n5')
+
+    def test_rusage(self):
+        result = utilities.run_command(['/bin/sh', '-c',
+                                        'i=0; while [ $i -lt 20000 ];'
+                                        ' do i=$((i+1)); done'])
+
+        self.assertEqual(result.status, 0)
+        self.assertGreater(result.rusage.ru_maxrss, 0)
+        self.assertGreater(result.rusage.ru_utime + result.rusage.ru_stime,
+                           0)
+
+    def test_error_code(self):
+        with self.assertRaises(Exception) as context:
+            utilities.execute_cmd(['/bin/sh', '-c', 'echo failed; exit 3'])
+
+        self.assertEqual(str(context.exception),
+                         'Application [/bin/sh -c echo failed; exit 3]'
+                         ' returned error code [3] Stdout/Stderr is: failed')
+
+    def test_signal(self):
+        with self.assertRaises(Exception) as context:
+            utilities.execute_cmd(['/bin/sh', '-c', 'kill -9 $$'])
+
+        self.assertIn('terminated by signal', str(context.exception))
+
+    def test_not_found(self):
+        with self.assertRaises(Exception) as context:
+            utilities.execute_cmd(['not_a_command_espa'])
+
+        self.assertIn('returned error code [127]', str(context.exception))
+
+    def test_timeout(self):
+        with self.assertRaises(Exception) as context:
+            utilities.execute_cmd(['sleep', '10'], timeout=0.2)
+
+        self.assertIn('timed out', str(context.exception))
+
+    def test_timeout_kills_children(self):
+        # The child of the shell keeps the output open, so the command only
+        # finishes in time if the whole process group is killed
+        start = time.time()
+        with self.assertRaises(Exception) as context:
+            utilities.execute_cmd(['/bin/sh', '-c', 'sleep 10; echo done'],
+                                  timeout=0.2)
+
+        self.assertIn('timed out', str(context.exception))
+        self.assertLess(time.time() - start, 5)
+
+    def test_process_group(self):
+        # Only a command with a timeout is moved to its own process group
+        output = utilities.execute_cmd(['/bin/sh', '-c', 'ps -o pgid= -p $$'])
+        self.assertEqual(int(output), os.getpgrp())
+
+        output = utilities.execute_cmd(['/bin/sh', '-c', 'ps -o pgid= -p $$'],
+                                       timeout=10)
+        self.assertNotEqual(int(output), os.getpgrp())
+
+    def test_timeout_in_thread(self):
+        errors = list()
+
+        def run():
+            try:
+                utilities.execute_cmd(['/bin/sh', '-c', 'sleep 10; echo'],
+                                      timeout=0.2)
+            except Exception as excep:
+                errors.append(str(excep))
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
+        self.assertIn('timed out', errors[0])
+
+if __name__ == '__main__':
+    unittest.main()
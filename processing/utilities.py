@@ -7,11 +7,20 @@ License: NASA Open Source Agreement 1.3
 
 import os
 import errno
+import signal
 import datetime
-import commands
 import random
+import shlex
+import shutil
+import hashlib
 import resource
-from collections import defaultdict
+import threading
+import subprocess
+from collections import defaultdict, deque, namedtuple
+from distutils.spawn import find_executable
+
+import settings
+import packaging
 
 
 def date_from_year_doy(year, doy):
@@ -70,30 +79,175 @@ def current_disk_usage(pathname):
     return dirs_dict[pathname]
 
 
-def execute_cmd(cmd):
+CommandResult = namedtuple('CommandResult',
+                           ['status', 'output', 'timed_out', 'rusage'])
+
+
+def command_argv(cmd):
+    """Determine the arguments to execute a command with
+
+    Args:
+        cmd (str/list): The list of arguments, or a command line which is
+                        split into them the way the shell would, without
+                        any shell features.
+
+    Returns:
+        argv (list): The arguments to execute.  The shell is never used, a
+                     command which needs it must run it explicitly.
+    """
+
+    if isinstance(cmd, (list, tuple)):
+        return [str(x) for x in cmd]
+
+    return shlex.split(cmd)
+
+
+def wait_for_process(pid):
+    """Wait for a child process, retrying when interrupted by a signal
+
+    Args:
+        pid (int): The process ID of the child.
+
+    Returns:
+        (status, rusage): The wait status and resource usage of the child.
+    """
+
+    while True:
+        try:
+            (_, status, rusage) = os.wait4(pid, 0)
+            return (status, rusage)
+        except OSError as excep:
+            if excep.errno != errno.EINTR:
+                raise
+
+
+def run_command(cmd, output_handler=None, tail_lines=None, timeout=None):
+    """Execute a command, streaming its output as it is produced
+
+    Args:
+        cmd (str/list): The list of arguments, or a command line.
+        output_handler (callable): Called with each line of stdout/stderr.
+        tail_lines (int): Only keep this many of the last lines of output,
+                          all of them are kept when None.
+        timeout (float): Kill the command after this many seconds.
+
+    Returns:
+        result (CommandResult): The wait status, the kept output, whether
+                                it timed out, and the resource usage of the
+                                command and its children.
+
+    Note:
+        A command with a timeout is given its own session, so that its whole
+        process group is killed when it expires.  Otherwise a child of the
+        command would keep the output pipe open after the command was
+        killed.  Commands without a timeout stay in our process group, so
+        that killing the task also kills them.
+    """
+
+    argv = command_argv(cmd)
+
+    new_session = timeout is not None
+
+    try:
+        process = subprocess.Popen(argv,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT,
+                                   close_fds=True,
+                                   preexec_fn=(os.setsid if new_session
+                                               else None))
+    except OSError as excep:
+        # Report it the way the shell would
+        return CommandResult(127 << 8, str(excep), False, None)
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, kill)
+        timer.daemon = True
+        timer.start()
+
+    lines = deque(maxlen=tail_lines)
+    try:
+        for line in iter(process.stdout.readline, ''):
+            line = line.rstrip('\n')
+            lines.append(line)
+            if output_handler is not None:
+                output_handler(line)
+    finally:
+        process.stdout.close()
+
+        (status, rusage) = wait_for_process(process.pid)
+
+        # Already waited on, so Popen must not wait for it again
+        if os.WIFSIGNALED(status):
+            process.returncode = -os.WTERMSIG(status)
+        else:
+            process.returncode = os.WEXITSTATUS(status)
+
+        if timer is not None:
+            timer.cancel()
+
+    return CommandResult(status, '\n'.join(lines), timed_out.is_set(),
+                         rusage)
+
+
+def execute_cmd(cmd, logger=None, timeout=None):
     """Execute a system command line
 
     Args:
-        cmd (str): The command line to execute.
+        cmd (str/list): The command line to execute, or a list of arguments.
+        logger (Logger): Log each line of stdout/stderr as it is produced,
+                         only keeping the last lines for the error message,
+                         and the resources used by the command.
+        timeout (float): Kill the command after this many seconds.
 
     Returns:
         output (str): The stdout and/or stderr from the executed command.
+                      Only the last lines when a logger is provided.
 
     Raises:
         Exception(message)
     """
 
-    output = ''
-    (status, output) = commands.getstatusoutput(cmd)
+    output_handler = None
+    tail_lines = None
+    if logger is not None:
+        output_handler = logger.info
+        tail_lines = settings.EXECUTE_CMD_TAIL_LINES
+
+    result = run_command(cmd, output_handler=output_handler,
+                         tail_lines=tail_lines, timeout=timeout)
+
+    status = result.status
+    output = result.output
+
+    if isinstance(cmd, (list, tuple)):
+        cmd = ' '.join(str(x) for x in cmd)
+
+    if logger is not None and result.rusage is not None:
+        logger.info('Application resources [{}] cpu seconds [{:.2f}]'
+                    ' peak RSS KB [{}]'
+                    .format(cmd, (result.rusage.ru_utime +
+                                  result.rusage.ru_stime),
+                            result.rusage.ru_maxrss))
 
     message = ''
-    if status < 0:
-        message = 'Application terminated by signal [{}]'.format(cmd)
+    if result.timed_out:
+        message = ('Application timed out after [{}] seconds [{}]'
+                   .format(timeout, cmd))
 
-    if status != 0:
-        message = 'Application failed to execute [{}]'.format(cmd)
+    elif os.WIFSIGNALED(status):
+        message = 'Application terminated by signal [{}]'.format(cmd)
 
-    if os.WEXITSTATUS(status) != 0:
+    elif os.WEXITSTATUS(status) != 0:
         message = ('Application [{}] returned error code [{}]'
                    .format(cmd, os.WEXITSTATUS(status)))
 
@@ -129,7 +283,7 @@ def get_cache_hostname(host_names):
             result (bool): True if the host was reachable and False if not.
         """
 
-        cmd = 'ping -q -c 1 {}'.format(hostname)
+        cmd = ['ping', '-q', '-c', '1', hostname]
 
         try:
             execute_cmd(cmd)
@@ -206,13 +360,76 @@ def create_link(src_path, link_path):
             raise
 
 
-def tar_files(tarred_full_path, file_list, gzip=False):
+def link_or_copy_file(src_path, dest_path):
+    """Hard link the file to the destination, or copy it if that fails
+
+    Linking fails when the source and destination are on different file
+    systems, or when the file system does not support hard links.
+
+    Args:
+        src_path (str): The file to link or copy.
+        dest_path (str): The location for the link or copy.
+    """
+
+    try:
+        os.link(src_path, dest_path)
+    except OSError:
+        shutil.copyfile(src_path, dest_path)
+
+
+def executables_signature(names):
+    """Provides a signature of the installed versions of executables
+
+    Args:
+        names (list): The names of the executables to find on the PATH.
+
+    Returns:
+        signature (str): The hex digest of the path, size, and modification
+                         time of each executable, which changes whenever one
+                         of them is installed again.
+    """
+
+    sha1 = hashlib.sha1()
+    for name in names:
+        path = find_executable(name)
+        if path is None:
+            sha1.update('{}:missing\n'.format(name))
+        else:
+            stat = os.stat(path)
+            sha1.update('{}:{}:{}:{}\n'.format(name, path, stat.st_size,
+                                                 stat.st_mtime))
+
+    return sha1.hexdigest()
+
+
+def checksum_file(file_path, block_size=1048576):
+    """Generate the MD5 checksum of a file
+
+    Args:
+        file_path (str): The file to checksum.
+        block_size (int): The number of bytes to read at a time.
+
+    Returns:
+        checksum (str): The hex digest of the MD5 checksum.
+    """
+
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as file_fd:
+        for data_chunk in iter(lambda: file_fd.read(block_size), ''):
+            md5.update(data_chunk)
+
+    return md5.hexdigest()
+
+
+def tar_files(tarred_full_path, file_list, gzip=False, gzip_workers=1):
     """Create a tar ball (*.tar or *.tar.gz) of the specified file(s)
 
     Args:
         tarred_full_path (str): The full path to the tarred filename.
         file_list (list): The files to tar as a list.
         gzip (bool): Whether or not to gzip the tar on the fly.
+        gzip_workers (int): The number of processes to gzip with.  More than
+                            one produces a multi-member gzip in-process.
 
     Returns:
         target (str): The full path to the tarred/gzipped filename.
@@ -229,9 +446,13 @@ def tar_files(tarred_full_path, file_list, gzip=False):
         flags = '-czf'
         target = '%s.tar.gz' % tarred_full_path
 
+        if gzip_workers > 1:
+            packaging.tar_gzip_files(target, file_list,
+                                     workers=gzip_workers)
+            return target
+
     cmd = ['tar', flags, target]
     cmd.extend(file_list)
-    cmd = ' '.join(cmd)
 
     output = ''
     try:
@@ -261,7 +482,6 @@ def gzip_files(file_list):
     # Force the gzip file to overwrite any previously existing attempt
     cmd = ['gzip', '--force']
     cmd.extend(file_list)
-    cmd = ' '.join(cmd)
 
     output = ''
     try:
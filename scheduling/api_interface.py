@@ -1,58 +1,20 @@
-import requests
-import logging
+import os
+import sys
 
+# The calls into the API are made by the session module shared with the
+# processing code.  It is appended to the path, so the scheduling modules
+# with the same names as processing modules are still found first.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'processing'))
 
-logging.getLogger('requests').setLevel(logging.WARNING)
+from api_session import APISession, APIException, connection_options
 
 
-class APIException(Exception):
-    """
-    Handle exceptions thrown by the APIServer class
-    """
-    pass
-
-
-class APIServer(object):
+class APIServer(APISession):
     """
     Provide a more straightforward way of handling API calls
     without changing the cron jobs significantly
     """
-    def __init__(self, base_url):
-        self.base = base_url
-
-    def request(self, method, resource=None, status=None, **kwargs):
-        """
-        Make a call into the API
-
-        Args:
-            method: HTTP method to use
-            resource: API resource to touch
-
-        Returns: response and status code
-
-        """
-        valid_methods = ('get', 'put', 'delete', 'head', 'options', 'post')
-
-        if method not in valid_methods:
-            raise APIException('Invalid method {}'.format(method))
-
-        if resource and resource[0] == '/':
-            url = '{}{}'.format(self.base, resource)
-        elif resource:
-            url = '{}/{}'.format(self.base, resource)
-        else:
-            url = self.base
-
-        try:
-            resp = requests.request(method, url, **kwargs)
-        except requests.RequestException as e:
-            raise APIException(e)
-
-        if status and resp.status_code != status:
-            self._unexpected_status(resp.status_code, url)
-
-        return resp.json(), resp.status_code
-
     def get_configuration(self, key):
         """
         Retrieve a configuration value
@@ -114,7 +76,9 @@ class APIServer(object):
                      'processing_loc': proc_loc,
                      'status': val}
 
-        resp, status = self.request('post', url, json=data_dict, status=200)
+        # Sets the same status again when repeated
+        resp, status = self.request('post', url, json=data_dict, status=200,
+                                    idempotent=True)
 
         return resp
 
@@ -141,7 +105,9 @@ class APIServer(object):
                      'cksum_file_location': dest_cksumfile,
                      'log_file_contents': val}
 
-        resp, status = self.request('post', url, json=data_dict, status=200)
+        # Sets the same status again when repeated
+        resp, status = self.request('post', url, json=data_dict, status=200,
+                                    idempotent=True)
 
         return resp
 
@@ -163,7 +129,9 @@ class APIServer(object):
                      'processing_loc': proc_loc,
                      'error': log}
 
-        resp, status = self.request('post', url, json=data_dict, status=200)
+        # Sets the same status again when repeated
+        resp, status = self.request('post', url, json=data_dict, status=200,
+                                    idempotent=True)
 
         return resp
 
@@ -193,18 +161,6 @@ class APIServer(object):
 
         return status == 200
 
-    @staticmethod
-    def _unexpected_status(code, url):
-        """
-        Throw exception for an unhandled http status
-
-        Args:
-            code: http status that was received
-            url: URL that was used
-        """
-        raise Exception('Received unexpected status code: {}\n'
-                        'for URL: {}'.format(code, url))
-
     def test_connection(self):
         """
         Tests the base URL for the class
@@ -218,17 +174,18 @@ class APIServer(object):
         return False
 
 
-def api_connect(url):
+def api_connect(url, **kwargs):
     """
     Simple lead in method for using the API connection class
 
     Args:
         url: base URL to connect to
+        kwargs: APIServer connection options
 
     Returns: initialized APIServer object if successful connection
              else None
     """
-    api = APIServer(url)
+    api = APIServer(url, **kwargs)
 
     if not api.test_connection():
         return None
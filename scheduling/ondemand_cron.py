@@ -18,12 +18,15 @@ import os
 import sys
 import logging
 import json
+import fcntl
+import shutil
+import tempfile
 import commands
 from datetime import datetime
 from argparse import ArgumentParser
-from functools import partial
 
 import api_interface
+import request_cost
 
 from config_utils import get_cfg_file_path, retrieve_cfg
 
@@ -122,14 +125,480 @@ def gen_cmdenv_from_cfg(cfg, section, option):
     return '{}={}'.format(option.upper(), cfg.get(section, option))
 
 
+class Executor(object):
+    """Provides the interface for running a job of request lines
+
+    A job is run with has_capacity(), stage(), run() and cleanup(), in that
+    order.  release() is always called when the executor is finished with.
+    """
+
+    def has_capacity(self):
+        """Determine if another job can be run
+
+        Not implemented here.
+        """
+
+        raise NotImplementedError('[{0}] Requires implementation in the'
+                                  ' child class'
+                                  .format(self.has_capacity.__name__))
+
+    def lines_per_mapper(self, request_count):
+        """Provides the number of consecutive job file lines each mapper is
+           given
+
+        Not implemented here.
+        """
+
+        raise NotImplementedError('[{0}] Requires implementation in the'
+                                  ' child class'
+                                  .format(self.lines_per_mapper.__name__))
+
+    def stage(self, job_name, job_filepath):
+        """Make the job file available to the job
+
+        Not implemented here.
+        """
+
+        raise NotImplementedError('[{0}] Requires implementation in the'
+                                  ' child class'.format(self.stage.__name__))
+
+    def run(self, job_name):
+        """Execute the job, and wait for it to complete
+
+        Not implemented here.
+        """
+
+        raise NotImplementedError('[{0}] Requires implementation in the'
+                                  ' child class'.format(self.run.__name__))
+
+    def cleanup(self, job_name):
+        """Remove everything created for the job
+
+        Not implemented here.
+        """
+
+        raise NotImplementedError('[{0}] Requires implementation in the'
+                                  ' child class'.format(self.cleanup.__name__))
+
+    def release(self):
+        """Release the capacity claimed by has_capacity()"""
+
+        pass
+
+
+class HadoopExecutor(Executor):
+    """Runs jobs on the cluster with hadoop streaming
+
+    The job file is stored in hdfs, and each line of it is given to an
+    ondemand_mapper.py task by yarn.
+    """
+
+    def __init__(self, cron_cfg, queue_priority):
+        """Initialization for the object
+
+        Args:
+            cron_cfg (ConfigParser): Configuration for ESPA cron.
+            queue_priority (str): The priority of the hadoop queue to use.
+        """
+
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+        self.cron_cfg = cron_cfg
+
+        # Define path to hadoop commandline executables
+        self.home_dir = os.environ.get('HOME')
+        self.yarn_executable = os.path.join(self.home_dir,
+                                            'bin/hadoop/bin/yarn')
+        self.hdfs_executable = os.path.join(self.home_dir,
+                                            'bin/hadoop/bin/hdfs')
+        self.jars_path = os.path.join(self.home_dir,
+                                      'bin/hadoop/share/hadoop/tools/lib/',
+                                      'hadoop-streaming-*.jar')
+
+        # Determine the appropriate hadoop queue to use
+        self.hadoop_job_queue = get_queue_name(cron_cfg, queue_priority)
+
+    def hdfs_target(self, job_name):
+        """Specify the location of the order file on the hdfs"""
+
+        return os.path.join('requests', '{0}.txt'.format(job_name))
+
+    def has_capacity(self):
+        """Check the number of hadoop jobs against the limit
+
+        Returns:
+            bool: False if the number of jobs is over the limit.
+        """
+
+        job_limit = self.cron_cfg.getint('hadoop', 'max_jobs')
+        yarn_running_apps_command = [self.yarn_executable,
+                                     "application", "-list"]
+
+        try:
+            cmd = ' '.join(yarn_running_apps_command)
+            app_states = execute_cmd(cmd)
+            # Get "total applications: N" output line from YARN
+            running_line = [l for l in app_states.split('\n')
+                            if 'Total number of applications' in l].pop()
+            job_count = running_line.split(':')[-1]
+        except Exception as e:
+            errmsg = 'Stdout/Stderr is: 0'
+            if errmsg in e.message:
+                job_count = 0
+            else:
+                raise e
+
+        if int(job_count) >= int(job_limit):
+            self.logger.warn('Detected {0} Hadoop jobs running'
+                             .format(job_count))
+            self.logger.warn('No additional jobs will be run until job count'
+                             ' is below {0}'.format(job_limit))
+            return False
+
+        return True
+
+    def lines_per_mapper(self, request_count):
+        """Provides the number of consecutive job file lines each mapper is
+           given
+
+        Args:
+            request_count (int): The number of requests in the job.
+
+        Returns:
+            int: The configured lines per mapper, defaults to 1.
+        """
+
+        lines_per_mapper = 1
+        if self.cron_cfg.has_option('hadoop', 'lines_per_mapper'):
+            lines_per_mapper = self.cron_cfg.getint('hadoop',
+                                                    'lines_per_mapper')
+
+        return max(1, lines_per_mapper)
+
+    def stage(self, job_name, job_filepath):
+        """Store the job file in hdfs
+
+        Args:
+            job_name (str): The name of the job.
+            job_filepath (str): The local job file, which is removed.
+        """
+
+        # Define command line to store the job file in hdfs
+        hadoop_store_command = [self.hdfs_executable, 'dfs', '-put',
+                                job_filepath, self.hdfs_target(job_name)]
+
+        self.logger.info('Storing request file to hdfs...')
+        output = ''
+        try:
+            cmd = ' '.join(hadoop_store_command)
+            self.logger.info('Store cmd:{0}'.format(cmd))
+
+            output = execute_cmd(cmd)
+        except Exception:
+            msg = 'Error storing files to HDFS... exiting'
+            raise Exception(msg)
+        finally:
+            if len(output) > 0:
+                self.logger.info(output)
+
+            self.logger.info('Deleting local request file copy [{0}]'
+                             .format(job_filepath))
+            os.unlink(job_filepath)
+
+    def run(self, job_name):
+        """Execute the hadoop job
+
+        Args:
+            job_name (str): The name of the job.
+        """
+
+        hdfs_target = self.hdfs_target(job_name)
+
+        # Specify the mapper application
+        code_dir = os.path.join(self.home_dir, 'espa-site/processing')
+        mapper_path = 'processing/ondemand_mapper.py'
+
+        # Define command line to execute the hadoop job
+        # Be careful it is possible to have conflicts between module names
+        #
+        # When Hadoop kicks off a job task, it doesn't set $HOME
+        # However matplotlib requires it to be set
+        hadoop_run_command = \
+            [self.yarn_executable, 'jar', self.jars_path,
+             '-D', ('mapred.task.timeout={0}'
+                    .format(self.cron_cfg.getint('hadoop', 'timeout'))),
+             '-D', 'mapred.reduce.tasks=0',
+             '-D', ('mapred.line.input.format.linespermap={0}'
+                    .format(self.lines_per_mapper(None))),
+             '-D', 'mapred.job.queue.name={0}'.format(self.hadoop_job_queue),
+             '-D', 'mapred.job.name="{0}"'.format(job_name),
+             '-files', code_dir,
+             '-mapper', mapper_path,
+             '-input', hdfs_target,
+             '-inputformat', 'org.apache.hadoop.mapred.lib.NLineInputFormat',
+             '-cmdenv', 'HOME={0}'.format(self.home_dir),
+             '-output', hdfs_target + '-out']
+
+        self.logger.info('Running hadoop job...')
+        output = ''
+        try:
+            cmd = ' '.join(hadoop_run_command)
+            self.logger.info('Run cmd:{0}'.format(cmd))
+
+            output = execute_cmd(cmd)
+        except Exception:
+            self.logger.exception('Error running Hadoop job...')
+        finally:
+            if len(output) > 0:
+                self.logger.info(output)
+
+    def cleanup(self, job_name):
+        """Remove the job file and output from hdfs
+
+        Args:
+            job_name (str): The name of the job.
+        """
+
+        hdfs_target = self.hdfs_target(job_name)
+
+        # Define the executables to clean up hdfs
+        hadoop_delete_request_command1 = [self.hdfs_executable, 'dfs',
+                                          '-rm', '-r', hdfs_target]
+        hadoop_delete_request_command2 = [self.hdfs_executable, 'dfs',
+                                          '-rm', '-r', hdfs_target + '-out']
+
+        self.logger.info('Deleting hadoop job request file from hdfs....')
+        output = ''
+        try:
+            cmd = ' '.join(hadoop_delete_request_command1)
+            output = execute_cmd(cmd)
+        except Exception:
+            self.logger.exception("Error deleting hadoop job request file")
+        finally:
+            if len(output) > 0:
+                self.logger.info(output)
+
+        self.logger.info('Deleting hadoop job output...')
+        output = ''
+        try:
+            cmd = ' '.join(hadoop_delete_request_command2)
+            output = execute_cmd(cmd)
+        except Exception:
+            self.logger.exception('Error deleting hadoop job output')
+        finally:
+            if len(output) > 0:
+                self.logger.info(output)
+
+
+class LocalExecutor(Executor):
+    """Runs jobs on the cron host, with the job file given directly to a
+       multi-process ondemand_mapper.py
+
+    Avoids the start-up of a hadoop job and the hdfs round trips, for small
+    and urgent batches.  The number of jobs running at once on the host is
+    limited with a lock file for each job slot.
+    """
+
+    SLOT_LOCK_PREFIX = 'espa-local-executor-slot-'
+
+    def __init__(self, cron_cfg):
+        """Initialization for the object
+
+        Args:
+            cron_cfg (ConfigParser): Configuration for ESPA cron.
+        """
+
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+        self.home_dir = os.environ.get('HOME')
+
+        self.max_jobs = cron_cfg.getint('local_executor', 'max_jobs')
+        self.workers = cron_cfg.getint('local_executor', 'workers')
+        self.lock_dir = cron_cfg.get('local_executor', 'lock_dir')
+
+        # Milliseconds, the same as the hadoop task timeout it defaults to
+        if cron_cfg.has_option('local_executor', 'timeout'):
+            self.timeout = cron_cfg.getint('local_executor', 'timeout')
+        else:
+            self.timeout = cron_cfg.getint('hadoop', 'timeout')
+
+        self.job_filepath = None
+        self.slot_fd = None
+
+    def has_capacity(self):
+        """Claim one of the job slots on the host
+
+        Returns:
+            bool: False if all of the job slots are in use.
+        """
+
+        try:
+            if not os.path.isdir(self.lock_dir):
+                os.makedirs(self.lock_dir)
+        except OSError:
+            # Another cron may have created it
+            if not os.path.isdir(self.lock_dir):
+                self.logger.exception('Unable to create the local executor'
+                                      ' lock directory [{0}]'
+                                      .format(self.lock_dir))
+                return False
+
+        for slot in range(self.max_jobs):
+            lock_filepath = os.path.join(self.lock_dir,
+                                         '{0}{1}.lock'
+                                         .format(self.SLOT_LOCK_PREFIX, slot))
+            try:
+                slot_fd = open(lock_filepath, 'a')
+            except IOError:
+                self.logger.exception('Unable to open the local executor'
+                                      ' lock file [{0}]'
+                                      .format(lock_filepath))
+                return False
+
+            try:
+                fcntl.flock(slot_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                slot_fd.close()
+                continue
+
+            # Held until the job is cleaned up
+            self.slot_fd = slot_fd
+            return True
+
+        self.logger.warn('Detected {0} local jobs running'
+                         .format(self.max_jobs))
+        return False
+
+    def release(self):
+        """Release the job slot"""
+
+        if self.slot_fd is not None:
+            fcntl.flock(self.slot_fd, fcntl.LOCK_UN)
+            self.slot_fd.close()
+            self.slot_fd = None
+
+    def lines_per_mapper(self, request_count):
+        """Provides the number of consecutive job file lines each mapper is
+           given
+
+        Args:
+            request_count (int): The number of requests in the job.
+
+        Returns:
+            int: All of them, since a single mapper is given the job file.
+        """
+
+        return request_count
+
+    def stage(self, job_name, job_filepath):
+        """Keep the job file to give to the mapper
+
+        Args:
+            job_name (str): The name of the job.
+            job_filepath (str): The local job file.
+        """
+
+        self.job_filepath = job_filepath
+
+    def run(self, job_name):
+        """Execute the mapper on the job file
+
+        Args:
+            job_name (str): The name of the job.
+        """
+
+        mapper_path = os.path.join(self.home_dir,
+                                   'espa-site/processing/ondemand_mapper.py')
+
+        # Killed along with its workers when the timeout expires, as hadoop
+        # does with a task
+        local_run_command = ['timeout', '--kill-after=60',
+                             '{0:.3f}'.format(self.timeout / 1000.0),
+                             sys.executable, mapper_path,
+                             '--workers', str(self.workers),
+                             '<', self.job_filepath]
+
+        self.logger.info('Running local job...')
+        output = ''
+        try:
+            cmd = ' '.join(local_run_command)
+            self.logger.info('Run cmd:{0}'.format(cmd))
+
+            output = execute_cmd(cmd)
+        except Exception:
+            self.logger.exception('Error running local job...')
+        finally:
+            if len(output) > 0:
+                self.logger.info(output)
+
+    def cleanup(self, job_name):
+        """Remove the job file and release the job slot
+
+        Args:
+            job_name (str): The name of the job.
+        """
+
+        try:
+            if self.job_filepath is not None:
+                self.logger.info('Deleting local request file [{0}]'
+                                 .format(self.job_filepath))
+                os.unlink(self.job_filepath)
+                self.job_filepath = None
+        finally:
+            self.release()
+
+
+def local_executor_enabled(cron_cfg):
+    """Determine if the local executor has been configured
+
+    Args:
+        cron_cfg (ConfigParser): Configuration for ESPA cron.
+
+    Returns:
+        bool: True if the local executor can be used.
+    """
+
+    return (cron_cfg.has_section('local_executor') and
+            cron_cfg.getint('local_executor', 'max_jobs') > 0)
+
+
+def use_local_executor(cron_cfg, queue_priority, request_count=None):
+    """Determine if a batch should be run by the local executor
+
+    Args:
+        cron_cfg (ConfigParser): Configuration for ESPA cron.
+        queue_priority (str): The priority of the batch.
+        request_count (int): The number of requests in the batch, or None if
+                             it is not known yet.
+
+    Returns:
+        bool: True for the configured priorities, and for batches with no
+              more than the configured maximum number of requests.
+    """
+
+    if not local_executor_enabled(cron_cfg):
+        return False
+
+    priorities = cron_cfg.get('local_executor', 'priorities').split()
+    if queue_priority in priorities:
+        return True
+
+    max_batch_size = cron_cfg.getint('local_executor', 'max_batch_size')
+
+    return request_count is not None and request_count <= max_batch_size
+
+
 def process_requests(cron_cfg, proc_cfg, args,
                      queue_priority, request_priority):
     """Retrieves and kicks off processes
 
     Queries the API service to see if there are any requests that need
     to be processed with the specified type, priority and/or user.  If there
-    are, this method builds and executes a hadoop job and updates the status
-    for each request through the API service."
+    are, this method builds and executes a job and updates the status
+    for each request through the API service.  The job is executed by hadoop,
+    or by the local executor for the priorities and batch sizes configured
+    for it.  When hadoop is full, a batch no larger than the local executor
+    maximum is still retrieved and run locally.
 
     Args:
         cron_cfg (ConfigParser): Configuration for ESPA cron.
@@ -145,41 +614,56 @@ def process_requests(cron_cfg, proc_cfg, args,
         Exception(message)
     """
 
-    # Get the logger for this task
-    logger = logging.getLogger(LOGGER_NAME)
+    # Check the number of jobs and don't do anything if they are over a
+    # limit
+    if use_local_executor(cron_cfg, queue_priority):
+        executor = LocalExecutor(cron_cfg)
+    else:
+        executor = HadoopExecutor(cron_cfg, queue_priority)
 
-    # Define path to hadoop commandline executables
-    home_dir = os.environ.get('HOME')
-    yarn_executable = os.path.join(home_dir, 'bin/hadoop/bin/yarn')
-    hdfs_executable = os.path.join(home_dir, 'bin/hadoop/bin/hdfs')
-    jars_path = os.path.join(home_dir,
-                             'bin/hadoop/share/hadoop/tools/lib/',
-                             'hadoop-streaming-*.jar')
+    limit = int(args.limit)
 
-    # check the number of hadoop jobs and don't do anything if they
-    # are over a limit
-    job_limit = cron_cfg.getint('hadoop', 'max_jobs')
-    yarn_running_apps_command = [yarn_executable, "application", "-list"]
+    if not executor.has_capacity():
+        if (not isinstance(executor, HadoopExecutor) or
+                not local_executor_enabled(cron_cfg)):
+            return
+
+        # A batch small enough for the local executor can still be run
+        # while hadoop is full
+        executor = LocalExecutor(cron_cfg)
+        if not executor.has_capacity():
+            return
+
+        limit = min(limit,
+                    cron_cfg.getint('local_executor', 'max_batch_size'))
+        if limit < 1:
+            executor.release()
+            return
 
     try:
-        cmd = ' '.join(yarn_running_apps_command)
-        app_states = execute_cmd(cmd)
-        # Get "total applications: N" output line from YARN
-        running_line = [l for l in app_states.split('\n')
-                        if 'Total number of applications' in l].pop()
-        job_count = running_line.split(':')[-1]
-    except Exception as e:
-        errmsg = 'Stdout/Stderr is: 0'
-        if errmsg in e.message:
-            job_count = 0
-        else:
-            raise e
+        process_requests_with(executor, cron_cfg, proc_cfg, args,
+                              queue_priority, request_priority, limit)
+    finally:
+        executor.release()
+
+
+def process_requests_with(executor, cron_cfg, proc_cfg, args,
+                          queue_priority, request_priority, limit):
+    """Retrieves the requests and runs them with the executor
+
+    Args:
+        executor (Executor): Runs the job, which may be replaced by a local
+                             executor for a small batch.
+        cron_cfg (ConfigParser): Configuration for ESPA cron.
+        proc_cfg (ConfigParser): Configuration for ESPA processing.
+        args (struct): The arguments retireved from the command line.
+        queue_priority (str): The queue to use or None.
+        request_priority (str): The request to use or None.
+        limit (int): The maximum number of requests to retrieve.
+    """
 
-    if int(job_count) >= int(job_limit):
-        logger.warn('Detected {0} Hadoop jobs running'.format(job_count))
-        logger.warn('No additional jobs will be run until job count'
-                    ' is below {0}'.format(job_limit))
-        return
+    # Get the logger for this task
+    logger = logging.getLogger(LOGGER_NAME)
 
     rpcurl = proc_cfg.get('processing', 'espa_api')
     server = None
@@ -189,7 +673,8 @@ def process_requests(cron_cfg, proc_cfg, args,
             rpcurl.startswith('http://') and
             len(rpcurl) > 7):
 
-        server = api_interface.api_connect(rpcurl)
+        server = api_interface.api_connect(
+            rpcurl, **api_interface.connection_options(proc_cfg))
     else:
         raise Exception('Missing or invalid environment variable ESPA_API')
 
@@ -212,23 +697,24 @@ def process_requests(cron_cfg, proc_cfg, args,
     # Use ondemand_enabled to determine if we should be processing or not
     ondemand_enabled = server.get_configuration('system.ondemand_enabled')
 
-    # Determine the appropriate hadoop queue to use
-    hadoop_job_queue = get_queue_name(cron_cfg, queue_priority)
-
     if not ondemand_enabled.lower() == 'true':
         raise Exception('on demand disabled... exiting')
 
-    # Create a partial function to reduce duplication in some of the
-    # following code
-    proc_cmdenv = partial(gen_cmdenv_from_cfg,
-                          cfg=proc_cfg, section='processing')
-
+    local_executor = None
     try:
         logger.info('Checking for requests to process...')
-        requests = server.get_scenes_to_process(int(args.limit), args.user,
+        requests = server.get_scenes_to_process(limit, args.user,
                                                 request_priority,
                                                 list(args.product_types))
         if requests:
+            # Small batches skip the hadoop job, when there is room for them
+            if (isinstance(executor, HadoopExecutor) and
+                    use_local_executor(cron_cfg, queue_priority,
+                                       len(requests))):
+                local_executor = LocalExecutor(cron_cfg)
+                if local_executor.has_capacity():
+                    executor = local_executor
+
             # Figure out the name of the order file
             stamp = datetime.now()
             job_name = ('{0:%Y-%m-%d-%H-%M-%S}-{1}-espa_job'
@@ -236,12 +722,21 @@ def process_requests(cron_cfg, proc_cfg, args,
 
             logger.info(' '.join(['Found requests to process,',
                                   'generating job name:', job_name]))
+            logger.info('Using the [{0}]'.format(type(executor).__name__))
 
-            job_filename = '{0}.txt'.format(job_name)
-            job_filepath = os.path.join('/tmp', job_filename)
+            # Balance the estimated cost of the requests given to each
+            # mapper
+            requests = request_cost.pack_requests(
+                requests, executor.lines_per_mapper(len(requests)))
+
+            # The order file holds the passwords, so it is only readable by
+            # us, in a directory only we can access
+            job_dir = tempfile.mkdtemp(prefix='espa-job-')
+            (job_fd, job_filepath) = tempfile.mkstemp(
+                prefix='{0}-'.format(job_name), suffix='.txt', dir=job_dir)
 
             # Create the order file full of all the scenes requested
-            with open(job_filepath, 'w+') as espa_fd:
+            with os.fdopen(job_fd, 'w') as espa_fd:
                 for request in requests:
                     request['espa_api'] = rpcurl
 
@@ -265,62 +760,11 @@ def process_requests(cron_cfg, proc_cfg, args,
                     # Write out the request line
                     espa_fd.write(request_line)
 
-            # Specify the location of the order file on the hdfs
-            hdfs_target = os.path.join('requests', job_filename)
-
-            # Define command line to store the job file in hdfs
-            hadoop_store_command = [hdfs_executable, 'dfs', '-put', job_filepath, hdfs_target]
-
-            # Specify the mapper application
-            code_dir = os.path.join(home_dir, 'espa-site/processing')
-            mapper_path = 'processing/ondemand_mapper.py'
-
-            # Define command line to execute the hadoop job
-            # Be careful it is possible to have conflicts between module names
-            #
-            # When Hadoop kicks off a job task, it doesn't set $HOME
-            # However matplotlib requires it to be set
-            hadoop_run_command = \
-                [yarn_executable, 'jar', jars_path,
-                 '-D', ('mapred.task.timeout={0}'
-                        .format(cron_cfg.getint('hadoop', 'timeout'))),
-                 '-D', 'mapred.reduce.tasks=0',
-                 '-D', 'mapred.job.queue.name={0}'.format(hadoop_job_queue),
-                 '-D', 'mapred.job.name="{0}"'.format(job_name),
-                 '-files', code_dir,
-                 '-mapper', mapper_path,
-                 '-input', hdfs_target,
-                 '-inputformat', 'org.apache.hadoop.mapred.lib.NLineInputFormat',
-                 '-cmdenv', 'HOME={0}'.format(home_dir),
-                 '-output', hdfs_target + '-out']
-
-            # Define the executables to clean up hdfs
-            hadoop_delete_request_command1 = [hdfs_executable, 'dfs',
-                                              '-rm', '-r', hdfs_target]
-            hadoop_delete_request_command2 = [hdfs_executable, 'dfs',
-                                              '-rm', '-r', hdfs_target + '-out']
-
-            logger.info('Storing request file to hdfs...')
-            output = ''
-            try:
-                cmd = ' '.join(hadoop_store_command)
-                logger.info('Store cmd:{0}'.format(cmd))
-
-                output = execute_cmd(cmd)
-            except Exception:
-                msg = 'Error storing files to HDFS... exiting'
-                raise Exception(msg)
-            finally:
-                if len(output) > 0:
-                    logger.info(output)
-
-                logger.info('Deleting local request file copy [{0}]'
-                            .format(job_filepath))
-                os.unlink(job_filepath)
+            executor.stage(job_name, job_filepath)
 
             try:
                 # Update the scene list as queued so they don't get pulled
-                # down again now that these jobs have been stored in hdfs
+                # down again now that these jobs have been stored
                 product_list = list()
                 for request in requests:
                     product_list.append((request['orderid'],
@@ -332,41 +776,13 @@ def process_requests(cron_cfg, proc_cfg, args,
                 server.queue_products(product_list, 'CDR_ECV cron driver',
                                       job_name)
 
-                logger.info('Running hadoop job...')
-                output = ''
-                try:
-                    cmd = ' '.join(hadoop_run_command)
-                    logger.info('Run cmd:{0}'.format(cmd))
-
-                    output = execute_cmd(cmd)
-                except Exception:
-                    logger.exception('Error running Hadoop job...')
-                finally:
-                    if len(output) > 0:
-                        logger.info(output)
+                executor.run(job_name)
 
             finally:
-                logger.info('Deleting hadoop job request file from hdfs....')
-                output = ''
                 try:
-                    cmd = ' '.join(hadoop_delete_request_command1)
-                    output = execute_cmd(cmd)
-                except Exception:
-                    logger.exception("Error deleting hadoop job request file")
+                    executor.cleanup(job_name)
                 finally:
-                    if len(output) > 0:
-                        logger.info(output)
-
-                logger.info('Deleting hadoop job output...')
-                output = ''
-                try:
-                    cmd = ' '.join(hadoop_delete_request_command2)
-                    output = execute_cmd(cmd)
-                except Exception:
-                    logger.exception('Error deleting hadoop job output')
-                finally:
-                    if len(output) > 0:
-                        logger.info(output)
+                    shutil.rmtree(job_dir, ignore_errors=True)
 
         else:
             logger.info('No requests to process....')
@@ -378,6 +794,9 @@ def process_requests(cron_cfg, proc_cfg, args,
         logger.exception('Error Processing Ondemand Requests')
 
     finally:
+        if local_executor is not None:
+            local_executor.release()
+
         server = None
 
 
@@ -46,7 +46,8 @@ def determine_order_disposition(proc_cfg, username):
             rpcurl.startswith('http://') and
             len(rpcurl) > 7):
 
-        server = api_interface.api_connect(rpcurl)
+        server = api_interface.api_connect(
+            rpcurl, **api_interface.connection_options(proc_cfg))
     else:
         raise Exception('Missing or invalid API URL')
 
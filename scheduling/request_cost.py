@@ -0,0 +1,147 @@
+'''
+    FILE: request_cost.py
+
+    PURPOSE: Estimates the relative processing cost of each request, and
+             orders the requests in a job file so the work given to each
+             mapper is balanced.
+
+    PROJECT: Land Satellites Data Systems Science Research and Development
+             (LSRD) at the USGS EROS
+
+    LICENSE: NASA Open Source Agreement 1.3
+'''
+
+
+import heapq
+
+
+# Relative cost of staging and converting the input for each product type
+BASE_COSTS = {
+    'landsat': 10.0,
+    'modis': 2.0,
+    'plot': 5.0
+}
+DEFAULT_BASE_COST = 10.0
+
+# Any of these require surface reflectance to be generated, which is only
+# done once for all of them
+SR_INPUT_OPTIONS = ['include_sr',
+                    'include_sr_evi',
+                    'include_sr_msavi',
+                    'include_sr_nbr',
+                    'include_sr_nbr2',
+                    'include_sr_ndmi',
+                    'include_sr_ndvi',
+                    'include_sr_savi',
+                    'include_dswe']
+SR_COST = 30.0
+
+# Relative cost of the additional products
+OPTION_COSTS = {
+    'include_st': 60.0,
+    'include_dswe': 10.0,
+    'include_sr_toa': 5.0,
+    'include_sr_thermal': 5.0,
+    'include_pixel_qa': 3.0,
+    'include_sr_evi': 2.0,
+    'include_sr_msavi': 2.0,
+    'include_sr_nbr': 2.0,
+    'include_sr_nbr2': 2.0,
+    'include_sr_ndmi': 2.0,
+    'include_sr_ndvi': 2.0,
+    'include_sr_savi': 2.0,
+    'include_statistics': 3.0,
+    'include_customized_source_data': 2.0,
+    'include_source_data': 1.0
+}
+
+# Customization warps every band, so scales with the products generated
+REPROJECTION_FACTOR = 1.5
+
+# Relative cost of converting to the output format
+OUTPUT_FORMAT_COSTS = {
+    'envi': 0.0,
+    'gtiff': 2.0,
+    'hdf-eos2': 4.0,
+    'netcdf': 4.0
+}
+
+
+def request_cost(request):
+    """Estimate the relative processing cost of a request
+
+    Args:
+        request (dict): The request, as retrieved from the API.
+
+    Returns:
+        cost (float): The estimated cost, only meaningful relative to the
+                      cost of other requests.
+    """
+
+    options = request.get('options') or dict()
+
+    cost = BASE_COSTS.get(request.get('product_type'), DEFAULT_BASE_COST)
+
+    if any(options.get(option) for option in SR_INPUT_OPTIONS):
+        cost += SR_COST
+
+    cost += sum(option_cost for (option, option_cost) in OPTION_COSTS.items()
+                if options.get(option))
+
+    if (options.get('reproject') or options.get('resize') or
+            options.get('image_extents')):
+        cost *= REPROJECTION_FACTOR
+
+    cost += OUTPUT_FORMAT_COSTS.get(options.get('output_format'), 0.0)
+
+    return cost
+
+
+def pack_requests(requests, lines_per_mapper):
+    """Order the requests so the consecutive lines given to each mapper have
+       balanced costs
+
+    The requests are assigned with a longest processing time first greedy
+    bin-packing.  The most expensive remaining request is given to the
+    mapper with the lowest total cost which still has room for another line.
+    The requests of each mapper are ordered most expensive first, so that a
+    mapper processing them concurrently starts the longest ones first.
+
+    Args:
+        requests (list): The requests, as retrieved from the API.
+        lines_per_mapper (int): The number of consecutive job file lines
+                                given to each mapper.
+
+    Returns:
+        requests (list): The same requests in the job file order.
+    """
+
+    lines_per_mapper = max(1, lines_per_mapper)
+    mapper_count = (len(requests) + lines_per_mapper - 1) // lines_per_mapper
+
+    if mapper_count < 1:
+        return list()
+
+    costed = sorted(((request_cost(request), index, request)
+                     for (index, request) in enumerate(requests)),
+                    key=lambda item: (-item[0], item[1]))
+
+    # Only the last mapper has fewer lines, when they do not divide evenly
+    capacities = [lines_per_mapper] * mapper_count
+    capacities[-1] = len(requests) - lines_per_mapper * (mapper_count - 1)
+
+    mappers = [list() for _ in range(mapper_count)]
+
+    # (total cost, mapper) for the mappers with room for more lines
+    loads = [(0.0, mapper) for mapper in range(mapper_count)]
+    heapq.heapify(loads)
+
+    for (cost, index, request) in costed:
+        (total_cost, mapper) = heapq.heappop(loads)
+
+        mappers[mapper].append(request)
+
+        if len(mappers[mapper]) < capacities[mapper]:
+            heapq.heappush(loads, (total_cost + cost, mapper))
+
+    return [request for mapper in mappers for request in mapper]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+import request_cost
+
+
+def make_request(name, product_type='landsat', **options):
+    return dict(orderid=name, product_type=product_type, options=options)
+
+
+class TestRequestCost(unittest.TestCase):
+    """Test the request_cost.py methods"""
+
+    def test_request_cost_ordering(self):
+        plain = make_request('plain', include_source_data=True)
+        sr = make_request('sr', include_sr=True)
+        sr_indices = make_request('sr_indices', include_sr=True,
+                                  include_sr_ndvi=True, include_sr_evi=True)
+        st = make_request('st', include_sr=True, include_st=True)
+        reprojected = make_request('reprojected', include_sr=True,
+                                   include_st=True, reproject=True)
+
+        costs = [request_cost.request_cost(request)
+                 for request in [plain, sr, sr_indices, st, reprojected]]
+        self.assertEqual(costs, sorted(costs))
+        self.assertEqual(len(set(costs)), len(costs))
+
+        # Surface reflectance is only generated once for all of its products
+        self.assertEqual(
+            request_cost.request_cost(make_request('ndvi',
+                                                   include_sr_ndvi=True)),
+            request_cost.request_cost(make_request('sr', include_sr=True)) +
+            request_cost.OPTION_COSTS['include_sr_ndvi'])
+
+        self.assertLess(
+            request_cost.request_cost(make_request('modis', 'modis')),
+            request_cost.request_cost(make_request('landsat', 'landsat')))
+
+    def test_request_cost_missing_options(self):
+        request = dict(orderid='none', product_type='unknown', options=None)
+
+        self.assertEqual(request_cost.request_cost(request),
+                         request_cost.DEFAULT_BASE_COST)
+
+    def test_pack_requests_empty(self):
+        self.assertEqual(request_cost.pack_requests(list(), 3), list())
+
+    def test_pack_requests_balanced(self):
+        requests = ([make_request('st{0}'.format(x), include_sr=True,
+                                  include_st=True) for x in range(2)] +
+                    [make_request('l1{0}'.format(x)) for x in range(2)])
+
+        packed = request_cost.pack_requests(requests, 2)
+
+        self.assertEqual(sorted(x['orderid'] for x in packed),
+                         sorted(x['orderid'] for x in requests))
+        # Each mapper gets one expensive and one cheap request, most
+        # expensive first
+        self.assertEqual([x['orderid'][:2] for x in packed],
+                         ['st', 'l1', 'st', 'l1'])
+
+    def test_pack_requests_uneven_last_mapper(self):
+        requests = [make_request('r{0}'.format(x), include_sr=True,
+                                 include_st=(x % 2 == 0))
+                    for x in range(7)]
+
+        packed = request_cost.pack_requests(requests, 3)
+
+        self.assertEqual(sorted(x['orderid'] for x in packed),
+                         sorted(x['orderid'] for x in requests))
+
+        # The mappers take lines 0-2, 3-5 and 6, so the last has one line
+        mappers = [packed[0:3], packed[3:6], packed[6:]]
+        self.assertEqual([len(x) for x in mappers], [3, 3, 1])
+
+        for mapper in mappers:
+            costs = [request_cost.request_cost(x) for x in mapper]
+            self.assertEqual(costs, sorted(costs, reverse=True))
+
+    def test_pack_requests_lines_per_mapper(self):
+        requests = [make_request('r{0}'.format(x)) for x in range(3)]
+
+        # Fewer requests than lines, and a non-positive line count
+        self.assertEqual(len(request_cost.pack_requests(requests, 10)), 3)
+        self.assertEqual(len(request_cost.pack_requests(requests, 0)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()